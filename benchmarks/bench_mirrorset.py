@@ -0,0 +1,306 @@
+"""Mirrorselect 2.x
+ Benchmarks of parsing and filtering the mirror list.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from optparse import OptionParser
+from xml.sax.saxutils import escape, quoteattr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mirrorselect.mirrorparser3 import MirrorParser3  # noqa: E402
+from mirrorselect.mirrorset import MirrorSet  # noqa: E402
+from mirrorselect.version import version  # noqa: E402
+
+# Number of endpoints of the synthetic mirror lists, by default.
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+# Version of the results file format.
+RESULTS_FORMAT = 1
+
+REGIONS = ["Africa", "Asia", "Australia", "Europe", "North America", "South America"]
+
+# Protocols of the endpoints, and the share of mirrors offering each.
+PROTOCOLS = [("https", 0.9), ("http", 0.8), ("ftp", 0.3), ("rsync", 0.5)]
+
+# Mirror groups, one per country, in the synthetic lists.
+COUNTRIES = 100
+
+# What the filters select in the synthetic lists.
+COUNTRY = "Country 7"
+REGION = "Europe"
+
+
+def generate_xml(endpoints: int, seed: int = 0) -> str:
+    """Returns a distfiles.xml like mirror list of about this many
+    endpoints, the same for the same seed.
+
+    @param endpoints: int, the number of endpoints
+    @param seed: int, of the random choices
+    @rtype: string
+    """
+    rand = random.Random(seed)
+    groups: list[list[str]] = [[] for _ in range(COUNTRIES)]
+    count = mirror = 0
+    while count < endpoints:
+        lines = [f"    <name>Mirror {mirror}</name>"]
+        protocols = [p for p, share in PROTOCOLS if rand.random() < share]
+        for protocol in (protocols or ["http"])[: endpoints - count]:
+            ipv6 = "y" if rand.random() < 0.6 else "n"
+            uri = escape(f"{protocol}://mirror{mirror}.example.org/gentoo/")
+            lines.append(
+                f'    <uri protocol="{protocol}" ipv4="y" ipv6="{ipv6}" '
+                f'partial="n">{uri}</uri>'
+            )
+            count += 1
+        groups[mirror % COUNTRIES].append(
+            "  <mirror>\n" + "\n".join(lines) + "\n  </mirror>"
+        )
+        mirror += 1
+
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>', "<mirrors>"]
+    for number, mirrors in enumerate(groups):
+        if not mirrors:
+            continue
+        region = REGIONS[number % len(REGIONS)]
+        parts.append(
+            f'<mirrorgroup region={quoteattr(region)} country="C{number}" '
+            f"countryname={quoteattr(f'Country {number}')}>"
+        )
+        parts.extend(mirrors)
+        parts.append("</mirrorgroup>")
+    parts.append("</mirrors>")
+    return "\n".join(parts)
+
+
+def source_version() -> str:
+    """Returns the version of the mirrorselect benchmarked, read from
+    meson.build when running from an unconfigured source tree."""
+    if not version.startswith("@"):
+        return version
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        with open(os.path.join(root, "meson.build"), encoding="utf-8") as f:
+            match = re.search(r"^\s*version\s*:\s*'([^']+)'", f.read(), re.M)
+    except OSError:
+        match = None
+    return match.group(1) if match else "unknown"
+
+
+def operations(text: str, mirrorset: MirrorSet) -> dict[str, Callable[[], object]]:
+    """Returns the benchmarked operations on the mirror list, by name."""
+    return {
+        "parse": lambda: MirrorParser3.parse(text),
+        "preferring_protocols": lambda: mirrorset.preferring_protocols(
+            ["https", "http"]
+        ),
+        "only_protocol": lambda: mirrorset.only_protocol("rsync"),
+        "with_country": lambda: mirrorset.with_country(COUNTRY),
+        "with_region": lambda: mirrorset.with_region(REGION),
+        "mirrors": mirrorset.mirrors,
+    }
+
+
+def measure(operation: Callable[[], object], repeat: int) -> dict:
+    """Times an operation, then traces the memory it allocates.
+
+    The memory is traced in a run of its own, tracemalloc slowing down
+    the timed ones.
+
+    @param operation: callable to benchmark
+    @param repeat: int, the number of timed runs
+    @rtype: dict of the results
+    """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operation()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        operation()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "repeat": repeat,
+        "min": min(times),
+        "median": statistics.median(times),
+        "peak_memory": peak,
+    }
+
+
+def run(sizes: list[int], repeat: int, seed: int, label: str, out=sys.stderr) -> dict:
+    """Runs the benchmarks on mirror lists of each size.
+
+    @param sizes: list of the numbers of endpoints
+    @param repeat: int, the timed runs of each operation
+    @param seed: int, of the synthetic mirror lists
+    @param label: string naming the version benchmarked
+    @param out: file the progress is written to
+    @rtype: dict of the results, saved as JSON by --output
+    """
+    results = []
+    for size in sizes:
+        text = generate_xml(size, seed)
+        mirrorset = MirrorParser3.parse(text)
+        endpoints = len(mirrorset.mirrors())
+        # the large lists are slow to parse, fewer runs are as precise
+        runs = max(1, min(repeat, repeat * 1000 // size))
+        for name, operation in operations(text, mirrorset).items():
+            result = measure(operation, runs)
+            result.update(operation=name, endpoints=endpoints, size=len(text))
+            results.append(result)
+            out.write(
+                "%-22s %7d endpoints  %10.3f ms  %10.1f kB\n"
+                % (name, endpoints, result["min"] * 1000, result["peak_memory"] / 1024)
+            )
+    return {
+        "format": RESULTS_FORMAT,
+        "version": label,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "time": time.time(),
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict, out=sys.stdout):
+    """Prints the ratios of the new results to the old ones, operation by
+    operation, matching the lists by their number of endpoints.
+
+    @param old: dict of the baseline results
+    @param new: dict of the results to compare
+    @param out: file the comparison is written to
+    """
+    baseline = {(r["operation"], r["endpoints"]): r for r in old["results"]}
+    out.write(
+        f"{'operation':<22} {'endpoints':>9}  {'time':>7}  {'memory':>7}  "
+        f"({old['version']} -> {new['version']})\n"
+    )
+    for result in new["results"]:
+        before = baseline.get((result["operation"], result["endpoints"]))
+        if before is None:
+            continue
+        time_ratio = result["min"] / before["min"] if before["min"] else 0
+        memory_ratio = (
+            result["peak_memory"] / before["peak_memory"]
+            if before["peak_memory"]
+            else 0
+        )
+        out.write(
+            "%-22s %9d  %6.2fx  %6.2fx\n"
+            % (result["operation"], result["endpoints"], time_ratio, memory_ratio)
+        )
+
+
+def parse_sizes(text: str) -> list[int]:
+    """Parses a comma separated list of endpoint counts.
+
+    @raises ValueError: on malformed or non positive counts
+    """
+    sizes = [int(size) for size in re.split(r"\s*,\s*", text.strip())]
+    if any(size <= 0 for size in sizes):
+        raise ValueError("the numbers of endpoints must be positive")
+    return sizes
+
+
+def main(argv: list[str]) -> int:
+    parser = OptionParser(
+        usage="%prog [--sizes N,...] [--output FILE] [--compare FILE]",
+        description="Benchmarks parsing synthetic mirror lists and the "
+        "MirrorSet filters, printing the best time and the peak memory of "
+        "each operation.",
+    )
+    parser.add_option(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma separated numbers of endpoints of the mirror lists. "
+        "Defaults to %default.",
+    )
+    parser.add_option(
+        "--repeat",
+        type="int",
+        default=20,
+        help="Timed runs of each operation on the smallest lists, fewer on "
+        "larger ones. Defaults to %default.",
+    )
+    parser.add_option(
+        "--seed",
+        type="int",
+        default=0,
+        help="Seed of the synthetic mirror lists. Defaults to %default.",
+    )
+    parser.add_option(
+        "--label",
+        default=source_version(),
+        help="Name of the version benchmarked in the results, eg. a git "
+        "revision. Defaults to the mirrorselect version, %default.",
+    )
+    parser.add_option(
+        "-o",
+        "--output",
+        metavar="FILE",
+        help="Save the results as JSON to FILE.",
+    )
+    parser.add_option(
+        "--compare",
+        metavar="FILE",
+        help="Compare the results to those saved in FILE by an earlier "
+        "version, printing the ratios of the times and memory.",
+    )
+    options, _ = parser.parse_args(argv[1:])
+    try:
+        sizes = parse_sizes(options.sizes)
+    except ValueError as e:
+        parser.error(f"invalid --sizes: {e}")
+    if options.repeat < 1:
+        parser.error("--repeat must be positive")
+
+    baseline = None
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("format") != RESULTS_FORMAT:
+            parser.error(f"{options.compare} is not in a known results format")
+
+    results = run(sizes, options.repeat, options.seed, options.label)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+            f.write("\n")
+    if baseline is not None:
+        compare(baseline, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
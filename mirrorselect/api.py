@@ -0,0 +1,240 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import sys
+import threading
+import time
+from collections.abc import Callable
+from optparse import OptionValueError
+from typing import Any, NamedTuple, TextIO
+
+from mirrorselect.connection import ProbeCache
+from mirrorselect.errors import InvalidOptionsError, MirrorselectError, NoMirrorsError
+from mirrorselect.extractor import Extractor
+from mirrorselect.freshness import apply_freshness
+from mirrorselect.main import MirrorSelect
+from mirrorselect.mirrorparser3 import MIRRORS_3_XML, MIRRORS_RSYNC_DATA
+from mirrorselect.mirrorset import Endpoint, MirrorSet
+from mirrorselect.output import Output
+from mirrorselect.scoring import ProbeStats
+from mirrorselect.selectors import Deep, Shallow
+
+# Seconds a downloaded mirror list is used for.
+MIRROR_LIST_MAX_AGE = 3600
+
+MODES = ("deep", "shallow", "all")
+
+# Command line options making no sense for a selection.
+COMMAND_LINE_ONLY = {
+    "all_mirrors",
+    "checkpoint",
+    "daemon",
+    "deep",
+    "interactive",
+    "log_json",
+    "no_daemon",
+    "output",
+    "record",
+    "refresh",
+    "replay",
+    "resume",
+    "servers",
+    "socket",
+    "target",
+    "verbosity",
+    "verify",
+}
+
+
+class Selection(NamedTuple):
+    """The result of a selection."""
+
+    # the selected urls, best first
+    urls: list[str]
+    # the hosts they were selected from
+    hosts: list[Endpoint]
+    # the results of the tested hosts
+    stats: dict[str, ProbeStats]
+
+
+class MirrorSelector:
+    """Selects mirrors from within a long running process, eg. a
+    provisioning service.
+
+    Errors raise a MirrorselectError instead of exiting, and the selection
+    is returned instead of being written to the configuration.  The
+    mirror lists are downloaded at most once per list_max_age seconds, and
+    the tls sessions, distfiles layouts and proxy connections of the deep
+    tests are kept for the following selections.  The deep tests time out
+    their name lookups and connections with SIGALRM, deep selections have
+    to be made from the main thread.
+    """
+
+    def __init__(
+        self,
+        verbosity: int = 0,
+        out: TextIO | Any = sys.stderr,
+        list_max_age: float = MIRROR_LIST_MAX_AGE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """MirrorSelector class init
+
+        @param verbosity: int, the verbosity of the messages written to out
+        @param out: file the messages are written to
+        @param list_max_age: float, seconds a mirror list is used for
+        @param clock: callable returning the current time in seconds
+        """
+        self.output = Output(verbosity, out, raises=True)
+        self._main = MirrorSelect(self.output)
+        self._parser = self._main.build_parser()
+        self._parser_options = {
+            option.dest: option
+            for group in [self._parser, *self._parser.option_groups]
+            for option in group.option_list
+            if option.dest is not None
+        }
+        self._list_max_age = list_max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._lists: dict[str, tuple[float, MirrorSet]] = {}
+        self._cache = ProbeCache()
+
+    def select(self, mode: str = "deep", servers: int = 1, **options: Any) -> Selection:
+        """Selects mirrors.
+
+        @param mode: string, "deep", "shallow" to use netselect, or
+                its unprivileged path probes with hops=True, or "all"
+                for every mirror passing the filters, unranked
+        @param servers: int, the number of mirrors wanted
+        @param options: the command line options by their long name, dashes
+                replaced by underscores, and their values as given on the
+                command line, eg. country="DE", https=True, timeout=5,
+                exclude=[url], filter="ipv6 and region:Europe",
+                byte_budget="20M"
+        @rtype: Selection
+        @raises InvalidOptionsError: on invalid options, or a deep selection
+                from another thread than the main one
+        @raises MirrorListError: when the mirror list can not be had
+        @raises NoMirrorsError: when no mirror was selected
+        """
+        values = self._options(mode, servers, options)
+        list_url = MIRRORS_RSYNC_DATA if values.rsync else MIRRORS_3_XML
+        extractor = Extractor(list_url, values, self.output, self._mirrorset(list_url))
+        with self._lock:
+            if list_url not in self._lists or (
+                self._lists[list_url][1] is not extractor.mirrorset
+            ):
+                self._lists[list_url] = (self._clock(), extractor.mirrorset)
+
+        hosts = extractor.hosts
+        if values.exclude:
+            exclude = set(values.exclude)
+            hosts = [x for x in hosts if x.uri not in exclude]
+        hosts, values.penalties = apply_freshness(hosts, values, self.output)
+
+        stats: dict[str, ProbeStats] = {}
+        if not hosts:
+            urls = []
+        elif mode == "all":
+            urls = sorted(host.uri for host in hosts)
+            if values.rsync:
+                urls = urls[:1]
+        elif mode == "deep":
+            selector = Deep(hosts, values, self.output)
+            urls, stats = selector.urls, selector.stats
+        else:
+            selector = Shallow(hosts, values, self.output)
+            urls, stats = selector.urls, selector.stats
+        if not hosts:
+            raise NoMirrorsError("No mirrors match the filters.")
+        if not urls:
+            raise NoMirrorsError("None of the mirrors could be tested.")
+        return Selection(urls, hosts, stats)
+
+    def _options(self, mode: str, servers: int, options: dict[str, Any]):
+        """Returns the checked options instance of a selection."""
+        if mode not in MODES:
+            raise InvalidOptionsError(f"invalid mode {mode!r}")
+        if mode == "deep" and threading.current_thread() is not threading.main_thread():
+            raise InvalidOptionsError(
+                "deep selections rely on SIGALRM, make them from the main thread"
+            )
+        values = self._parser.get_default_values()
+        for name, value in options.items():
+            if name in COMMAND_LINE_ONLY or not hasattr(values, name):
+                raise InvalidOptionsError(f"unknown option {name!r}")
+            setattr(values, name, self._convert(name, value))
+        values.servers = servers
+        values.deep = mode == "deep"
+        values.all_mirrors = mode == "all"
+        try:
+            self._main.check_options(values, mode != "all")
+        except InvalidOptionsError:
+            raise
+        except MirrorselectError as e:
+            raise InvalidOptionsError(str(e)) from e
+        except (TypeError, AttributeError, ValueError) as e:
+            raise InvalidOptionsError(f"invalid options: {e}") from e
+        values.probe_cache = self._cache
+        return values
+
+    def _convert(self, name: str, value: Any) -> Any:
+        """Converts an option value as the parser converts the command
+        line, eg. 5 or "5" for an int option, checking it.
+
+        @raises InvalidOptionsError: on invalid values
+        """
+        option = self._parser_options.get(name)
+        if option is None or option.type is None or value is None:
+            return value
+        opt = option.get_opt_string()
+        try:
+            if option.action == "append":
+                if isinstance(value, str):
+                    value = [value]
+                return [option.check_value(opt, str(item)) for item in value]
+            return option.check_value(opt, str(value))
+        except (OptionValueError, TypeError) as e:
+            raise InvalidOptionsError(str(e)) from e
+
+    def _mirrorset(self, list_url: str) -> MirrorSet | None:
+        """Returns the mirror list downloaded from list_url, unless too old."""
+        with self._lock:
+            fetched = self._lists.get(list_url)
+        if fetched is None or self._clock() - fetched[0] > self._list_max_age:
+            return None
+        return fetched[1]
+
+    def close(self):
+        """Closes the connections kept for the deep tests."""
+        self._cache.close()
+
+
+def select_mirrors(mode: str = "deep", servers: int = 1, **options: Any) -> list[str]:
+    """Selects mirrors once, see MirrorSelector.select().
+
+    @rtype: list of the selected urls, best first
+    """
+    selector = MirrorSelector()
+    try:
+        return selector.select(mode, servers, **options).urls
+    finally:
+        selector.close()
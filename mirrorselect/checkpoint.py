@@ -0,0 +1,201 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections.abc import Callable
+from optparse import Values
+
+from mirrorselect.scoring import ProbeStats
+
+# Seconds the results of a checkpoint stay fresh enough to --resume with.
+CHECKPOINT_MAX_AGE = 3600
+
+# Options changing what a deep test measures, results are only resumed
+# from runs with the same values.
+MEASURED_OPTIONS = [
+    "file",
+    "md5",
+    "blake2b",
+    "sha512",
+    "timeout",
+    "ipv4",
+    "ipv6",
+    "dual_stack",
+    "proxy",
+    "workload_samples",
+    "workload_max_size",
+    "sizes",
+]
+
+
+def run_key(options: Values) -> str:
+    """Returns a fingerprint of the options changing what is measured.
+
+    @param options: parser.parse_args() options instance
+    @rtype: string
+    """
+    settings = {name: getattr(options, name, None) for name in MEASURED_OPTIONS}
+    if getattr(options, "workload", None):
+        settings["workload"] = sorted((e.name, e.size) for e in options.workload)
+    text = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class Checkpoint:
+    """Appends the result of each probe to a file of JSON lines as soon
+    as it completes, and reads back the fresh results of an interrupted
+    run with the same settings.  Safe to use from several threads.
+
+    The bail out time of each probe is kept with its result, results which
+    would not hold at the bail out time of the resumed run, eg. one run
+    with a different -s, are tested again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        key: str,
+        resume: bool = False,
+        max_age: float = CHECKPOINT_MAX_AGE,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Checkpoint class init, starts a new checkpoint file unless
+        resuming.
+
+        @param path: string, path of the checkpoint file
+        @param key: string, the run_key() of the settings
+        @param resume: boolean, load the results already in the file
+        @param max_age: float, seconds after which results are stale
+        @param clock: callable returning the time since the epoch
+        @raises OSError: when the file can not be opened
+        """
+        self.path = path
+        self.key = key
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.results: dict[str, tuple[ProbeStats, float | None, float | None]] = {}
+        if resume:
+            self.results = self.load(max_age)
+        self._file = open(path, "a" if resume else "w", buffering=1, encoding="utf-8")
+
+    @classmethod
+    def from_options(cls, options: Values) -> "Checkpoint | None":
+        """Returns the Checkpoint of the command line options, or None
+        without --checkpoint.
+
+        @param options: parser.parse_args() options instance
+        @raises OSError: when the file can not be opened
+        """
+        if not options.checkpoint:
+            return None
+        return cls(options.checkpoint, run_key(options), options.resume)
+
+    def load(
+        self, max_age: float
+    ) -> dict[str, tuple[ProbeStats, float | None, float | None]]:
+        """Reads the fresh results of this run's settings, the last one of
+        each host.  Malformed lines, eg. one cut short by the interruption,
+        are skipped.
+
+        @param max_age: float, seconds after which results are stale
+        @rtype: dict of host urls to their ProbeStats, test time and bail
+                out time, None if unknown
+        """
+        results: dict[str, tuple[ProbeStats, float | None, float | None]] = {}
+        oldest = self._clock() - max_age
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return results
+        for line in lines:
+            try:
+                record = json.loads(line)
+                if record["key"] != self.key or record["time"] < oldest:
+                    continue
+                mytime = record["mytime"]
+                maxtime = record.get("maxtime")
+                results[record["uri"]] = (
+                    ProbeStats.from_dict(record["stats"]),
+                    None if mytime is None else float(mytime),
+                    None if maxtime is None else float(maxtime),
+                )
+            except (ValueError, KeyError, TypeError):
+                continue
+        return results
+
+    def resume(
+        self, uri: str, maxtime: float
+    ) -> tuple[ProbeStats, float | None] | None:
+        """Returns the result of a host tested before the interruption, if
+        it holds at the current bail out time.
+
+        @param uri: string, the host url
+        @param maxtime: float, seconds after which its test would bail out
+        @rtype: tuple of the ProbeStats and test time, or None to test it
+        """
+        result = self.results.get(uri)
+        if result is None:
+            return None
+        stats, mytime, recorded = result
+        if mytime is None and not stats.outcomes:
+            # a bail out, a higher bail out time might let it complete
+            if recorded is None or maxtime > recorded:
+                return None
+        elif mytime is not None and mytime > maxtime:
+            # it would bail out now
+            return None
+        return (stats, mytime)
+
+    def record(
+        self,
+        uri: str,
+        stats: ProbeStats,
+        mytime: float | None,
+        maxtime: float | None = None,
+    ):
+        """Appends the result of a probe.
+
+        @param uri: string, the host url
+        @param stats: ProbeStats of the probe
+        @param mytime: float, the seconds the test took, or None
+        @param maxtime: float, seconds after which the test would have
+                bailed out
+        """
+        line = json.dumps(
+            {
+                "key": self.key,
+                "time": self._clock(),
+                "uri": uri,
+                "mytime": mytime,
+                "maxtime": maxtime,
+                "stats": stats.to_dict(),
+            }
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -1,2 +1,3 @@
+from .configuration import Configuration
 from .distfilesconfig import DistfilesConfig
 from .rsyncconfig import RsyncConfig
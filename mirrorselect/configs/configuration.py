@@ -30,24 +30,64 @@ import re
 import shlex
 import string
 from abc import ABC, abstractmethod
+from typing import NamedTuple
 
 from mirrorselect.output import Output
 
+REMOTE_MIRROR = re.compile("rsync://|http://|https://|ftp://", re.IGNORECASE)
+
+
+class Assignment(NamedTuple):
+    """A variable assignment found in a config file, with the 1 based
+    line range [begin_line, end_line) it occupies."""
+
+    value: str
+    begin_line: int
+    end_line: int
+
+
+class ConfigFragment(NamedTuple):
+    """A tokenized config file, or one file of a config directory."""
+
+    path: str
+    lines: list[str]
+    assignments: list[Assignment]
+
+    @property
+    def value(self) -> str | None:
+        """The effective value, the last assignment wins."""
+        if not self.assignments:
+            return None
+        return self.assignments[-1].value
+
+    def filtered_lines(self) -> list[str]:
+        """The lines of the fragment with every assignment removed."""
+        return [
+            line
+            for index, line in enumerate(self.lines)
+            if not any(
+                a.begin_line - 1 <= index < a.end_line - 1 for a in self.assignments
+            )
+        ]
+
 
 class Configuration(ABC):
     def __init__(self, var: str, confdir: str):
         self.confdir = confdir
         self.var = var
+        self._fragments: dict[str, tuple[tuple[int, int], ConfigFragment]] = {}
 
     @abstractmethod
     def get_conf_path(self, output: Output) -> str | None:
         pass
 
-    def get_filesystem_mirrors(self, output: Output, config_path: str):
-        """Read the current mirrors and retain mounted filesystems mirrors
+    def scan_lines(self, lines: list[str], path: str = "") -> ConfigFragment:
+        """Tokenizes the lines of a config file once, recording every
+        assignment to var.
 
-        @param config_path: string
-        @rtype list
+        @param lines: list of lines of the file
+        @param path: string, the file the lines were read from
+        @rtype: ConfigFragment
         """
 
         def get_token(lex: shlex.shlex):
@@ -58,54 +98,138 @@ class Configuration(ABC):
                 val = None
             return val
 
-        fsmirrors: list[str] = []
-
-        output.write(f"get_filesystem_mirrors(): config_path = {config_path}\n", 2)
-        try:
-            f = open(config_path)
-        except OSError:
-            return fsmirrors
-
-        """ Search for 'var' in config file and extract value """
-        lex = shlex.shlex(f, posix=True)
+        assignments: list[Assignment] = []
+        lex = shlex.shlex("".join(lines), posix=True)
         lex.wordchars = string.digits + string.ascii_letters + r"~!@#$%*_\:;?,./-+{}"
         lex.quotes = "\"'"
-        p = re.compile("rsync://|http://|https://|ftp://", re.IGNORECASE)
         while True:
             key = get_token(lex)
+            if key is None:
+                break
 
             if key == self.var:
+                begin_line = lex.lineno
                 equ = get_token(lex)
-                if equ != "=":
+                if equ is None:
                     break
+                if equ != "=":
+                    continue
 
                 val = get_token(lex)
                 if val is None:
                     break
+                assignments.append(Assignment(val, begin_line, lex.lineno))
 
-                """ Look for mounted filesystem in value """
-                mirrorlist = val.rsplit()
-                output.write(
-                    f"get_filesystem_mirrors(): mirrorlist = {mirrorlist}\n", 2
-                )
-                for mirror in mirrorlist:
-                    if p.match(mirror) is None:
-                        if os.access(mirror, os.F_OK):
-                            output.write(
-                                "get_filesystem_mirrors(): found file system mirror = %s\n"
-                                % mirror,
-                                2,
-                            )
-                            fsmirrors.append(mirror)
-                        else:
-                            output.write(
-                                "get_filesystem_mirrors(): ignoring non-accessible mirror = %s\n"
-                                % mirror,
-                                2,
-                            )
-                break
-            elif key is None:
-                break
+        return ConfigFragment(path, lines, assignments)
+
+    def scan_file(self, path: str) -> ConfigFragment | None:
+        """Tokenizes a config file, unless it is unchanged since the last scan.
+
+        @param path: string
+        @rtype: ConfigFragment or None if it can not be read
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._fragments.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        # bytes which are not utf-8, eg. a latin-1 comment, are kept
+        # as they are when the file is written back
+        try:
+            with open(path, encoding="utf-8", errors="surrogateescape") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+        fragment = self.scan_lines(lines, path)
+        self._fragments[path] = (key, fragment)
+        return fragment
+
+    @staticmethod
+    def config_files(config_path: str) -> list[str]:
+        """Lists the files making up a config, in the order portage reads them.
+
+        A config may be a single file or a directory of fragments, read
+        recursively in sorted order, skipping hidden and backup~ files.
+
+        @param config_path: string
+        @rtype: list of file paths
+        """
+        if not os.path.isdir(config_path):
+            return [config_path]
+
+        files: list[str] = []
+        for name in sorted(os.listdir(config_path)):
+            if name.startswith(".") or name.endswith("~"):
+                continue
+            path = os.path.join(config_path, name)
+            if os.path.isdir(path):
+                files.extend(Configuration.config_files(path))
+            else:
+                files.append(path)
+        return files
+
+    def find_definition(self, config_path: str) -> ConfigFragment | None:
+        """Finds the fragment holding the effective assignment of var.
+
+        @param config_path: string, a config file or directory
+        @rtype: ConfigFragment or None if var is not set
+        """
+        found = None
+        for path in self.config_files(config_path):
+            fragment = self.scan_file(path)
+            if fragment is not None and fragment.assignments:
+                found = fragment
+        return found
+
+    def get_filesystem_mirrors(self, output: Output, config_path: str):
+        """Read the current mirrors and retain mounted filesystems mirrors
 
-        output.write(f"get_filesystem_mirrors(): fsmirrors = {fsmirrors}\n", 2)
+        @param config_path: string
+        @rtype list
+        """
+        fsmirrors: list[str] = []
+
+        output.write("get_filesystem_mirrors(): config_path = %s\n", 2, config_path)
+        fragment = self.find_definition(config_path)
+        if fragment is None:
+            return fsmirrors
+
+        """ Look for mounted filesystem in value """
+        mirrorlist = fragment.value.rsplit()
+        output.write("get_filesystem_mirrors(): mirrorlist = %s\n", 2, mirrorlist)
+        for mirror in mirrorlist:
+            if REMOTE_MIRROR.match(mirror) is None:
+                if os.access(mirror, os.F_OK):
+                    output.write(
+                        "get_filesystem_mirrors(): found file system mirror = %s\n",
+                        2,
+                        mirror,
+                    )
+                    fsmirrors.append(mirror)
+                else:
+                    output.write(
+                        "get_filesystem_mirrors(): "
+                        "ignoring non-accessible mirror = %s\n",
+                        2,
+                        mirror,
+                    )
+
+        output.write("get_filesystem_mirrors(): fsmirrors = %s\n", 2, fsmirrors)
         return fsmirrors
+
+    def get_remote_mirrors(self, output: Output, config_path: str):
+        """Read the current mirrors and retain the remote ones
+
+        @param config_path: string
+        @rtype list
+        """
+        fragment = self.find_definition(config_path)
+        if fragment is None:
+            return []
+        mirrors = [m for m in fragment.value.split() if REMOTE_MIRROR.match(m)]
+        output.write("get_remote_mirrors(): mirrors = %s\n", 2, mirrors)
+        return mirrors
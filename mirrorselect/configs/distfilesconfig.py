@@ -27,16 +27,12 @@ Distributed under the terms of the GNU General Public License v2
 
 import os
 import os.path
-import shlex
-import shutil
-import string
 from optparse import Values
 
 from mirrorselect.extractor import Extractor
 from mirrorselect.mirrorparser3 import MIRRORS_3_XML
 from mirrorselect.output import Output
 
-letters = string.ascii_letters
 from .configuration import Configuration
 
 
@@ -55,72 +51,65 @@ class DistfilesConfig(Configuration):
         return config_path
 
     def filter_config(self, config):
-        lines = config.readlines()
-        config.seek(0)
-        lex = shlex.shlex(config, posix=True)
-        lex.wordchars = string.digits + letters + r"~!@#$%*_\:;?,./-+{}"
-        lex.quotes = "\"'"
-        while True:
-            key = lex.get_token()
-            if key is None:
-                break
-
-            if key == self.var:
-                begin_line = lex.lineno
-                equ = lex.get_token()
-                if equ is None:
-                    break
-                if equ != "=":
-                    continue
-
-                val = lex.get_token()
-                if val is None:
-                    break
-                end_line = lex.lineno
-
-                new_lines = []
-                for index, line in enumerate(lines):
-                    if index < begin_line - 1 or index >= end_line - 1:
-                        new_lines.append(line)
-                lines = new_lines
-                break
-        return lines
+        return self.scan_lines(config.readlines()).filtered_lines()
+
+    def get_write_path(self, config_path: str):
+        """Returns the file to write the new mirrors to.
+
+        For a make.conf directory that is the fragment currently setting
+        the variable, or a new "mirrorselect" fragment if none does.
+
+        @param config_path: string
+        @rtype: string
+        """
+        if not os.path.isdir(config_path):
+            return config_path
+        fragment = self.find_definition(config_path)
+        if fragment is not None:
+            return fragment.path
+        return os.path.join(config_path, "mirrorselect")
 
     def write_config(self, output: Output, config_path: str, hosts: list[str]):
         """Write the make.conf target changes
 
         @param output: file, or output to print messages to
         @param mirror_string: "var='hosts'" string to write
-        @param config_path; string
+        @param config_path; string, the make.conf file or directory
         """
+        is_dir = os.path.isdir(config_path)
+        config_path = self.get_write_path(config_path)
 
         output.write("\n")
         output.print_info(f"Modifying {config_path} with new mirrors...\n")
 
-        try:
-            config = open(config_path, "r", encoding="utf-8")
-        except FileNotFoundError:
+        fragment = self.scan_file(config_path)
+        if fragment is None:
             lines = []
         else:
-            with config:
-                lines = self.filter_config(config)
+            lines = fragment.filtered_lines()
 
         lines.append(self.format_config(hosts) + "\n")
 
         output.write(f"\tWriting new {config_path}\n")
 
+        # portage reads every file in a make.conf directory, except
+        # for backup~ files, so the backup must not look like a fragment
+        backup_path = config_path + ("~" if is_dir else ".backup")
         try:
-            os.rename(config_path, config_path + ".backup")
+            os.rename(config_path, backup_path)
         except FileNotFoundError:
             pass
 
-        with open(config_path, "w", encoding="utf-8") as config:
+        with open(
+            config_path, "w", encoding="utf-8", errors="surrogateescape"
+        ) as config:
             config.writelines(lines)
+        self._fragments.pop(config_path, None)
 
         output.print_info("Done.\n")
 
     def get_available_hosts(self, output: Output, options: Values):
-        output.write(f"using url: {MIRRORS_3_XML}\n", 2)
+        output.write("using url: %s\n", 2, MIRRORS_3_XML)
         return Extractor(MIRRORS_3_XML, options, output).hosts
 
     def format_config(self, hosts: list[str]):
@@ -47,7 +47,7 @@ class RsyncConfig(Configuration):
         return config_path
 
     def get_available_hosts(self, output: Output, options: Values):
-        output.write(f"using url: {MIRRORS_RSYNC_DATA}\n", 2)
+        output.write("using url: %s\n", 2, MIRRORS_RSYNC_DATA)
         return Extractor(MIRRORS_RSYNC_DATA, options, output).hosts
 
     def format_config(self, hosts: list[str]):
@@ -0,0 +1,587 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import base64
+import http.client
+import os
+import select
+import socket
+import ssl
+import threading
+import time
+from typing import Any, NamedTuple
+from urllib.parse import unquote, urlparse
+
+from mirrorselect.version import version
+
+USERAGENT = "Mirrorselect-" + version
+
+# Bytes read from the response at a time.
+CHUNK_SIZE = 64 * 1024
+
+
+class FetchError(OSError):
+    """A fetch that completed with an unexpected HTTP status."""
+
+    def __init__(self, url: str, status: int, reason: str):
+        super().__init__(f"{url}: HTTP {status} {reason}")
+        self.status = status
+
+
+class DeadlineExceeded(TimeoutError):
+    """A fetch that did not complete by its deadline."""
+
+
+class FetchResult(NamedTuple):
+    """The outcome and phase timings, in seconds, of one fetch.
+
+    connect is the tcp connect alone, handshake the tls handshake, zero
+    for http, and total runs from the connect to the end of the transfer.
+    """
+
+    nbytes: int
+    connect: float
+    handshake: float
+    ttfb: float
+    total: float
+    # the tls session to resume the next connection with, and whether
+    # this connection resumed one
+    session: ssl.SSLSession | None = None
+    resumed: bool = False
+    # seconds spent reaching the proxy, not the mirror, and whether the
+    # request went over a pooled connection that was already set up
+    proxy: float = 0.0
+    pooled: bool = False
+
+
+def get_proxies(options) -> dict[str, str]:
+    """Collects the proxies to use for http and https urls, from the
+    -P option or the http_proxy and https_proxy environment variables.
+
+    @param options: parser.parse_args() options instance
+    @rtype: dict of url scheme to proxy url
+    """
+    proxies: dict[str, str] = {}
+    for proxy in ["http_proxy", "https_proxy"]:
+        prox = proxy.split("_")[0]
+        if options.proxy and prox + ":" in options.proxy:
+            proxies[prox] = options.proxy
+        elif os.getenv(proxy):
+            proxies[prox] = os.getenv(proxy)
+    return proxies
+
+
+class _AddressMixin:
+    """Connects to a fixed address instead of resolving the host name,
+    which stays in use for the Host header and TLS."""
+
+    # seconds spent in the tls handshake and reaching a proxy by the
+    # last connect()
+    handshake_time = 0.0
+    proxy_time = 0.0
+
+    def connect(self):
+        self.sock = socket.create_connection(
+            (self._address or self.host, self.port), self.timeout
+        )
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class AddressHTTPConnection(_AddressMixin, http.client.HTTPConnection):
+    def __init__(self, host: str, port: int | None, address: str | None, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self._address = address
+
+
+class AddressHTTPSConnection(_AddressMixin, http.client.HTTPSConnection):
+    def __init__(
+        self,
+        host: str,
+        port: int | None,
+        address: str | None,
+        session: ssl.SSLSession | None = None,
+        **kwargs,
+    ):
+        super().__init__(host, port, **kwargs)
+        self._address = address
+        self._session = session
+
+    def connect(self):
+        super().connect()
+        self._start_tls()
+
+    def _start_tls(self):
+        stime = time.monotonic()
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=self.host, session=self._session
+        )
+        self.handshake_time = time.monotonic() - stime
+
+
+class ProxyHTTPConnection(http.client.HTTPConnection):
+    """A connection to a proxy, for http requests in absolute form."""
+
+    handshake_time = 0.0
+
+    def __init__(self, proxy: "ProxyPool", **kwargs):
+        super().__init__(proxy.host, proxy.port, **kwargs)
+        self.proxy_time = 0.0
+
+    def connect(self):
+        stime = time.monotonic()
+        super().connect()
+        self.proxy_time = time.monotonic() - stime
+
+
+class ProxyTunnelConnection(AddressHTTPSConnection):
+    """An https connection to a host through a CONNECT tunnel of a proxy.
+
+    The round trip to the proxy is estimated from the tcp connect to it,
+    the time of the CONNECT exchange past that is the proxy connecting
+    to the host.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int | None,
+        proxy: "ProxyPool",
+        session: ssl.SSLSession | None = None,
+        **kwargs,
+    ):
+        super().__init__(host, port, None, session, **kwargs)
+        self._proxy = proxy
+
+    def connect(self):
+        stime = time.monotonic()
+        self.sock = socket.create_connection(
+            (self._proxy.host, self._proxy.port), self.timeout
+        )
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        rtt = time.monotonic() - stime
+        ctime = time.monotonic()
+        self._proxy.connect_tunnel(self.sock, self.host, self.port)
+        self.proxy_time = rtt + min(rtt, time.monotonic() - ctime)
+        self._start_tls()
+
+
+class ProxyPool:
+    """Persistent connections through a forward proxy, shared by tests.
+
+    http urls are requested from the proxy in absolute form, over kept
+    alive connections to it shared by every host.  https urls go through
+    a CONNECT tunnel per host, kept for later requests to the same host.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, proxy_url: str):
+        """ProxyPool class init
+
+        @param proxy_url: string, http://[user:password@]host[:port]
+        @raises ValueError: on unsupported proxy urls
+        """
+        if "://" not in proxy_url:
+            proxy_url = "http://" + proxy_url
+        parts = urlparse(proxy_url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"unsupported proxy: {proxy_url}")
+        self.url = proxy_url
+        self.host = parts.hostname
+        self.port = parts.port or http.client.HTTP_PORT
+        self.headers: dict[str, str] = {}
+        if parts.username:
+            credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            self.headers["Proxy-Authorization"] = "Basic " + base64.b64encode(
+                credentials.encode()
+            ).decode("ascii")
+        self._lock = threading.Lock()
+        self._idle: dict[tuple, list[http.client.HTTPConnection]] = {}
+
+    def connection(
+        self,
+        url: str,
+        timeout: float = 10,
+        context: ssl.SSLContext | None = None,
+        session: ssl.SSLSession | None = None,
+    ) -> http.client.HTTPConnection:
+        """Returns a pooled connection for the url, connected already, or
+        a new unconnected one.  Hand it back with release() once its
+        response has been read.
+        """
+        parts = urlparse(url)
+        if parts.scheme == "https":
+            key: tuple = (parts.hostname, parts.port)
+        elif parts.scheme == "http":
+            key = ()
+        else:
+            raise ValueError(f"unsupported url scheme: {url}")
+
+        conn = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle and conn is None:
+                conn = idle.pop()
+                # an idle connection with something to read was closed
+                # by the proxy or the host meanwhile
+                if select.select([conn.sock], [], [], 0)[0]:
+                    conn.close()
+                    conn = None
+        if conn is not None:
+            conn.timeout = timeout
+            conn.sock.settimeout(timeout)
+        elif key:
+            conn = ProxyTunnelConnection(
+                parts.hostname,
+                parts.port,
+                self,
+                session,
+                timeout=timeout,
+                context=context or ssl.create_default_context(),
+            )
+        else:
+            conn = ProxyHTTPConnection(self, timeout=timeout)
+        conn.pool_key = key
+        return conn
+
+    def release(self, conn: http.client.HTTPConnection):
+        """Keeps a connection for reuse, unless the server closed it."""
+        if conn.sock is None:
+            return
+        with self._lock:
+            self._idle.setdefault(conn.pool_key, []).append(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def connect_tunnel(self, sock: socket.socket, host: str, port: int | None):
+        """Asks the proxy for a tunnel to host over a connected socket.
+
+        @raises FetchError: when the proxy refuses
+        """
+        target = f"{host}:{port or http.client.HTTPS_PORT}"
+        lines = [f"CONNECT {target} HTTP/1.1", f"Host: {target}"]
+        lines += [f"{k}: {v}" for k, v in self.headers.items()]
+        sock.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        response = http.client.HTTPResponse(sock, method="CONNECT")
+        try:
+            response.begin()
+        finally:
+            response.close()
+        if response.status != 200:
+            raise FetchError(self.url, response.status, response.reason)
+
+
+class ProbeCache:
+    """What the deep tests learn that is worth keeping between selections
+    of a long running process: the tls sessions of the mirrors, their
+    distfiles layouts and the connections to the proxies.  Safe to use
+    from several threads.
+    """
+
+    def __init__(self):
+        self.ssl_context = ssl.create_default_context()
+        self.sessions: dict[str, ssl.SSLSession] = {}
+        self.layouts: dict[str, Any] = {}
+        self._pools: dict[str, ProxyPool] = {}
+        self._lock = threading.Lock()
+
+    def proxy_pool(self, proxy_url: str) -> ProxyPool:
+        """Returns the connection pool of a proxy, shared by every scheme
+        going through it.
+
+        @param proxy_url: string, http://[user:password@]host[:port]
+        @raises ValueError: on unsupported proxy urls
+        """
+        with self._lock:
+            if proxy_url not in self._pools:
+                self._pools[proxy_url] = ProxyPool(proxy_url)
+            return self._pools[proxy_url]
+
+    def close(self):
+        """Closes the proxy connections, the sessions and layouts are
+        kept."""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+
+
+def open_connection(
+    url: str,
+    address: str | None = None,
+    timeout: float = 10,
+    context: ssl.SSLContext | None = None,
+    session: ssl.SSLSession | None = None,
+) -> http.client.HTTPConnection:
+    """Returns an unconnected http(s) connection for the url's host.
+
+    @param url: string, http or https url
+    @param address: string, ip address to connect to instead of the
+            address the host name resolves to
+    @param timeout: float, seconds allowed for each socket operation
+    @param context: ssl.SSLContext for https urls, or None for the default
+    @param session: ssl.SSLSession to resume, it must come from context
+    @rtype: http.client.HTTPConnection
+    """
+    parts = urlparse(url)
+    if parts.scheme == "https":
+        return AddressHTTPSConnection(
+            parts.hostname,
+            parts.port,
+            address,
+            session,
+            timeout=timeout,
+            context=context or ssl.create_default_context(),
+        )
+    if parts.scheme == "http":
+        return AddressHTTPConnection(
+            parts.hostname, parts.port, address, timeout=timeout
+        )
+    raise ValueError(f"unsupported url scheme: {url}")
+
+
+def fetch(
+    url: str,
+    address: str | None = None,
+    timeout: float = 10,
+    deadline: float | None = None,
+    hasher: Any = None,
+    context: ssl.SSLContext | None = None,
+    session: ssl.SSLSession | None = None,
+    method: str = "GET",
+    proxy: ProxyPool | None = None,
+) -> FetchResult:
+    """Downloads a url, timing the connection, the tls handshake, the
+    first byte of the response and the whole transfer.
+
+    Unlike urlopen this uses no signals, so fetches may run in threads.
+    Sharing one context and passing the session of an earlier fetch from
+    the same host saves the full handshake on https.  Through a proxy,
+    http requests ask the proxy not to answer from its cache.
+
+    @param url: string, http or https url
+    @param address: string, ip address to connect to, or None to resolve
+    @param timeout: float, seconds allowed for each socket operation
+    @param deadline: float, time.monotonic() value the whole fetch
+            must complete by, or None
+    @param hasher: optional hashlib object updated with the content
+    @param context: ssl.SSLContext for https urls, or None for the default
+    @param session: ssl.SSLSession to resume, it must come from context
+    @param method: string, the request method, eg. HEAD to only connect
+    @param proxy: ProxyPool to fetch through, address is then ignored
+    @rtype: FetchResult
+    @raises OSError: on failures, DeadlineExceeded past the deadline and
+            FetchError on an HTTP status other than 200
+    """
+    parts = urlparse(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    def remaining():
+        if deadline is None:
+            return timeout
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise DeadlineExceeded(f"{url}: deadline exceeded")
+        return min(timeout, left)
+
+    headers = {"User-Agent": USERAGENT}
+    if proxy is None:
+        conn = open_connection(url, address, remaining(), context, session)
+    else:
+        conn = proxy.connection(url, remaining(), context, session)
+        if parts.scheme == "http":
+            path = parts._replace(fragment="").geturl()
+            headers.update(proxy.headers)
+            headers.update(
+                {
+                    "Host": parts.netloc,
+                    "Cache-Control": "no-cache",
+                    "Pragma": "no-cache",
+                }
+            )
+    try:
+        pooled = conn.sock is not None
+        stime = time.monotonic()
+        handshake = proxy_time = 0.0
+        if not pooled:
+            conn.connect()
+            handshake = conn.handshake_time
+            proxy_time = conn.proxy_time
+        connect = time.monotonic() - stime - handshake - proxy_time
+        # the connection lets go of its socket once the response is
+        # known to be its last, the response keeps reading from it
+        sock = conn.sock
+
+        sock.settimeout(remaining())
+        rtime = time.monotonic()
+        conn.request(method, path, headers=headers)
+        response = conn.getresponse()
+        ttfb = time.monotonic() - rtime
+        if response.status != 200:
+            raise FetchError(url, response.status, response.reason)
+        # tls 1.3 session tickets arrive after the handshake, by now
+        # they have been read along with the response headers
+        resumed = False
+        if isinstance(sock, ssl.SSLSocket):
+            session = sock.session
+            resumed = not pooled and sock.session_reused
+
+        nbytes = 0
+        while True:
+            if response.isclosed():
+                break
+            sock.settimeout(remaining())
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            nbytes += len(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+        total = time.monotonic() - stime
+    except TimeoutError as e:
+        conn.close()
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded(f"{url}: deadline exceeded") from e
+        raise
+    except (http.client.HTTPException, ssl.CertificateError) as e:
+        conn.close()
+        raise OSError(f"{url}: {e!r}") from e
+    except BaseException:
+        conn.close()
+        raise
+
+    if proxy is None:
+        conn.close()
+    else:
+        proxy.release(conn)
+    return FetchResult(
+        nbytes, connect, handshake, ttfb, total, session, resumed, proxy_time, pooled
+    )
+
+
+def fetch_ranges(
+    url: str,
+    sizes: list[int],
+    address: str | None = None,
+    timeout: float = 10,
+    deadline: float | None = None,
+    context: ssl.SSLContext | None = None,
+    session: ssl.SSLSession | None = None,
+    proxy: ProxyPool | None = None,
+) -> list[tuple[int, float]]:
+    """Times downloading the first bytes of a url, one range request per
+    size, over one kept alive connection.
+
+    Each transfer is timed from its request to its last byte, the
+    connection is set up beforehand, or again when the server closed it.
+    Servers ignoring ranges send the whole file, it is timed all the same.
+    The transfers the deadline cuts short are left out.
+
+    @param url: string, http or https url
+    @param sizes: list of byte counts to request
+    @param address: string, ip address to connect to, or None to resolve
+    @param timeout: float, seconds allowed for each socket operation
+    @param deadline: float, time.monotonic() value the transfers must
+            complete by, or None
+    @param context: ssl.SSLContext for https urls, or None for the default
+    @param session: ssl.SSLSession to resume, it must come from context
+    @param proxy: ProxyPool to fetch through, address is then ignored
+    @rtype: list of (bytes, seconds) of the completed transfers
+    @raises OSError: on failures, FetchError on an HTTP status other than
+            200 or 206
+    """
+    parts = urlparse(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    def remaining():
+        if deadline is None:
+            return timeout
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise DeadlineExceeded(f"{url}: deadline exceeded")
+        return min(timeout, left)
+
+    headers = {"User-Agent": USERAGENT}
+    transfers: list[tuple[int, float]] = []
+    try:
+        if proxy is None:
+            conn = open_connection(url, address, remaining(), context, session)
+        else:
+            conn = proxy.connection(url, remaining(), context, session)
+            if parts.scheme == "http":
+                path = parts._replace(fragment="").geturl()
+                headers.update(proxy.headers)
+                headers.update(
+                    {
+                        "Host": parts.netloc,
+                        "Cache-Control": "no-cache",
+                        "Pragma": "no-cache",
+                    }
+                )
+    except DeadlineExceeded:
+        return transfers
+    try:
+        for size in sizes:
+            if conn.sock is None:
+                conn.timeout = remaining()
+                conn.connect()
+            sock = conn.sock
+            sock.settimeout(remaining())
+            stime = time.monotonic()
+            conn.request(
+                "GET", path, headers={**headers, "Range": f"bytes=0-{size - 1}"}
+            )
+            response = conn.getresponse()
+            if response.status not in (200, 206):
+                raise FetchError(url, response.status, response.reason)
+            nbytes = 0
+            while not response.isclosed():
+                sock.settimeout(remaining())
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                nbytes += len(chunk)
+            transfers.append((nbytes, time.monotonic() - stime))
+    except TimeoutError:
+        conn.close()
+        if deadline is not None and time.monotonic() >= deadline:
+            return transfers
+        raise
+    except (http.client.HTTPException, ssl.CertificateError) as e:
+        conn.close()
+        raise OSError(f"{url}: {e!r}") from e
+    except BaseException:
+        conn.close()
+        raise
+
+    if proxy is None:
+        conn.close()
+    else:
+        proxy.release(conn)
+    return transfers
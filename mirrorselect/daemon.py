@@ -0,0 +1,278 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import copy
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from optparse import Values
+
+from mirrorselect.errors import MirrorListError
+from mirrorselect.extractor import Extractor
+from mirrorselect.filters import compile_filter
+from mirrorselect.freshness import apply_freshness
+from mirrorselect.mirrorparser3 import MIRRORS_3_XML
+from mirrorselect.mirrorset import Endpoint, MirrorSet
+from mirrorselect.output import Output
+from mirrorselect.fleet import Fleet
+from mirrorselect.scoring import ProbeStats, Scorer, Weights
+from mirrorselect.workload import WorkloadScorer
+from mirrorselect.selectors import Deep
+
+DEFAULT_SOCKET = "/run/mirrorselect.sock"
+
+# Number of observations kept per endpoint in the rolling table.
+SAMPLE_WINDOW = 5
+
+# Seconds the client waits for the daemon before probing by itself.
+CLIENT_TIMEOUT = 2
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers one JSON encoded query per connection."""
+
+    def handle(self):
+        try:
+            query = json.loads(self.rfile.readline())
+            reply = {"urls": self.server.daemon.rank(query)}
+        except (ValueError, KeyError, TypeError) as e:
+            reply = {"error": f"invalid query: {e}"}
+        except LookupError as e:
+            reply = {"error": str(e)}
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, daemon: "MirrorDaemon"):
+        self.daemon = daemon
+        super().__init__(socket_path, _RequestHandler)
+
+
+class MirrorDaemon:
+    """Keeps the parsed mirror list and a rolling table of deep test
+    results in memory, refreshing both in the background, and answers
+    ranking queries over a local unix socket."""
+
+    def __init__(self, options: Values, output: Output, socket_path: str):
+        """MirrorDaemon class init
+
+        @param options: parser.parse_args() options instance
+        @param output: mirrorselect.output.Output() class instance
+        @param socket_path: string, path of the unix socket to listen on
+        """
+        self.output = output
+        self.socket_path = socket_path
+        self._options = options
+        self._interval: int = options.refresh
+        self._lock = threading.Lock()
+        self._mirrorset: MirrorSet | None = None
+        self._results: dict[str, ProbeStats] = {}
+        self._penalties: dict[str, float] = {}
+        # whether every endpoint was tested once, the results of a
+        # partial first refresh are not served
+        self._refreshed = False
+
+    def refresh(self):
+        """Downloads the mirror list again and re-tests every endpoint,
+        updating the result table as each one completes.  The previous
+        list is tested again when it can not be downloaded.
+        """
+        try:
+            full = Extractor(MIRRORS_3_XML, self._options, self.output).mirrorset
+        except MirrorListError as e:
+            with self._lock:
+                full = self._mirrorset
+            if full is None:
+                self.output.print_warn(f"{e}\n")
+                return
+            self.output.print_warn(f"{e} Testing the previous list again.\n")
+        filters = Extractor.get_filters(self._options)
+        mirrorset = full
+        if "filter" in filters:
+            mirrorset = mirrorset.matching(compile_filter(filters["filter"]))
+        if "proto" in filters:
+            mirrorset = mirrorset.only_protocol(filters["proto"])
+        if "country" in filters:
+            mirrorset = mirrorset.with_country(filters["country"])
+        if "region" in filters:
+            mirrorset = mirrorset.with_region(filters["region"])
+
+        # every endpoint is tested, so that queries for any protocol
+        # can be answered, rsync endpoints can not be deep tested.
+        hosts = [h for h in mirrorset.mirrors() if not h.uri.startswith("rsync:")]
+        fresh, penalties = apply_freshness(hosts, self._options, self.output)
+        with self._lock:
+            self._mirrorset = full
+            self._penalties = penalties
+            # stale mirrors dropped with --stale=drop lose their results
+            kept = {h.uri for h in fresh}
+            for host in hosts:
+                if host.uri not in kept:
+                    self._results.pop(host.uri, None)
+        hosts = fresh
+
+        self.output.write("refresh(): testing %s endpoints\n", 2, len(hosts))
+
+        # never bail out early, every endpoint needs a result
+        options = copy.copy(self._options)
+        options.servers = len(hosts)
+        Deep(hosts, options, self.output, on_result=self._add_result)
+        with self._lock:
+            self._refreshed = True
+
+    def _add_result(self, host: Endpoint, stats: ProbeStats):
+        with self._lock:
+            if host.uri not in self._results:
+                self._results[host.uri] = ProbeStats(window=SAMPLE_WINDOW)
+            self._results[host.uri].merge(stats)
+
+    def rank(self, query: dict) -> list[str]:
+        """Returns the fastest urls matching a client query.
+
+        @param query: dict with the "servers", "filters", "ipv4", "ipv6",
+                "exclude", "weights" and "fleet" keys sent by query_daemon()
+        @rtype: list of url strings
+        """
+        weights = self._options.weights
+        if query.get("weights"):
+            weights = Weights(**query["weights"])
+        with self._lock:
+            if self._options.workload:
+                scorer: Scorer = WorkloadScorer(
+                    self._options.workload, weights, self._penalties
+                )
+            else:
+                scorer = Scorer(weights, self._penalties)
+            if self._mirrorset is None:
+                raise LookupError("mirror list not loaded yet")
+            if not self._refreshed:
+                raise LookupError("the first test of the mirrors is not done yet")
+            hosts = Extractor.filter_mirrors(self._mirrorset, query["filters"])
+            exclude = set(query.get("exclude") or [])
+            candidates: dict[str, ProbeStats] = {}
+            untested = 0
+            for host in hosts:
+                if host.uri in exclude:
+                    continue
+                if query.get("ipv4") and not host.ipv4:
+                    continue
+                if query.get("ipv6") and not host.ipv6:
+                    continue
+                if host.uri not in self._results:
+                    untested += 1
+                    continue
+                candidates[host.uri] = self._results[host.uri]
+            ranked = scorer.rank(candidates)
+            if query.get("fleet"):
+                fleet = Fleet(**query["fleet"])
+                ranked = fleet.order(ranked, scorer.scores(candidates))
+
+        if not ranked and untested:
+            raise LookupError("no results for the requested mirrors yet")
+        return ranked[: int(query["servers"])]
+
+    def serve(self):
+        """Serves queries in a background thread, and refreshes the
+        results in this one until interrupted.
+
+        The deep test relies on SIGALRM, so it has to run in the main thread.
+        """
+        if os.path.exists(self.socket_path):
+            if socket_in_use(self.socket_path):
+                self.output.print_err(
+                    f"Another daemon is listening on {self.socket_path}"
+                )
+            # left behind by a daemon which did not exit cleanly
+            os.unlink(self.socket_path)
+        server = _Server(self.socket_path, self)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.output.print_info(f"Listening on {self.socket_path}\n")
+        try:
+            while True:
+                stime = time.time()
+                self.refresh()
+                self.output.print_info(
+                    "Refreshed mirror results in %d seconds\n" % (time.time() - stime)
+                )
+                time.sleep(self._interval)
+        finally:
+            server.shutdown()
+            server.server_close()
+            os.unlink(self.socket_path)
+
+
+def socket_in_use(socket_path: str) -> bool:
+    """Returns whether something answers on the unix socket."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CLIENT_TIMEOUT)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def query_daemon(socket_path: str, options: Values, output: Output):
+    """Asks a running daemon for the fastest mirrors.
+
+    @param socket_path: string, path of the daemon's unix socket
+    @param options: parser.parse_args() options instance
+    @param output: mirrorselect.output.Output() class instance
+    @rtype: list of url strings, or None if no daemon could answer
+    """
+    if not os.path.exists(socket_path):
+        return None
+
+    query = {
+        "servers": options.servers,
+        "filters": Extractor.get_filters(options),
+        "ipv4": options.ipv4,
+        "ipv6": options.ipv6,
+        "exclude": options.exclude,
+        "weights": options.weights._asdict(),
+        "fleet": None,
+    }
+    fleet = Fleet.from_options(options)
+    if fleet is not None:
+        query["fleet"] = {"key": fleet.key, "tolerance": fleet.tolerance}
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CLIENT_TIMEOUT)
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(query).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                reply = json.loads(f.readline())
+    except (OSError, ValueError) as e:
+        output.write("query_daemon(): no answer from %s: %s\n", 2, socket_path, e)
+        return None
+
+    if "error" in reply:
+        output.write("query_daemon(): daemon replied: %s\n", 2, reply["error"])
+        return None
+
+    output.print_info(f"Using results from the daemon at {socket_path}\n")
+    return reply["urls"]
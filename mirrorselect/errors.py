@@ -0,0 +1,36 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+
+class MirrorselectError(Exception):
+    """Base class of the errors reported by mirrorselect."""
+
+
+class InvalidOptionsError(MirrorselectError, ValueError):
+    """Invalid options or option combination."""
+
+
+class MirrorListError(MirrorselectError):
+    """The list of mirrors could not be downloaded or parsed."""
+
+
+class NoMirrorsError(MirrorselectError, LookupError):
+    """No mirror was selected."""
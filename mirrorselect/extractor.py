@@ -25,10 +25,11 @@ Distributed under the terms of the GNU General Public License v2
 
 """
 
-import os
-
 import requests
 
+from mirrorselect.connection import get_proxies
+from mirrorselect.errors import MirrorListError
+from mirrorselect.filters import compile_filter
 from mirrorselect.mirrorparser3 import MirrorParser3
 from mirrorselect.mirrorset import Endpoint, MirrorSet
 from mirrorselect.version import version
@@ -39,73 +40,126 @@ USERAGENT = "Mirrorselect-" + version
 class Extractor:
     """The Extractor employs a MirrorParser3 object to get a list of valid
     mirrors, and then filters them. Only the mirrors that should be tested,
-    based on user input are saved. They will be in the hosts attribute."""
+    based on user input are saved. They will be in the hosts attribute.
+
+    A mirror set downloaded before may be given to filter it again without
+    downloading it.  MirrorListError is raised when the list can not be
+    downloaded or parsed."""
 
-    def __init__(self, list_url: str, options, output):
+    def __init__(
+        self, list_url: str, options, output, mirrorset: MirrorSet | None = None
+    ):
         self.output = output
         self.output.print_info(f"Using url: {list_url}\n")
-        filters = {}
+        filters = self.get_filters(options)
+        for opt in ["country", "region"]:
+            if opt in filters:
+                self.output.print_info(
+                    f'Limiting test to "{opt}={filters[opt]}" hosts. \n'
+                )
+        if "proto" in filters:
+            self.output.print_info(f"Limiting test to {filters['proto']} hosts. \n")
+        if "filter" in filters:
+            self.output.print_info(
+                f'Limiting test to hosts matching "{filters["filter"]}". \n'
+            )
+
+        self.proxies: dict[str, str] = get_proxies(options)
+
+        if mirrorset is None:
+            mirrorset = self.getlist(list_url)
+        self.mirrorset = mirrorset
+        self.hosts: list[Endpoint] = self.filter_mirrors(self.mirrorset, filters)
+
+        self.output.write(
+            "Extractor(): fetched mirrors, %s hosts after filtering\n",
+            2,
+            len(self.hosts),
+        )
+
+    @staticmethod
+    def get_filters(options) -> dict[str, str]:
+        """Collects the country, region, protocol and --filter expression
+        filters from the command line options.
+
+        @param options: parser.parse_args() options instance
+        @rtype: dict
+        """
+        filters: dict[str, str] = {}
         for opt in ["country", "region"]:
             value = getattr(options, opt)
             if value is not None:
                 filters[opt] = value
-                self.output.print_info(f'Limiting test to "{opt}={value}" hosts. \n')
         for opt in ["ftp", "http", "https"]:
             if getattr(options, opt):
                 filters["proto"] = opt
-                self.output.print_info(f"Limiting test to {opt} hosts. \n")
-
-        self.proxies: dict[str, str | None] = {}
-
-        for proxy in ["http_proxy", "https_proxy"]:
-            prox = proxy.split("_")[0]
-            if options.proxy and prox + ":" in options.proxy:
-                self.proxies[prox] = options.proxy
-            elif os.getenv(proxy):
-                self.proxies[prox] = os.getenv(proxy)
-
-        hosts = self.getlist(list_url)
-
+        if options.filter is not None:
+            filters["filter"] = options.filter
+        return filters
+
+    @staticmethod
+    def filter_mirrors(mirrorset: MirrorSet, filters: dict[str, str]):
+        """Applies the country, region and protocol filters to a mirror set.
+        The --filter expression is applied first, to every endpoint, so
+        the preferred protocol is chosen among the matching ones.
+
+        @param mirrorset: MirrorSet instance to filter
+        @param filters: dict of the "country", "region", "proto" and
+                "filter" filters
+        @rtype: list of Endpoint
+        @raises ValueError: on an invalid filter expression
+        """
+        if "filter" in filters:
+            mirrorset = mirrorset.matching(compile_filter(filters["filter"]))
         if "proto" in filters:
-            hosts = hosts.only_protocol(filters["proto"])
+            mirrorset = mirrorset.only_protocol(filters["proto"])
         else:
-            hosts = hosts.preferring_protocols(["https", "http", "ftp", "rsync"])
+            mirrorset = mirrorset.preferring_protocols(
+                ["https", "http", "ftp", "rsync"]
+            )
 
         if "country" in filters:
-            hosts = hosts.with_country(filters["country"])
+            mirrorset = mirrorset.with_country(filters["country"])
         if "region" in filters:
-            hosts = hosts.with_region(filters["region"])
+            mirrorset = mirrorset.with_region(filters["region"])
 
-        self.hosts: list[Endpoint] = hosts.mirrors()
-
-        self.output.write(
-            f"Extractor(): fetched mirrors, {len(self.hosts)} hosts after filtering\n",
-            2,
-        )
+        return mirrorset.mirrors()
 
-    def getlist(self, url: str) -> MirrorSet | None:
+    def getlist(self, url: str) -> MirrorSet:
         """
         Uses the supplied parser to get a list of urls.
         Takes a parser object, url, and filering options.
+
+        @raises MirrorListError: when the list can not be had
         """
 
         self.output.write("getlist(): fetching " + url + "\n", 2)
 
         self.output.print_info("Downloading a list of mirrors...\n")
 
-        response = requests.get(
-            url, timeout=60, proxies=self.proxies, headers={"User-Agent": USERAGENT}
-        )
-        if response:
+        try:
+            response = requests.get(
+                url,
+                timeout=60,
+                proxies=self.proxies,
+                headers={"User-Agent": USERAGENT},
+            )
+        except requests.RequestException as e:
+            self.output.write("getlist(): %s\n", 2, e)
+            response = None
+        if not response:
+            raise MirrorListError(
+                "Could not get mirror list. Check your internet connection."
+            )
+        try:
             mirrorset = MirrorParser3.parse(response.text)
-            if len(mirrorset.mirrors()) == 0:
-                self.output.print_err(
-                    "Could not get mirror list. " "Check your internet connection."
-                )
-
-            self.output.write(f" Got {len(mirrorset.mirrors())} mirrors.\n")
-            return mirrorset
-
-        self.output.print_err(
-            "Could not get mirror list. " "Check your internet connection."
-        )
+        except Exception as e:
+            # the parser raises plain exceptions on missing attributes
+            raise MirrorListError(f"Could not parse the mirror list: {e}") from e
+        if len(mirrorset.mirrors()) == 0:
+            raise MirrorListError(
+                "Could not get mirror list. Check your internet connection."
+            )
+
+        self.output.write(f" Got {len(mirrorset.mirrors())} mirrors.\n")
+        return mirrorset
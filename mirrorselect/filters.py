@@ -0,0 +1,279 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The --filter expression language, eg.
+
+    DE or NL or FR, https, ipv6, not *.example.net
+
+Terms are combined with "not", "and" (or juxtaposition), "or" and, with
+the lowest precedence, ",", which also means and.  Parentheses group.
+A term is either key:value or a bare word:
+
+    country:VALUE   country code or name
+    region:VALUE    region, eg. region:"North America"
+    proto:VALUE     protocol, http, https, ftp or rsync
+    host:GLOB       host name glob, or host:/REGEX/
+    ipv4, ipv6      endpoints reachable over ipv4 or ipv6
+
+Bare protocol names are protocols, two letter words country codes, words
+containing a dot or a glob character host globs, /REGEX/ host regexes and
+any other word a country name or region.  Matching ignores case.
+"""
+
+import fnmatch
+import functools
+import re
+from collections.abc import Callable
+
+from mirrorselect.mirrorset import Endpoint
+
+Predicate = Callable[[Endpoint], bool]
+
+PROTOCOLS = frozenset(["http", "https", "ftp", "rsync"])
+
+KEYS = frozenset(["country", "region", "proto", "host"])
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<punct>[(),])
+        | (?P<word>(?:[a-z]+:)?(?:"[^"]*"|'[^']*'|/(?:\\.|[^/\\])*/|[^\s(),"']+))
+    )""",
+    re.VERBOSE | re.IGNORECASE,
+)
+
+
+def host_of(uri: str) -> str:
+    """Returns the lower case host name of a uri, quicker than urlparse."""
+    netloc = uri.partition("://")[2].partition("/")[0].rpartition("@")[2]
+    if netloc.startswith("["):
+        return netloc[1 : netloc.find("]")].lower()
+    return netloc.partition(":")[0].lower()
+
+
+def _tokenize(text: str) -> list[str]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"unexpected {text[pos:pos + 10]!r}")
+        tokens.append(match.group("punct") or match.group("word"))
+        pos = match.end()
+        # skip the trailing blanks, so the loop ends at the end of text
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+    return tokens
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+class _In:
+    """Matches one lower cased Endpoint field against a set of values,
+    "or" of these on the same field merge into a single set lookup."""
+
+    def __init__(self, field: Callable[[Endpoint], str], name: str, values):
+        self.field = field
+        self.name = name
+        self.values = frozenset(values)
+
+    def __call__(self, endpoint: Endpoint) -> bool:
+        return self.field(endpoint) in self.values
+
+
+def _country(endpoint: Endpoint) -> str:
+    return endpoint.country.lower()
+
+
+def _country_code(endpoint: Endpoint) -> str:
+    return endpoint.country_code.lower()
+
+
+def _region(endpoint: Endpoint) -> str:
+    return endpoint.region.lower()
+
+
+def _protocol(endpoint: Endpoint) -> str:
+    return endpoint.protocol.lower()
+
+
+def _host(endpoint: Endpoint) -> str:
+    return host_of(endpoint.uri)
+
+
+def _host_pattern(pattern: str) -> Predicate:
+    if len(pattern) >= 2 and pattern[0] == pattern[-1] == "/":
+        try:
+            search = re.compile(pattern[1:-1], re.IGNORECASE).search
+        except re.error as e:
+            raise ValueError(f"invalid regex {pattern!r}: {e}") from e
+        return lambda endpoint: search(_host(endpoint)) is not None
+    if not any(c in pattern for c in "*?["):
+        return _In(_host, "host", [pattern.lower()])
+    match = re.compile(fnmatch.translate(pattern.lower())).match
+    return lambda endpoint: match(_host(endpoint)) is not None
+
+
+def _term(word: str) -> Predicate:
+    key, sep, value = word.partition(":")
+    if sep and key.lower() in KEYS and not word.startswith(("/", '"', "'")):
+        key = key.lower()
+        value = _unquote(value)
+        if not value:
+            raise ValueError(f"empty value in {word!r}")
+        if key == "host":
+            return _host_pattern(value)
+        if key == "proto":
+            if value.lower() not in PROTOCOLS:
+                raise ValueError(f"unknown protocol {value!r}")
+            return _In(_protocol, "proto", [value.lower()])
+        if key == "region":
+            return _In(_region, "region", [value.lower()])
+        if len(value) == 2:
+            return _or(
+                [
+                    _In(_country_code, "cc", [value.lower()]),
+                    _In(_country, "country", [value.lower()]),
+                ]
+            )
+        return _In(_country, "country", [value.lower()])
+
+    value = _unquote(word)
+    lower = value.lower()
+    if lower == "ipv4":
+        return lambda endpoint: endpoint.ipv4
+    if lower == "ipv6":
+        return lambda endpoint: endpoint.ipv6
+    if lower in PROTOCOLS:
+        return _In(_protocol, "proto", [lower])
+    if value.startswith("/") or "." in value or any(c in value for c in "*?["):
+        return _host_pattern(value)
+    if len(value) == 2 and value.isalpha():
+        return _In(_country_code, "cc", [lower])
+    return _or([_In(_country, "country", [lower]), _In(_region, "region", [lower])])
+
+
+def _or(predicates: list[Predicate]) -> Predicate:
+    merged: dict[str, _In] = {}
+    others: list[Predicate] = []
+    for predicate in predicates:
+        if isinstance(predicate, _In):
+            if predicate.name in merged:
+                before = merged[predicate.name]
+                predicate = _In(
+                    predicate.field, predicate.name, before.values | predicate.values
+                )
+            merged[predicate.name] = predicate
+        else:
+            others.append(predicate)
+    predicates = list(merged.values()) + others
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda endpoint: any(p(endpoint) for p in predicates)
+
+
+def _and(predicates: list[Predicate]) -> Predicate:
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda endpoint: all(p(endpoint) for p in predicates)
+
+
+class _Parser:
+    """Recursive descent parser building the predicate as it goes."""
+
+    def __init__(self, tokens: list[str]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> str | None:
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None
+
+    def keyword(self) -> str | None:
+        token = self.peek()
+        return token.lower() if token is not None else None
+
+    def take(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise ValueError("unexpected end of expression")
+        self.pos += 1
+        return token
+
+    def parse(self) -> Predicate:
+        predicate = self.commas()
+        if self.peek() is not None:
+            raise ValueError(f"unexpected {self.peek()!r}")
+        return predicate
+
+    def commas(self) -> Predicate:
+        predicates = [self.disjunction()]
+        while self.peek() == ",":
+            self.take()
+            predicates.append(self.disjunction())
+        return _and(predicates)
+
+    def disjunction(self) -> Predicate:
+        predicates = [self.conjunction()]
+        while self.keyword() == "or":
+            self.take()
+            predicates.append(self.conjunction())
+        return _or(predicates)
+
+    def conjunction(self) -> Predicate:
+        predicates = [self.negation()]
+        while self.keyword() not in (None, "or", ",", ")"):
+            if self.keyword() == "and":
+                self.take()
+            predicates.append(self.negation())
+        return _and(predicates)
+
+    def negation(self) -> Predicate:
+        if self.keyword() == "not":
+            self.take()
+            inner = self.negation()
+            return lambda endpoint: not inner(endpoint)
+        token = self.take()
+        if token == "(":
+            predicate = self.commas()
+            if self.take() != ")":
+                raise ValueError("missing )")
+            return predicate
+        if token in (")", ",") or token.lower() in ("and", "or"):
+            raise ValueError(f"unexpected {token!r}")
+        return _term(token)
+
+
+@functools.lru_cache(maxsize=32)
+def compile_filter(text: str) -> Predicate:
+    """Compiles a filter expression into a predicate of Endpoints.
+
+    @param text: string, the expression
+    @rtype: callable taking an Endpoint and returning a boolean
+    @raises ValueError: on invalid expressions
+    """
+    tokens = _tokenize(text)
+    if not tokens:
+        raise ValueError("empty expression")
+    return _Parser(tokens).parse()
@@ -0,0 +1,105 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import hashlib
+import socket
+from collections.abc import Hashable
+from typing import TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+# Score distance from the best mirror within which mirrors are considered
+# equally good, see scoring.Scorer for the scale.
+DEFAULT_TOLERANCE = 0.25
+
+MACHINE_ID_FILES = ["/etc/machine-id", "/var/lib/dbus/machine-id"]
+
+
+def host_key() -> str:
+    """Returns a stable key of this machine, its machine-id or, lacking
+    one, its host name.
+
+    @rtype: string
+    """
+    for path in MACHINE_ID_FILES:
+        try:
+            with open(path, encoding="ascii") as f:
+                key = f.read().strip()
+        except (OSError, UnicodeDecodeError):
+            continue
+        if key:
+            return key
+    return socket.gethostname()
+
+
+class Fleet:
+    """Spreads the hosts of a fleet over equally good mirrors.
+
+    The mirrors scoring within the tolerance of the best one are ordered
+    by rendezvous hashing of the host key with each mirror.  Every host
+    gets its own, stable, order, hosts are spread evenly over the
+    mirrors, and only the hosts that had a mirror first move when that
+    mirror drops out.
+    """
+
+    def __init__(self, key: str, tolerance: float = DEFAULT_TOLERANCE):
+        """Fleet class init
+
+        @param key: string identifying this host in the fleet
+        @param tolerance: float, score distance from the best mirror
+                within which mirrors are equally good
+        """
+        self.key = key
+        self.tolerance = tolerance
+
+    @classmethod
+    def from_options(cls, options) -> "Fleet | None":
+        """Returns the Fleet of the command line options, or None when
+        fleet mode is off.
+
+        @param options: parser.parse_args() options instance
+        """
+        if not options.fleet:
+            return None
+        return cls(options.host_key or host_key(), options.fleet_tolerance)
+
+    def weight(self, mirror: K) -> int:
+        """The rendezvous hash weight of a mirror for this host."""
+        digest = hashlib.blake2b(
+            f"{self.key}\0{mirror}".encode(), digest_size=8
+        ).digest()
+        return int.from_bytes(digest, "big")
+
+    def order(self, ranked: list[K], scores: dict[K, float]) -> list[K]:
+        """Reorders the mirrors within the tolerance of the best one for
+        this host, the others keep their rank after them.
+
+        @param ranked: list of mirrors, best first
+        @param scores: dict of mirrors to their scores, lower is better
+        @rtype: list of mirrors
+        """
+        scored = [k for k in ranked if k in scores]
+        if not scored:
+            return list(ranked)
+        best = min(scores[k] for k in scored)
+        equal = [k for k in scored if scores[k] <= best + self.tolerance]
+        equal.sort(key=self.weight, reverse=True)
+        return equal + [k for k in ranked if k not in equal]
@@ -0,0 +1,226 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import math
+import os
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from optparse import Values
+from urllib.request import ProxyHandler, build_opener
+
+from mirrorselect.connection import USERAGENT, get_proxies
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.output import Output
+
+# Number of mirrors whose timestamp is fetched at the same time.
+MAX_FRESHNESS_WORKERS = 16
+
+# Timestamp files of distfiles mirrors, relative to the mirror uri, the
+# first one found is used.
+DISTFILES_TIMESTAMPS = [
+    "distfiles/timestamp.mirmon",
+    "distfiles/timestamp.x",
+    "timestamp.x",
+]
+
+# Timestamp file of rsync mirrors, relative to the mirror uri.
+RSYNC_TIMESTAMP = "metadata/timestamp.chk"
+
+# Bytes read of a timestamp file, they hold a single line.
+TIMESTAMP_SIZE = 4096
+
+
+def parse_timestamp(text: str) -> float:
+    """Parses the contents of a timestamp file.
+
+    timestamp.mirmon holds the seconds since the epoch, timestamp.x the
+    same followed by the date, and timestamp.chk an RFC 2822 date, eg.
+    "Sat, 01 Jan 2026 00:00:00 +0000".
+
+    @param text: string
+    @rtype: float, seconds since the epoch
+    @raises ValueError: on unknown contents
+    """
+    text = text.strip()
+    first = text.split(maxsplit=1)[0] if text else ""
+    if first.isdigit():
+        return float(first)
+    try:
+        return parsedate_to_datetime(text).timestamp()
+    except (TypeError, ValueError, IndexError) as e:
+        raise ValueError(f"unknown timestamp {text[:40]!r}") from e
+
+
+def format_lag(seconds: float) -> str:
+    """Formats a lag for humans, eg. "2d 3h", "5h 12m" or "40m"."""
+    minutes = int(seconds // 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+
+class TimestampFetcher:
+    """Fetches the timestamp of a mirror, safe to call from several
+    threads at once."""
+
+    def __init__(self, timeout: float, proxies: dict[str, str] | None = None):
+        """TimestampFetcher class init
+
+        @param timeout: float, seconds allowed for each fetch
+        @param proxies: dict of url schemes to proxy urls
+        """
+        self.timeout = timeout
+        self._opener = build_opener(ProxyHandler(proxies or {}))
+        self._opener.addheaders = [("User-Agent", USERAGENT)]
+
+    @staticmethod
+    def _urljoin(base: str, path: str) -> str:
+        return base.rstrip("/") + "/" + path
+
+    def __call__(self, uri: str) -> float | None:
+        """Returns the timestamp of the mirror, or None when it has none
+        or can not be reached.
+
+        @param uri: string, the mirror uri
+        @rtype: float, seconds since the epoch
+        """
+        if uri.startswith("rsync://"):
+            return self.rsync(uri)
+        for path in DISTFILES_TIMESTAMPS:
+            try:
+                with self._opener.open(
+                    self._urljoin(uri, path), timeout=self.timeout
+                ) as f:
+                    data = f.read(TIMESTAMP_SIZE)
+                return parse_timestamp(data.decode("utf-8", "replace"))
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def rsync(self, uri: str) -> float | None:
+        """Returns the timestamp of an rsync mirror, fetched with rsync."""
+        timeout = str(math.ceil(self.timeout))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "timestamp.chk")
+            cmd = [
+                "rsync",
+                "--no-motd",
+                f"--timeout={timeout}",
+                f"--contimeout={timeout}",
+                self._urljoin(uri, RSYNC_TIMESTAMP),
+                path,
+            ]
+            try:
+                subprocess.run(
+                    cmd, check=True, capture_output=True, timeout=2 * self.timeout
+                )
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    return parse_timestamp(f.read(TIMESTAMP_SIZE))
+            except (OSError, subprocess.SubprocessError, ValueError):
+                return None
+
+
+def check_freshness(
+    uris: list[str],
+    fetch: Callable[[str], float | None],
+    now: float | None = None,
+) -> dict[str, float | None]:
+    """Fetches the timestamps of the mirrors concurrently.
+
+    @param uris: list of mirror uris
+    @param fetch: callable returning the timestamp of a mirror uri,
+            or None, eg. a TimestampFetcher
+    @param now: float, seconds since the epoch, defaults to the time
+            the timestamps were fetched
+    @rtype: dict of mirror uris to their lag in seconds, or None when
+            it is unknown
+    """
+    workers = min(len(uris), MAX_FRESHNESS_WORKERS) or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        stamps = list(executor.map(fetch, uris))
+    if now is None:
+        now = time.time()
+    return {
+        uri: None if stamp is None else max(now - stamp, 0.0)
+        for uri, stamp in zip(uris, stamps)
+    }
+
+
+def stale_penalties(lags: dict[str, float | None], max_lag: float) -> dict[str, float]:
+    """Returns the score penalties of the mirrors lagging more than
+    max_lag, their lag in multiples of max_lag, see scoring.Scorer.
+    Mirrors of unknown lag are not penalized.
+
+    @param lags: dict of mirror uris to their lag in seconds, or None
+    @param max_lag: float, seconds
+    @rtype: dict of mirror uris to penalties
+    """
+    return {
+        uri: lag / max_lag
+        for uri, lag in lags.items()
+        if lag is not None and lag > max_lag
+    }
+
+
+def apply_freshness(
+    hosts: list[Endpoint], options: Values, output: Output
+) -> tuple[list[Endpoint], dict[str, float]]:
+    """Runs the freshness stage of --max-lag before the mirrors are
+    ranked, reporting the stale mirrors.
+
+    @param hosts: list of the candidate hosts
+    @param options: parser.parse_args() options instance
+    @param output: mirrorselect.output.Output() class instance
+    @rtype: tuple of the hosts to rank, without the stale ones with
+            --stale=drop, and the score penalties of the stale ones
+            with --stale=penalize
+    """
+    if options.max_lag is None or not hosts:
+        return hosts, {}
+    output.print_info(f"Checking the freshness of {len(hosts)} mirrors...\n")
+    fetcher = TimestampFetcher(options.timeout, get_proxies(options))
+    lags = check_freshness([h.uri for h in hosts], fetcher)
+    if output.enabled(2):
+        for uri, lag in lags.items():
+            text = "unknown" if lag is None else format_lag(lag)
+            output.write("apply_freshness(): %s lag %s\n", 2, uri, text)
+
+    max_lag = options.max_lag * 3600
+    penalties = stale_penalties(lags, max_lag)
+    if penalties:
+        output.write(
+            f"{len(penalties)} of {len(hosts)} mirrors lag more than "
+            f"{format_lag(max_lag)}:\n"
+        )
+        for uri in sorted(penalties, key=lags.get, reverse=True):
+            output.write(f"  {format_lag(lags[uri]):>8} behind  {uri}\n")
+
+    if options.stale == "drop":
+        return [h for h in hosts if h.uri not in penalties], {}
+    return hosts, penalties
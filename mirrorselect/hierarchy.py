@@ -0,0 +1,189 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+from collections.abc import Callable
+
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.output import Output
+from mirrorselect.scoring import ProbeStats, Scorer
+
+# Number of expansions that must leave the top N unchanged before
+# the search stops.
+STABLE_ROUNDS = 2
+
+
+def group_hosts(hosts: list[Endpoint]) -> dict[tuple[str, str], list[Endpoint]]:
+    """Groups hosts by region and country, keeping their order.
+
+    @param hosts: list of Endpoint
+    @rtype: dict of (region, country) to the list of its hosts
+    """
+    groups: dict[tuple[str, str], list[Endpoint]] = {}
+    for host in hosts:
+        groups.setdefault((host.region, host.country), []).append(host)
+    return groups
+
+
+def group_regions(
+    groups: dict[tuple[str, str], list[Endpoint]],
+) -> dict[str, list[tuple[str, str]]]:
+    """Groups the country groups of group_hosts() by region.
+
+    @param groups: dict of (region, country) to the list of its hosts
+    @rtype: dict of region to the list of its (region, country) keys
+    """
+    regions: dict[str, list[tuple[str, str]]] = {}
+    for key in groups:
+        regions.setdefault(key[0], []).append(key)
+    return regions
+
+
+def sample_hosts(hosts: list[Endpoint], size: int) -> list[Endpoint]:
+    """Picks up to size hosts spread evenly over the list.
+
+    @param hosts: list of Endpoint
+    @param size: int
+    @rtype: list of Endpoint
+    """
+    if len(hosts) <= size:
+        return list(hosts)
+    return [hosts[i * len(hosts) // size] for i in range(size)]
+
+
+def hierarchical_search(
+    hosts: list[Endpoint],
+    number: int,
+    probe: Callable[[list[Endpoint]], dict[str, ProbeStats]],
+    scorer: Scorer,
+    output: Output,
+    samples: int = 1,
+) -> list[str]:
+    """Region and country first search for the best hosts.
+
+    A sample of each region, spread over its countries, is probed first,
+    and only the region of the best of these hosts is searched further.
+    A sample of each of its country groups is probed next.  Then the
+    group holding the best ranked host that still has untested hosts is
+    probed in full, one group at a time, until the top number of hosts
+    has not changed for STABLE_ROUNDS expansions or every host of the
+    region was tested.  The next best region is added while the searched
+    regions hold fewer than number working hosts.
+
+    @param hosts: list of Endpoint to choose from
+    @param number: int, the number of hosts wanted
+    @param probe: callable testing a list of hosts, returning their
+            ProbeStats keyed by uri
+    @param scorer: Scorer used to rank the tested hosts
+    @param output: mirrorselect.output.Output() class instance
+    @param samples: int, number of hosts sampled from each region and
+            from each country group
+    @rtype: list of host urls, best first
+    """
+    groups = group_hosts(hosts)
+    regions = group_regions(groups)
+    group_of = {host.uri: key for key, members in groups.items() for host in members}
+    stats: dict[str, ProbeStats] = {}
+    tested: set[str] = set()
+
+    def run(batch: list[Endpoint]):
+        stats.update(probe(batch))
+        tested.update(host.uri for host in batch)
+
+    def sample_countries(names: set[str]):
+        batch = [
+            host
+            for key, members in groups.items()
+            if key[0] in names
+            for host in sample_hosts(members, samples)
+            if host.uri not in tested
+        ]
+        output.write(
+            "hierarchical_search(): sampling %s hosts of %s\n",
+            2,
+            len(batch),
+            ", ".join(sorted(names)),
+        )
+        run(batch)
+
+    # a sample of each region, at most one host per country
+    first = [
+        host
+        for keys in regions.values()
+        for host in sample_hosts([groups[key][0] for key in keys], samples)
+    ]
+    output.write(
+        "hierarchical_search(): sampling %s hosts of %s regions\n",
+        2,
+        len(first),
+        len(regions),
+    )
+    run(first)
+
+    ranked = scorer.rank(stats)
+    # every region is searched when all of the samples failed
+    chosen = {group_of[ranked[0]][0]} if ranked else set(regions)
+    sample_countries(chosen)
+
+    ranked = scorer.rank(stats)
+    top = ranked[:number]
+    stable = 0
+    while stable < STABLE_ROUNDS or len(top) < number:
+        # expand the group of the best host with untested group members,
+        # groups whose sample all failed are only tried as a last resort
+        candidates = [group_of[uri] for uri in ranked]
+        candidates += [key for key in groups if key not in candidates]
+        expand = next(
+            (
+                key
+                for key in candidates
+                if key[0] in chosen and any(h.uri not in tested for h in groups[key])
+            ),
+            None,
+        )
+        if expand is not None:
+            batch = [host for host in groups[expand] if host.uri not in tested]
+            output.write(
+                "hierarchical_search(): expanding %s with %s hosts\n",
+                2,
+                expand,
+                len(batch),
+            )
+            run(batch)
+        elif len(top) < number and len(chosen) < len(regions):
+            # too few working hosts, add the next best region
+            order = [group_of[uri][0] for uri in ranked] + list(regions)
+            region = next(name for name in order if name not in chosen)
+            chosen.add(region)
+            sample_countries({region})
+        else:
+            break
+
+        ranked = scorer.rank(stats)
+        if ranked[:number] == top:
+            stable += 1
+        else:
+            top = ranked[:number]
+            stable = 0
+
+    output.write(
+        "hierarchical_search(): tested %s of %s hosts\n", 2, len(tested), len(hosts)
+    )
+    return ranked
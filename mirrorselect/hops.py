@@ -0,0 +1,322 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import select
+import socket
+import struct
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+# Linux socket options and constants of the ICMP error queue, see ip(7)
+# and ipv6(7), not all of them are exported by the socket module.
+IP_RECVERR = 11
+IPV6_RECVERR = 25
+MSG_ERRQUEUE = 0x2000
+SO_EE_ORIGIN_ICMP = 2
+SO_EE_ORIGIN_ICMP6 = 3
+ICMP_TIME_EXCEEDED = 11
+ICMP6_TIME_EXCEEDED = 3
+
+# struct sock_extended_err, followed by the address of the offender.
+EXTENDED_ERR = struct.Struct("=IBBBBII")
+
+# Hops probed at most, as traceroute.
+MAX_HOPS = 30
+
+# Probes are sent to this port plus their ttl, the port of the errors
+# tells which probe they are about.
+BASE_PORT = 33434
+
+# Seconds between two probes, routers limit the rate of their errors.
+PROBE_INTERVAL = 0.002
+
+# Seconds the errors are waited for after the last probe.
+PROBE_TIMEOUT = 2.0
+
+# Host names resolved at the same time.
+MAX_RESOLVE_WORKERS = 16
+
+# Attempts at sending a probe, the error of an earlier probe is reported
+# by the next send on the socket.
+SEND_ATTEMPTS = 3
+
+
+class Hop(NamedTuple):
+    """A router on the path to a mirror, answering a probe of this ttl."""
+
+    ttl: int
+    address: str
+    rtt: float
+
+
+class PathResult:
+    """The hops to one address, and whether it was reached."""
+
+    def __init__(self, family: int, address: str):
+        """PathResult class init
+
+        @param family: socket.AF_INET or socket.AF_INET6
+        @param address: string, the address probed
+        """
+        self.family = family
+        self.address = address
+        self.hops: dict[int, Hop] = {}
+        # ttl and round trip times of the probes the address answered
+        self.reached: int | None = None
+        self.rtts: list[float] = []
+        self.error: OSError | None = None
+
+    @property
+    def hop_count(self) -> int | None:
+        """Number of hops to the address, or None if it did not answer."""
+        return self.reached
+
+    def path(self) -> list[Hop | None]:
+        """The hops to the address, ending with the address itself when
+        reached, None for the hops which did not answer."""
+        if self.reached is None:
+            return [
+                self.hops.get(ttl) for ttl in range(1, max(self.hops, default=0) + 1)
+            ]
+        path = [self.hops.get(ttl) for ttl in range(1, self.reached)]
+        return path + [Hop(self.reached, self.address, min(self.rtts))]
+
+    def complete(self) -> bool:
+        """Whether the address and every hop before it answered."""
+        return self.reached is not None and len(self.hops) >= self.reached - 1
+
+
+def resolve(names: list[str], family: int) -> dict[str, tuple[int, str]]:
+    """Resolves the host names concurrently, to their first address.
+
+    @param names: list of host names
+    @param family: socket.AF_INET, socket.AF_INET6 or socket.AF_UNSPEC
+    @rtype: dict of the names resolved to their family and address
+    """
+
+    def lookup(name: str) -> tuple[int, str] | None:
+        try:
+            infos = socket.getaddrinfo(name, None, family, socket.SOCK_DGRAM)
+        except (OSError, UnicodeError):
+            return None
+        for info_family, _, _, _, sockaddr in infos:
+            if info_family in (socket.AF_INET, socket.AF_INET6):
+                return (info_family, sockaddr[0])
+        return None
+
+    workers = min(len(names), MAX_RESOLVE_WORKERS) or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        addresses = dict(zip(names, executor.map(lookup, names)))
+    return {name: a for name, a in addresses.items() if a is not None}
+
+
+def wait_for_errors(sockets: list[socket.socket], timeout: float):
+    """Waits until errors are queued on one of the sockets, or timeout
+    seconds pass.  Queued errors are reported as POLLERR."""
+    poller = select.poll()
+    for sock in sockets:
+        poller.register(sock, select.POLLIN)
+    poller.poll(max(timeout, 0) * 1000)
+
+
+class PathProber:
+    """Measures the hop count and the round trip time to many addresses at
+    once, without privileges.
+
+    UDP probes of increasing ttl are sent to unused ports of each address,
+    interleaved, the ICMP time exceeded errors of the routers and the port
+    unreachable error of the address itself are read from the error queue
+    of the socket (IP_RECVERR, Linux only).  Addresses dropping UDP to
+    unused ports are not reached, as with netselect.
+    """
+
+    def __init__(
+        self,
+        max_hops: int = MAX_HOPS,
+        timeout: float = PROBE_TIMEOUT,
+        interval: float = PROBE_INTERVAL,
+        socket_factory: Callable[[int, int], socket.socket] = socket.socket,
+        clock: Callable[[], float] = time.monotonic,
+        wait: Callable[[list[socket.socket], float], None] = wait_for_errors,
+    ):
+        """PathProber class init
+
+        @param max_hops: int, the highest ttl probed
+        @param timeout: float, seconds errors are waited for after the
+                last probe
+        @param interval: float, seconds between two probes
+        @param socket_factory: callable returning a socket of the family
+                and type, eg. a simulated network in the tests
+        @param clock: callable returning the time in seconds
+        @param wait: callable waiting for errors on the sockets for at
+                most the seconds given
+        """
+        self._max_hops = max_hops
+        self._timeout = timeout
+        self._interval = interval
+        self._socket_factory = socket_factory
+        self._clock = clock
+        self._wait = wait
+
+    def probe(self, targets: list[tuple[int, str]]) -> dict[str, PathResult]:
+        """Probes the paths to the addresses concurrently.
+
+        @param targets: list of (family, address) to probe
+        @rtype: dict of the addresses to their PathResult
+        @raises OSError: when the sockets can not be set up, eg. on
+                systems without IP_RECVERR
+        """
+        results = {address: PathResult(family, address) for family, address in targets}
+        sockets: dict[int, socket.socket] = {}
+        try:
+            for family in {r.family for r in results.values()}:
+                sockets[family] = self._open(family)
+            self._run(results, sockets)
+        finally:
+            for sock in sockets.values():
+                sock.close()
+        return results
+
+    def _open(self, family: int) -> socket.socket:
+        sock = self._socket_factory(family, socket.SOCK_DGRAM)
+        try:
+            if family == socket.AF_INET6:
+                sock.setsockopt(socket.IPPROTO_IPV6, IPV6_RECVERR, 1)
+            else:
+                sock.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _run(self, results: dict[str, PathResult], sockets: dict[int, socket.socket]):
+        # one wave of probes per ttl, so the first probes reaching an
+        # address are those of the lowest ttl, before rate limiting
+        schedule = deque(
+            (ttl, result)
+            for ttl in range(1, self._max_hops + 1)
+            for result in results.values()
+        )
+        sent: dict[tuple[str, int], float] = {}
+        next_send = self._clock()
+        deadline = None
+        while True:
+            now = self._clock()
+            while schedule and now >= next_send:
+                ttl, result = schedule.popleft()
+                if result.error is not None:
+                    continue
+                if result.reached is not None and ttl > result.reached:
+                    continue
+                self._send(sockets[result.family], result, ttl)
+                sent[(result.address, ttl)] = self._clock()
+                next_send = max(next_send, now) + self._interval
+            if not schedule and deadline is None:
+                deadline = now + self._timeout
+            if all(r.complete() or r.error for r in results.values()):
+                return
+            if deadline is not None and now >= deadline:
+                return
+            self._wait(
+                list(sockets.values()),
+                (deadline if deadline is not None else next_send) - now,
+            )
+            for sock in sockets.values():
+                self._read_errors(sock, results, sent)
+
+    def _send(self, sock: socket.socket, result: PathResult, ttl: int):
+        if result.family == socket.AF_INET6:
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_UNICAST_HOPS, ttl)
+        else:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+        for attempt in range(SEND_ATTEMPTS):
+            try:
+                sock.sendto(b"mirrorselect", (result.address, BASE_PORT + ttl))
+                return
+            except OSError as e:
+                if attempt == SEND_ATTEMPTS - 1:
+                    result.error = e
+
+    def _read_errors(
+        self,
+        sock: socket.socket,
+        results: dict[str, PathResult],
+        sent: dict[tuple[str, int], float],
+    ):
+        """Reads the queued errors of the socket into the results."""
+        while True:
+            try:
+                _, ancdata, _, address = sock.recvmsg(
+                    512, 512, MSG_ERRQUEUE | socket.MSG_DONTWAIT
+                )
+            except (BlockingIOError, InterruptedError):
+                return
+            received = self._clock()
+            result = results.get(address[0])
+            ttl = address[1] - BASE_PORT
+            started = sent.get((address[0], ttl))
+            if result is None or started is None:
+                continue
+            for level, kind, data in ancdata:
+                if (level, kind) not in (
+                    (socket.IPPROTO_IP, IP_RECVERR),
+                    (socket.IPPROTO_IPV6, IPV6_RECVERR),
+                ):
+                    continue
+                error = parse_error(data)
+                if error is None:
+                    continue
+                offender, origin, icmp_type = error
+                rtt = received - started
+                if offender == result.address:
+                    # the port unreachable error of the address itself
+                    result.rtts.append(rtt)
+                    if result.reached is None or ttl < result.reached:
+                        result.reached = ttl
+                elif (origin, icmp_type) in (
+                    (SO_EE_ORIGIN_ICMP, ICMP_TIME_EXCEEDED),
+                    (SO_EE_ORIGIN_ICMP6, ICMP6_TIME_EXCEEDED),
+                ):
+                    result.hops[ttl] = Hop(ttl, offender, rtt)
+
+
+def parse_error(data: bytes) -> tuple[str, int, int] | None:
+    """Parses the sock_extended_err of an error queue message.
+
+    @param data: bytes, the ancillary data
+    @rtype: tuple of the offender address, the origin and icmp type of
+            the error, or None for local errors
+    """
+    if len(data) < EXTENDED_ERR.size + 2:
+        return None
+    _, origin, icmp_type, _, _, _, _ = EXTENDED_ERR.unpack_from(data)
+    if origin not in (SO_EE_ORIGIN_ICMP, SO_EE_ORIGIN_ICMP6):
+        return None
+    offender = data[EXTENDED_ERR.size :]
+    (family,) = struct.unpack_from("=H", offender)
+    if family == socket.AF_INET and len(offender) >= 8:
+        return (socket.inet_ntop(socket.AF_INET, offender[4:8]), origin, icmp_type)
+    if family == socket.AF_INET6 and len(offender) >= 24:
+        return (socket.inet_ntop(socket.AF_INET6, offender[8:24]), origin, icmp_type)
+    return None
@@ -0,0 +1,211 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from optparse import Values
+
+from mirrorselect.checkpoint import run_key
+from mirrorselect.mirrorset import Endpoint, EndpointDiff, diff_endpoints
+from mirrorselect.scoring import ProbeStats
+
+# Seconds the results of the previous run are reused for, by default.
+STATE_MAX_AGE = 24 * 3600
+
+
+class Result:
+    """The result of testing one endpoint, as kept for the next run."""
+
+    def __init__(
+        self,
+        endpoint: Endpoint,
+        stats: ProbeStats,
+        mytime: float | None,
+        maxtime: float,
+        tested: float,
+    ):
+        """Result class init
+
+        @param endpoint: the Endpoint tested
+        @param stats: ProbeStats of the test
+        @param mytime: float, the seconds the test took, or None
+        @param maxtime: float, seconds after which the test would bail out
+        @param tested: float, when it was tested, seconds since the epoch
+        """
+        self.endpoint = endpoint
+        self.stats = stats
+        self.mytime = mytime
+        self.maxtime = maxtime
+        self.tested = tested
+
+    def to_dict(self) -> dict:
+        return {
+            "endpoint": self.endpoint._asdict(),
+            "stats": self.stats.to_dict(),
+            "mytime": self.mytime,
+            "maxtime": self.maxtime,
+            "tested": self.tested,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Result":
+        """@raises KeyError, TypeError, ValueError: on malformed data"""
+        mytime = data["mytime"]
+        return cls(
+            Endpoint(**data["endpoint"]),
+            ProbeStats.from_dict(data["stats"]),
+            None if mytime is None else float(mytime),
+            float(data["maxtime"]),
+            float(data["tested"]),
+        )
+
+
+class IncrementalState:
+    """The endpoints and results of the last deep run, kept in a file so
+    that the next run only tests the endpoints added to the mirror list,
+    or changed, since.
+
+    The others keep their result as long as it is fresh.  Tests that
+    bailed out, being slower than the fastest hosts then, are only
+    reused while the bail out time is not higher than it was, eg. the
+    fastest mirrors are still there.  Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        key: str,
+        max_age: float = STATE_MAX_AGE,
+        clock: Callable[[], float] = time.time,
+    ):
+        """IncrementalState class init, loads the state file.
+
+        @param path: string, path of the state file
+        @param key: string, the run_key() of the settings, the results of
+                other settings are not reused
+        @param max_age: float, seconds after which results are stale
+        @param clock: callable returning the time since the epoch
+        """
+        self.path = path
+        self.key = key
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.previous: dict[str, Result] = self.load(max_age)
+        self.results: dict[str, Result] = {}
+
+    @classmethod
+    def from_options(cls, options: Values) -> "IncrementalState | None":
+        """Returns the IncrementalState of the command line options, or
+        None without --incremental.
+
+        @param options: parser.parse_args() options instance
+        """
+        if not options.incremental:
+            return None
+        return cls(
+            options.incremental,
+            run_key(options),
+            options.incremental_max_age * 3600,
+        )
+
+    def load(self, max_age: float) -> dict[str, Result]:
+        """Reads the fresh results of this run's settings.  A missing or
+        malformed file is an empty state.
+
+        @param max_age: float, seconds after which results are stale
+        @rtype: dict of host urls to their Result
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data["key"] != self.key:
+                return {}
+            results = [Result.from_dict(r) for r in data["results"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+        oldest = self._clock() - max_age
+        return {r.endpoint.uri: r for r in results if r.tested >= oldest}
+
+    def diff(self, hosts: list[Endpoint]) -> EndpointDiff:
+        """Compares the hosts to those of the previous run with results."""
+        return diff_endpoints([r.endpoint for r in self.previous.values()], hosts)
+
+    def reuse(
+        self, host: Endpoint, maxtime: float
+    ) -> tuple[ProbeStats, float | None] | None:
+        """Returns the previous result of a host, if it still holds, and
+        keeps it for the next run.
+
+        @param host: the Endpoint to test
+        @param maxtime: float, seconds after which its test would bail out
+        @rtype: tuple of the ProbeStats and test time, or None to test it
+        """
+        result = self.previous.get(host.uri)
+        if result is None or result.endpoint != host:
+            return None
+        if result.mytime is None and not result.stats.outcomes:
+            # a bail out, a higher bail out time might let it complete
+            if maxtime > result.maxtime:
+                return None
+        elif result.mytime is not None and result.mytime > maxtime:
+            # it would bail out now
+            return None
+        with self._lock:
+            self.results[host.uri] = result
+        return (result.stats, result.mytime)
+
+    def record(
+        self, host: Endpoint, stats: ProbeStats, mytime: float | None, maxtime: float
+    ):
+        """Keeps the result of a test for the next run.
+
+        @param host: the Endpoint tested
+        @param stats: ProbeStats of the test
+        @param mytime: float, the seconds the test took, or None
+        @param maxtime: float, seconds after which the test would bail out
+        """
+        result = Result(host, stats, mytime, maxtime, self._clock())
+        with self._lock:
+            self.results[host.uri] = result
+
+    def save(self):
+        """Replaces the state file with the results of this run.
+
+        @raises OSError: when the file can not be written
+        """
+        with self._lock:
+            data = {
+                "key": self.key,
+                "results": [r.to_dict() for r in self.results.values()],
+            }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(prefix=".mirrorselect-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
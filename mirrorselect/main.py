@@ -25,36 +25,79 @@ Distributed under the terms of the GNU General Public License v2
 
 """
 
+import io
 import os
 import socket
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from optparse import Option, OptionParser, Values
+from urllib.parse import urlparse
 
 from mirrorselect.configs import (
+    Configuration,
     DistfilesConfig,
     RsyncConfig,
 )
+from mirrorselect.daemon import DEFAULT_SOCKET, MirrorDaemon, query_daemon
+from mirrorselect.errors import MirrorselectError, NoMirrorsError
+from mirrorselect.filters import compile_filter
+from mirrorselect.fleet import DEFAULT_TOLERANCE
+from mirrorselect.freshness import apply_freshness
+from mirrorselect.incremental import STATE_MAX_AGE
 from mirrorselect.mirrorset import Endpoint
-from mirrorselect.output import ColoredFormatter, Output
-from mirrorselect.selectors import Deep, Interactive, Shallow
+from mirrorselect.output import ColoredFormatter, JsonSink, Output
+from mirrorselect.replay import Recorder, Session
+from mirrorselect.scoring import DEFAULT_WEIGHTS, parse_weights
+from mirrorselect.sizes import parse_size_mix, parse_sizes
+from mirrorselect.selectors import Deep, Interactive, Shallow, Verify
+from mirrorselect.tournament import parse_size
+from mirrorselect.workload import parse_manifest
 from mirrorselect.version import version
 
-
 confdir = "@CONFDIR@"
 if confdir == "@" "CONFDIR@":
     confdir = "/etc"
 
+# Number of targets written to at the same time in multi-target mode.
+MAX_TARGET_WORKERS = 8
+
+
+# md5 of the default test file, mirrorselect-test.
+DEFAULT_TEST_MD5 = "bdf077b2e683c506bf9e8f2494eeb044"
+
+# Options changing what or how the mirrors are tested, the results of a
+# daemon do not reflect them, runs with any of them test by themselves.
+LOCAL_TEST_OPTIONS = [
+    "file",
+    "md5",
+    "blake2b",
+    "sha512",
+    "workload",
+    "sizes",
+    "size_mix",
+    "dual_stack",
+    "time_budget",
+    "byte_budget",
+    "checkpoint",
+    "incremental",
+    "hierarchical",
+    "max_lag",
+    "hops",
+]
+
 
 class MirrorSelect:
     """Main operational class"""
 
-    def __init__(self, output: Output | None = None):
+    def __init__(self, output: Output | None = None, config_dir: str = confdir):
         """MirrorSelect class init
 
         @param output: mirrorselect.output.Ouptut() class instance
                 or None for the default instance
+        @param config_dir: string, the system configuration directory
         """
         self.output = output or Output()
+        self.confdir = config_dir
 
     @staticmethod
     def _have_bin(name: str):
@@ -87,20 +130,78 @@ class MirrorSelect:
         else:
             self.mirror_type.write_config(self.output, config_path, hosts)
 
+    def get_target(self, config_type: type[Configuration], target: str):
+        """Resolves a --target argument to the config to modify.
+
+        A directory is taken as the root of a system, its config is found
+        below the system configuration directory just as for /.  A make.conf
+        directory, or any other path, is taken as the config itself.
+
+        @param config_type: DistfilesConfig or RsyncConfig
+        @param target: string, a root directory or config path
+        @rtype: tuple of the Configuration instance and the config path
+        """
+        name = os.path.basename(os.path.normpath(target))
+        if os.path.isdir(target) and name != "make.conf":
+            config = config_type(os.path.join(target, self.confdir.lstrip(os.sep)))
+            return config, config.get_conf_path(self.output)
+        return config_type(os.path.dirname(target)), target
+
+    def apply_targets(
+        self, targets: list[tuple[str, Configuration, str]], urls: list[str]
+    ):
+        """Writes the selected urls to every target concurrently, keeping
+        the file system mirrors of each, and reports the outcome per target.
+
+        @param targets: list of (target, Configuration, config path) tuples
+        @param urls: list of selected host urls
+        """
+
+        def apply(config: Configuration, config_path: str, log: io.StringIO):
+            output = Output(
+                self.output.verbosity, log, self.output.sink, self.output.raises
+            )
+            fsmirrors = config.get_filesystem_mirrors(output, config_path)
+            config.write_config(output, config_path, fsmirrors + urls)
+
+        logs = [io.StringIO() for _ in targets]
+        with ThreadPoolExecutor(
+            max_workers=min(len(targets), MAX_TARGET_WORKERS)
+        ) as executor:
+            futures = [
+                executor.submit(apply, config, config_path, log)
+                for (_, config, config_path), log in zip(targets, logs)
+            ]
+
+        failed = 0
+        self.output.write("\n")
+        for (target, _, config_path), future, log in zip(targets, futures, logs):
+            self.output.write(log.getvalue(), 2)
+            try:
+                future.result()
+            except (OSError, SystemExit, MirrorselectError) as e:
+                failed += 1
+                reason = log.getvalue().strip() if isinstance(e, SystemExit) else e
+                self.output.write(
+                    f"{self.output.red('FAILED')} {target} ({config_path}): {reason}\n",
+                    0,
+                )
+            else:
+                self.output.write(
+                    f"{self.output.green('OK')} {target} ({config_path})\n"
+                )
+
+        if failed:
+            self.output.print_err(f"{failed} of {len(targets)} targets failed")
+
     @staticmethod
     def write_to_output(mirror_string: str):
         print()
         print(mirror_string)
         sys.exit(0)
 
-    def _parse_args(self, argv: list[str]):
-        """
-        Does argument parsing and some sanity checks.
-        Returns an optparse Options object.
-
-        The descriptions, grouping, and possibly the amount sanity checking
-        need some finishing touches.
-        """
+    def build_parser(self) -> OptionParser:
+        """Returns the parser of the command line options."""
         desc = "\n".join(
             (
                 self.output.white("examples:"),
@@ -112,11 +213,14 @@ class MirrorSelect:
                 "",
                 self.output.white("	 interactive:"),
                 "		 # mirrorselect -i -r",
+                "",
+                self.output.white("	 daemon:"),
+                "		 # mirrorselect --daemon -d2",
             )
         )
 
         def set_servers(option: Option, _, value: str, parser: OptionParser):
-            set_servers.user_configured = True
+            parser.servers_configured = True
             setattr(parser.values, option.dest, value)
 
         parser = OptionParser(
@@ -152,7 +256,18 @@ class MirrorSelect:
             action="store_true",
             default=False,
             help="Interactive Mode, this will present a list "
-            "to make it possible to select mirrors you wish to use.",
+            "to make it possible to select mirrors you wish to use, "
+            "probing them in the background.",
+        )
+        group.add_option(
+            "--daemon",
+            action="store_true",
+            default=False,
+            help="Daemon mode. Keeps the mirror list and deep test results "
+            "in memory, refreshing them in the background, and answers "
+            "queries from other mirrorselect runs over a unix socket. "
+            "Automatic runs use a running daemon instead of testing "
+            "the mirrors themselves.",
         )
 
         group = parser.add_option_group("Server type selection (choose at most one)")
@@ -209,6 +324,14 @@ class MirrorSelect:
         group.add_option(
             "-6", "--ipv6", action="store_true", default=False, help="only use IPv6"
         )
+        group.add_option(
+            "--dual-stack",
+            action="store_true",
+            default=False,
+            help="Deep mode: test IPv4 and IPv6 separately for each mirror, "
+            "rank mirrors on the address family this system prefers and "
+            "warn when that family is much slower than the other",
+        )
 
         group = parser.add_option_group("Other options")
         group.add_option(
@@ -222,6 +345,14 @@ class MirrorSelect:
             "routers which block 40+ requests at any given time. "
             "Recommended parameters to pass are: -s3 -b10",
         )
+        group.add_option(
+            "--hops",
+            action="store_true",
+            default=False,
+            help="Automatic mode: instead of netselect, measure the hop "
+            "count and latency of each mirror with unprivileged UDP probes, "
+            "all mirrors at once. Linux only.",
+        )
         group.add_option(
             "-d",
             "--debug",
@@ -239,16 +370,32 @@ class MirrorSelect:
             help="An alternate file to download for deep testing. "
             "Please choose the file carefully as to not abuse the system "
             "by selecting an overly large size file.  You must also "
-            " use the -m, --md5 option.",
+            " use the -m, --md5 option, or --blake2b or --sha512.",
         )
         group.add_option(
             "-m",
             "--md5",
             action="store",
-            default="bdf077b2e683c506bf9e8f2494eeb044",
+            default=None,
             help="An alternate file md5sum value used to compare the downloaded "
             "file against for deep testing.",
         )
+        group.add_option(
+            "--blake2b",
+            action="store",
+            default=None,
+            metavar="HASH",
+            help="BLAKE2B hash of the -f file, as in Manifests, the download "
+            "is verified against it.",
+        )
+        group.add_option(
+            "--sha512",
+            action="store",
+            default=None,
+            metavar="HASH",
+            help="SHA512 hash of the -f file, as in Manifests, the download "
+            "is verified against it.",
+        )
         group.add_option(
             "-o",
             "--output",
@@ -272,6 +419,13 @@ class MirrorSelect:
             dest="verbosity",
             help="Quiet mode",
         )
+        group.add_option(
+            "--log-json",
+            action="store",
+            default=None,
+            help="Append every message, debug ones included, to this file "
+            "as lines of JSON, whatever the verbosity.",
+        )
         group.add_option(
             "-s",
             "--servers",
@@ -299,15 +453,291 @@ class MirrorSelect:
             default=None,
             help="Exclude host from mirrors list.",
         )
+        group.add_option(
+            "--filter",
+            action="store",
+            default=None,
+            help="Only use the mirrors matching this filter expression, "
+            "eg. 'DE or NL or FR, https, ipv6, not *.example.net'. "
+            "See the man page for the syntax.",
+        )
+        group.add_option(
+            "--hierarchical",
+            action="store_true",
+            default=False,
+            help="Test a sample of the mirrors of each region first, then "
+            "of each country of the best region, then only the remaining "
+            "mirrors of its best countries, until the top servers stop "
+            "changing. Much faster than testing every "
+            "mirror on large mirror lists. Works in automatic and deep mode.",
+        )
+        group.add_option(
+            "--group-samples",
+            action="store",
+            type="int",
+            default=1,
+            help="Number of mirrors sampled from each region and country in "
+            "--hierarchical mode. Defaults to 1.",
+        )
+        group.add_option(
+            "--time-budget",
+            action="store",
+            type="float",
+            default=None,
+            help="Deep mode time budget in seconds. Runs a tournament: "
+            "every mirror gets a quick latency test, the slower half is "
+            "dropped, and the rest are tested with more and more downloads "
+            "until the budget is used up.",
+        )
+        group.add_option(
+            "--byte-budget",
+            action="store",
+            default=None,
+            help="Deep mode download budget, eg. 20M, for the same "
+            "tournament as --time-budget. Both budgets may be combined.",
+        )
+        group.add_option(
+            "-w",
+            "--weights",
+            action="store",
+            default=DEFAULT_WEIGHTS,
+            help="Weights used to rank the tested mirrors, as a comma "
+            "separated list of latency, throughput, failures, variance, "
+            "ipv6 and hops weights. Unlisted weights keep their default. "
+            f"Defaults to {DEFAULT_WEIGHTS}.",
+        )
+        group.add_option(
+            "-W",
+            "--workload",
+            action="append",
+            default=None,
+            help="Deep mode: test the mirrors with the distfiles listed by "
+            "this Manifest, or list of DIST lines, instead of the test file "
+            "and rank them on the projected time fetching all of them takes. "
+            "May be given multiple times.",
+        )
+        group.add_option(
+            "--workload-samples",
+            action="store",
+            type="int",
+            default=2,
+            help="Number of distfiles of the --workload downloaded from each "
+            "mirror. Defaults to 2.",
+        )
+        group.add_option(
+            "--workload-max-size",
+            action="store",
+            default="20M",
+            help="Largest distfile of the --workload downloaded from each "
+            "mirror, eg. 50M. Defaults to 20M.",
+        )
+        group.add_option(
+            "--sizes",
+            action="store",
+            default=None,
+            metavar="LIST",
+            help="Deep mode: also fetch the first bytes of the test file at "
+            "each size of this list, eg. 16k,1M,16M, over one kept alive "
+            "connection per mirror, and rank the mirrors on the expected "
+            "time of fetching a file of --size-mix. Only http(s) mirrors.",
+        )
+        group.add_option(
+            "--size-mix",
+            action="store",
+            default=None,
+            metavar="LIST",
+            help="The sizes of the files fetched and their shares, eg. "
+            "20k:0.9,300M:0.1. Defaults to the distfiles of --workload, or "
+            "to the --sizes in equal shares.",
+        )
+        group.add_option(
+            "--verify",
+            action="store_true",
+            default=False,
+            help="Only test the mirrors already configured, all at once, and "
+            "keep them if they still meet --max-latency and --min-throughput. "
+            "The mirrors are selected anew only when they have degraded.",
+        )
+        group.add_option(
+            "--max-latency",
+            action="store",
+            type="float",
+            default=1.0,
+            help="Highest median latency in seconds of a healthy mirror in "
+            "--verify mode. Defaults to 1.",
+        )
+        group.add_option(
+            "--min-throughput",
+            action="store",
+            default="100k",
+            help="Lowest throughput in bytes per second, eg. 1M, of a healthy "
+            "mirror in --verify mode. Defaults to 100k.",
+        )
+        group.add_option(
+            "--max-lag",
+            action="store",
+            type="float",
+            default=None,
+            help="Check the timestamp file of every mirror first, and "
+            "treat the mirrors lagging more than this many hours behind "
+            "as stale, see --stale.",
+        )
+        group.add_option(
+            "--stale",
+            action="store",
+            type="choice",
+            choices=["drop", "penalize"],
+            default="drop",
+            help="What to do with the stale mirrors of --max-lag: drop "
+            "them, or penalize their score by their lag in multiples of "
+            "--max-lag. Defaults to drop.",
+        )
+        group.add_option(
+            "--checkpoint",
+            action="store",
+            default=None,
+            help="Deep mode: append the result of each mirror to this file "
+            "as soon as it is tested, see --resume.",
+        )
+        group.add_option(
+            "--resume",
+            action="store_true",
+            default=False,
+            help="Resume an interrupted deep run from its --checkpoint file, "
+            "the mirrors tested within the last hour with the same test "
+            "settings are not tested again.",
+        )
+        group.add_option(
+            "--incremental",
+            action="store",
+            default=None,
+            metavar="FILE",
+            help="Deep mode: keep the mirrors tested and their results in "
+            "this file, the next runs only test the mirrors added to the "
+            "mirror list or changed since, see --incremental-max-age.",
+        )
+        group.add_option(
+            "--incremental-max-age",
+            action="store",
+            type="float",
+            default=STATE_MAX_AGE / 3600,
+            metavar="HOURS",
+            help="Hours the results kept by --incremental are reused for, "
+            "the mirrors tested earlier are tested again. Defaults to "
+            f"{STATE_MAX_AGE // 3600}.",
+        )
+        group.add_option(
+            "--record",
+            action="store",
+            default=None,
+            metavar="FILE",
+            help="Record the mirrors to choose from and the raw results of "
+            "every test to this file, to be replayed with --replay.",
+        )
+        group.add_option(
+            "--replay",
+            action="store",
+            default=None,
+            metavar="FILE",
+            help="Select mirrors offline from a session recorded with "
+            "--record, the tests are played back on a simulated clock. "
+            "The selected mirrors are printed, the configuration is left "
+            "untouched.",
+        )
+        group.add_option(
+            "--fleet",
+            action="store_true",
+            default=False,
+            help="Fleet mode, for many hosts selecting mirrors at once: "
+            "order the mirrors scoring within --fleet-tolerance of the "
+            "best one by a consistent hash of --host-key, so the hosts "
+            "spread over them instead of all using the fastest mirror",
+        )
+        group.add_option(
+            "--fleet-tolerance",
+            action="store",
+            type="float",
+            default=DEFAULT_TOLERANCE,
+            help="Score distance from the best mirror within which mirrors "
+            "are equally good in --fleet mode, see --weights. "
+            f"Defaults to {DEFAULT_TOLERANCE}.",
+        )
+        group.add_option(
+            "--host-key",
+            action="store",
+            default=None,
+            help="Key identifying this host in --fleet mode. "
+            "Defaults to the machine-id, or the host name.",
+        )
+        group.add_option(
+            "-T",
+            "--target",
+            action="append",
+            dest="target",
+            default=None,
+            help="Apply the selected mirrors to TARGET instead of this system. "
+            "TARGET is the root directory of another system, eg. a chroot, "
+            "or the path of its make.conf or repos.conf/gentoo.conf. "
+            "May be given multiple times, the mirrors are tested only once.",
+        )
+        group.add_option(
+            "--socket",
+            action="store",
+            default=DEFAULT_SOCKET,
+            help="Unix socket the daemon listens on, and automatic mode "
+            f"asks for results. Defaults to {DEFAULT_SOCKET}.",
+        )
+        group.add_option(
+            "--refresh",
+            action="store",
+            type="int",
+            default=3600,
+            help="Seconds the daemon waits between refreshing its results. "
+            "Defaults to 3600 seconds.",
+        )
+        group.add_option(
+            "--no-daemon",
+            action="store_true",
+            default=False,
+            help="Do not ask a running daemon, always test the mirrors.",
+        )
 
+        return parser
+
+    def _parse_args(self, argv: list[str]):
+        """
+        Does argument parsing and some sanity checks.
+        Returns an optparse Options object.
+
+        The descriptions, grouping, and possibly the amount sanity checking
+        need some finishing touches.
+        """
+        parser = self.build_parser()
         if len(argv) == 1:
             parser.print_help()
             sys.exit(1)
 
         options, args = parser.parse_args(argv[1:])
 
+        if args:
+            self.output.print_err("Unexpected arguments passed.")
+
+        return self.check_options(options, getattr(parser, "servers_configured", False))
+
+    def check_options(self, options: Values, servers_configured: bool) -> Values:
+        """Checks the options, and parses those given as strings.
+
+        @param options: parser.parse_args() options instance
+        @param servers_configured: boolean, whether -s was given
+        @rtype: the options
+        """
         # sanity checks
 
+        # the default test file is verified against its md5, unless
+        # other hashes are given
+        if not (options.md5 or options.blake2b or options.sha512):
+            options.md5 = DEFAULT_TEST_MD5
+
         # hack: check if more than one of these is set
         if options.http + options.https + options.ftp + options.rsync > 1:
             self.output.print_err("Choose at most one of -H, -S, -f and -r")
@@ -319,10 +749,20 @@ class MirrorSelect:
             options.ipv6 = False
             self.output.print_err("The --ipv6 option requires python ipv6 support")
 
+        if options.dual_stack:
+            if options.ipv4 or options.ipv6:
+                self.output.print_err("Choose at most one of --dual-stack, -4 and -6")
+            if not (options.deep or options.daemon):
+                self.output.print_err("--dual-stack requires -D")
+            if not socket.has_ipv6:
+                self.output.print_err(
+                    "The --dual-stack option requires python ipv6 support"
+                )
+
         if options.rsync and not (options.interactive or options.all_mirrors):
             self.output.print_err("rsync servers can only be selected with -i or -a")
 
-        if options.all_mirrors and hasattr(set_servers, "user_configured"):
+        if options.all_mirrors and servers_configured:
             self.output.print_err("Choose at most one of -s or -a")
 
         if (
@@ -332,14 +772,199 @@ class MirrorSelect:
         ):
             self.output.print_err("Invalid option combination with -i")
 
-        if (not options.deep) and (not self._have_bin("netselect")):
+        if options.daemon and (
+            options.interactive or options.all_mirrors or options.rsync
+        ):
+            self.output.print_err("Choose at most one of --daemon, -i, -a and -r")
+
+        if options.hierarchical and options.interactive:
+            self.output.print_err("Invalid option combination with -i")
+
+        if options.fleet and (options.interactive or options.all_mirrors):
+            self.output.print_err("Invalid option combination with --fleet")
+
+        if options.verify and (
+            options.interactive
+            or options.all_mirrors
+            or options.rsync
+            or options.daemon
+            or options.output
+            or options.target
+        ):
+            self.output.print_err("Invalid option combination with --verify")
+
+        try:
+            options.min_throughput = parse_size(options.min_throughput)
+        except ValueError as e:
+            self.output.print_err(f"Invalid --min-throughput: {e}")
+
+        if options.max_latency <= 0:
+            self.output.print_err("--max-latency must be positive")
+
+        if options.workload:
+            if not (options.deep or options.daemon):
+                self.output.print_err("--workload requires -D")
+            if options.dual_stack or options.ftp or options.verify:
+                self.output.print_err("Invalid option combination with --workload")
+            if options.workload_samples < 1:
+                self.output.print_err("--workload-samples must be at least 1")
+            try:
+                options.workload_max_size = parse_size(options.workload_max_size)
+                entries = []
+                for path in options.workload:
+                    with open(path, encoding="utf-8") as f:
+                        entries.extend(parse_manifest(f.readlines()))
+            except (OSError, ValueError) as e:
+                self.output.print_err(f"Invalid --workload: {e}")
+            if not entries:
+                self.output.print_err("--workload lists no distfiles")
+            options.workload = list({e.name: e for e in entries}.values())
+
+        if options.sizes is not None:
+            if not options.deep:
+                self.output.print_err("--sizes requires -D")
+            if options.dual_stack or options.ftp or options.rsync:
+                self.output.print_err("Invalid option combination with --sizes")
+            try:
+                options.sizes = parse_sizes(options.sizes)
+                if options.size_mix is not None:
+                    options.size_mix = parse_size_mix(options.size_mix)
+            except ValueError as e:
+                self.output.print_err(f"Invalid --sizes or --size-mix: {e}")
+            if options.size_mix is None and options.workload:
+                options.size_mix = [
+                    (e.size, 1 / len(options.workload)) for e in options.workload
+                ]
+            elif options.size_mix is None:
+                options.size_mix = [(s, 1 / len(options.sizes)) for s in options.sizes]
+        elif options.size_mix is not None:
+            self.output.print_err("--size-mix requires --sizes")
+
+        if options.fleet_tolerance < 0:
+            self.output.print_err("--fleet-tolerance must not be negative")
+
+        if options.resume and not options.checkpoint:
+            self.output.print_err("--resume requires --checkpoint")
+
+        if options.checkpoint and (
+            not options.deep
+            or options.interactive
+            or options.daemon
+            or options.time_budget is not None
+            or options.byte_budget is not None
+        ):
+            self.output.print_err(
+                "--checkpoint requires -D, without -i, --daemon or a budget"
+            )
+
+        if options.incremental and (
+            not options.deep
+            or options.interactive
+            or options.daemon
+            or options.time_budget is not None
+            or options.byte_budget is not None
+        ):
+            self.output.print_err(
+                "--incremental requires -D, without -i, --daemon or a budget"
+            )
+
+        if options.incremental_max_age <= 0:
+            self.output.print_err("--incremental-max-age must be positive")
+
+        if options.record and options.replay:
+            self.output.print_err("Choose at most one of --record and --replay")
+
+        if (options.record or options.replay) and (
+            options.interactive or options.daemon or options.all_mirrors
+        ):
+            self.output.print_err(
+                "--record and --replay can not be used with -i, -a or --daemon"
+            )
+
+        if options.replay and (
+            options.verify
+            or options.target
+            or options.output
+            or options.checkpoint
+            or options.incremental
+            or options.max_lag is not None
+        ):
+            self.output.print_err("Invalid option combination with --replay")
+
+        if options.filter is not None:
+            try:
+                compile_filter(options.filter)
+            except ValueError as e:
+                self.output.print_err(f"Invalid --filter: {e}")
+
+        if options.max_lag is not None and options.max_lag <= 0:
+            self.output.print_err("--max-lag must be positive")
+
+        if options.group_samples < 1:
+            self.output.print_err("--group-samples must be at least 1")
+
+        if options.target and options.output:
+            self.output.print_err("Choose at most one of -T and -o")
+
+        if options.daemon and options.output:
+            self.output.print_err("Invalid option combination with --daemon")
+
+        if (
+            (not options.deep)
+            and (not options.daemon)
+            and (not options.replay)
+            and (not options.all_mirrors)
+            and (not options.hops)
+            and (not self._have_bin("netselect"))
+        ):
             self.output.print_err(
                 "You do not appear to have netselect on your system. "
-                "You must use the -D flag"
+                "You must use the -D or --hops flag"
             )
 
-        if args:
-            self.output.print_err("Unexpected arguments passed.")
+        if options.hops and (options.deep or options.interactive or options.daemon):
+            self.output.print_err("--hops can not be used with -D, -i or --daemon")
+
+        if options.hops and not sys.platform.startswith("linux"):
+            self.output.print_err("--hops is only supported on Linux")
+
+        try:
+            options.weights = parse_weights(options.weights)
+        except ValueError as e:
+            self.output.print_err(f"Invalid --weights: {e}")
+        # score penalties of the mirrors, set by the --max-lag stage
+        options.penalties = {}
+        # state of the deep tests kept between selections, see api.py
+        options.probe_cache = None
+
+        if options.byte_budget is not None:
+            try:
+                options.byte_budget = parse_size(options.byte_budget)
+            except ValueError as e:
+                self.output.print_err(f"Invalid --byte-budget: {e}")
+
+        if options.time_budget is not None and options.time_budget <= 0:
+            self.output.print_err("--time-budget must be positive")
+
+        if options.time_budget is not None or options.byte_budget is not None:
+            if not options.deep:
+                self.output.print_err("--time-budget and --byte-budget require -D")
+            if options.hierarchical:
+                self.output.print_err(
+                    "Choose at most one of --hierarchical and a budget"
+                )
+
+        if options.replay:
+            try:
+                options.replay = Session.load(options.replay)
+            except (OSError, ValueError) as e:
+                self.output.print_err(f"Invalid --replay: {e}")
+
+        if options.record:
+            try:
+                options.record = Recorder(options.record)
+            except OSError as e:
+                self.output.print_err(f"Invalid --record: {e}")
 
         # return results
         return options
@@ -351,11 +976,16 @@ class MirrorSelect:
         @param options: parser.parse_args() options instance
         @rtype: list
         """
-        hosts = self.mirror_type.get_available_hosts(self.output, options)
+        try:
+            hosts = self.mirror_type.get_available_hosts(self.output, options)
+        except MirrorselectError as e:
+            self.output.print_err(str(e))
 
         if options.exclude:
-            hosts = [x for x in hosts if x[0] not in options.exclude]
+            exclude = set(options.exclude)
+            hosts = [x for x in hosts if x.uri not in exclude]
 
+        hosts, options.penalties = apply_freshness(hosts, options, self.output)
         return hosts
 
     def select_urls(self, hosts: list[Endpoint], options: Values) -> list[str]:
@@ -369,12 +999,77 @@ class MirrorSelect:
         @param options: parser.parse_args() options instance
         @rtype: list
         """
-        if options.interactive:
-            return Interactive(hosts, options, self.output).urls
-        elif options.deep:
-            return Deep(hosts, options, self.output).urls
-        else:
-            return Shallow(hosts, options, self.output).urls
+        try:
+            if options.interactive:
+                return Interactive(hosts, options, self.output).urls
+            elif options.deep:
+                return Deep(hosts, options, self.output).urls
+            else:
+                return Shallow(hosts, options, self.output).urls
+        except NoMirrorsError as e:
+            if options.interactive:
+                # cancelled, the user knows
+                sys.exit(1)
+            self.output.print_err(str(e))
+
+    def replay(self, options: Values):
+        """Selects mirrors from a recorded session, printing them.
+
+        @param options: parser.parse_args() options instance
+        """
+        hosts = options.replay.hosts
+        if options.exclude:
+            exclude = set(options.exclude)
+            hosts = [x for x in hosts if x.uri not in exclude]
+        if options.filter is not None:
+            hosts = list(filter(compile_filter(options.filter), hosts))
+        self.output.print_info(
+            f"Replaying {len(options.replay.observations)} tests of "
+            f"{len(hosts)} mirrors.\n"
+        )
+        for url in self.select_urls(hosts, options):
+            print(url)
+
+    def verify_mirrors(self, config_path: str, options: Values) -> bool:
+        """Tests the remote mirrors configured in config_path.
+
+        @param config_path: string
+        @param options: parser.parse_args() options instance
+        @rtype: boolean, whether every configured mirror is healthy
+        """
+        urls = self.mirror_type.get_remote_mirrors(self.output, config_path)
+        if not urls:
+            self.output.print_info("No mirrors configured, selecting mirrors.\n")
+            return False
+        hosts = [
+            Endpoint(url, urlparse(url).hostname or url, "", True, False)
+            for url in urls
+        ]
+        if Verify(hosts, options, self.output).healthy:
+            return True
+        self.output.print_info("The configured mirrors degraded, selecting mirrors.\n")
+        return False
+
+    def tests_locally(self, options: Values) -> bool:
+        """Returns whether options the results of a daemon do not
+        reflect are set, see LOCAL_TEST_OPTIONS.
+
+        @param options: parser.parse_args() options instance
+        """
+        defaults = self.build_parser().get_default_values()
+        for name in LOCAL_TEST_OPTIONS:
+            value = getattr(options, name)
+            if value == getattr(defaults, name):
+                continue
+            if name == "md5" and value == DEFAULT_TEST_MD5:
+                continue
+            self.output.write(
+                "tests_locally(): not asking the daemon, --%s is set\n",
+                2,
+                name.replace("_", "-"),
+            )
+            return True
+        return False
 
     def main(self, argv: list[str]):
         """Lets Rock!
@@ -383,33 +1078,95 @@ class MirrorSelect:
         """
         options = self._parse_args(argv)
         self.output.verbosity = options.verbosity
+        if not options.log_json:
+            self.run(options)
+            return
+        try:
+            log = open(options.log_json, "a", buffering=1, encoding="utf-8")
+        except OSError as e:
+            self.output.print_err(f"Invalid --log-json: {e}")
+        with log:
+            self.output.sink = JsonSink(log, max(options.verbosity, 2))
+            try:
+                self.run(options)
+            finally:
+                self.output.sink = None
+
+    def run(self, options):
+        """Selects the mirrors and writes them as the options ask.
+
+        @param options: parser.parse_args() options instance
+        """
+        if options.daemon:
+            MirrorDaemon(options, self.output, options.socket).serve()
+            return
+
+        if options.replay is not None:
+            self.replay(options)
+            return
 
         if options.rsync:
-            self.mirror_type = RsyncConfig(confdir)
+            config_type = RsyncConfig
         else:
-            self.mirror_type = DistfilesConfig(confdir)
+            config_type = DistfilesConfig
+        self.mirror_type = config_type(self.confdir)
 
-        config_path = self.mirror_type.get_conf_path(self.output)
-        self.output.write(f"main(); config_path = {config_path}\n", 2)
+        targets: list[tuple[str, Configuration, str]] = []
+        for target in options.target or []:
+            config, config_path = self.get_target(config_type, target)
+            self.output.write("main(); target %s: %s\n", 2, target, config_path)
+            if not config_path:
+                self.output.print_err(
+                    f"main(); Exiting due to missing repos.conf/gentoo.conf file in {target}\n"
+                )
+            targets.append((target, config, config_path))
 
-        if not config_path:
-            self.output.print_err(
-                "main(); Exiting due to missing repos.conf/gentoo.conf file\n"
+        if not targets:
+            config_path = self.mirror_type.get_conf_path(self.output)
+            self.output.write("main(); config_path = %s\n", 2, config_path)
+
+            if not config_path:
+                self.output.print_err(
+                    "main(); Exiting due to missing repos.conf/gentoo.conf file\n"
+                )
+                exit(1)
+
+            fsmirrors = self.mirror_type.get_filesystem_mirrors(
+                self.output, config_path
             )
-            exit(1)
 
-        fsmirrors = self.mirror_type.get_filesystem_mirrors(self.output, config_path)
+            if options.verify and self.verify_mirrors(config_path, options):
+                self.output.print_info(
+                    "The configured mirrors are healthy, keeping them.\n"
+                )
+                return
 
-        hosts = self.get_available_hosts(options)
+        urls = None
+        if not (
+            options.interactive
+            or options.all_mirrors
+            or options.rsync
+            or options.no_daemon
+            or options.record
+            or self.tests_locally(options)
+        ):
+            urls = query_daemon(options.socket, options, self.output)
 
-        if options.all_mirrors:
-            urls = sorted([url.uri for url in list(hosts)])
-            if options.rsync:
-                urls = [urls[0]]
-        else:
-            urls = self.select_urls(hosts, options)
+        if urls is None:
+            hosts = self.get_available_hosts(options)
+            if options.record is not None:
+                options.record.hosts(hosts)
+
+            if options.all_mirrors:
+                urls = sorted([url.uri for url in list(hosts)])
+                if options.rsync:
+                    urls = [urls[0]]
+            else:
+                urls = self.select_urls(hosts, options)
 
-        if len(urls):
+        if len(urls) and targets:
+            self.apply_targets(targets, urls)
+        elif len(urls):
             self.change_config(fsmirrors + urls, options.output, config_path)
         else:
             self.output.write(
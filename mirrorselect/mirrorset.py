@@ -25,6 +25,7 @@ Distributed under the terms of the GNU General Public License v2
 
 """
 
+from collections.abc import Callable
 from typing import NamedTuple
 
 
@@ -34,6 +35,9 @@ class Endpoint(NamedTuple):
     country: str
     ipv4: bool
     ipv6: bool
+    region: str = ""
+    country_code: str = ""
+    protocol: str = ""
 
 
 class MirrorEndpoint:
@@ -135,13 +139,83 @@ class MirrorSet:
         """Select mirrors in the specified region."""
         return MirrorSet([g for g in self._groups if g.region == region])
 
+    def matching(self, predicate: Callable[[Endpoint], bool]):
+        """Select the endpoints for which predicate is true, see
+        mirrorselect.filters.compile_filter()."""
+        groups: list[MirrorGroup] = []
+        for group in self._groups:
+            new_mirrors: list[Mirror] = []
+            for mirror in group.mirrors:
+                endpoints = [
+                    e
+                    for e in mirror.endpoints
+                    if predicate(self._endpoint(group, mirror, e))
+                ]
+                if endpoints:
+                    new_mirrors.append(Mirror(mirror.name, endpoints))
+            if new_mirrors:
+                groups.append(
+                    MirrorGroup(
+                        new_mirrors, group.country, group.countryname, group.region
+                    )
+                )
+        return MirrorSet(groups)
+
+    @staticmethod
+    def _endpoint(group: MirrorGroup, mirror: Mirror, e: MirrorEndpoint) -> Endpoint:
+        return Endpoint(
+            uri=e.uri,
+            name=mirror.name,
+            country=group.countryname,
+            ipv4=e.ipv4,
+            ipv6=e.ipv6,
+            region=group.region,
+            country_code=group.country,
+            protocol=e.protocol,
+        )
+
     def mirrors(self) -> list[Endpoint]:
         """Each mirror endpoint in the set."""
         return [
-            Endpoint(
-                uri=e.uri, name=m.name, country=g.countryname, ipv4=e.ipv4, ipv6=e.ipv6
-            )
+            self._endpoint(g, m, e)
             for g in self._groups
             for m in g.mirrors
             for e in m.endpoints
         ]
+
+
+class EndpointDiff(NamedTuple):
+    """What changed between two lists of endpoints."""
+
+    added: list[Endpoint]
+    removed: list[Endpoint]
+    # endpoints of the same mirror name, uri and protocol, of which
+    # something else changed, eg. their ipv6 support, as they are now
+    changed: list[Endpoint]
+    unchanged: list[Endpoint]
+
+
+def diff_endpoints(previous: list[Endpoint], current: list[Endpoint]) -> EndpointDiff:
+    """Compares endpoints by their mirror name, uri and protocol.
+
+    @param previous: list of Endpoint, eg. MirrorSet.mirrors() of the
+            previous mirror list
+    @param current: list of Endpoint
+    @rtype: EndpointDiff
+    """
+
+    def key(e: Endpoint) -> tuple[str, str, str]:
+        return (e.name, e.uri, e.protocol)
+
+    before = {key(e): e for e in previous}
+    now = {key(e) for e in current}
+    diff = EndpointDiff([], [e for e in previous if key(e) not in now], [], [])
+    for endpoint in current:
+        old = before.get(key(endpoint))
+        if old is None:
+            diff.added.append(endpoint)
+        elif old != endpoint:
+            diff.changed.append(endpoint)
+        else:
+            diff.unchanged.append(endpoint)
+    return diff
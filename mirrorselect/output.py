@@ -26,12 +26,17 @@ Distributed under the terms of the GNU General Public License v2
 """
 
 import codecs
+import json
 import locale
 import re
 import sys
+import threading
+import time
 from optparse import IndentedHelpFormatter, Option
 from typing import Any, TextIO
 
+from mirrorselect.errors import MirrorselectError
+
 
 def encoder(text: str, _encoding_: str):
     return codecs.encode(text, _encoding_, "replace")
@@ -63,12 +68,61 @@ def get_encoding(output: TextIO | Any):
         return encoding
 
 
+class JsonSink:
+    """A structured log sink, writes every message up to its level as a
+    line of JSON with the "time", "level", "kind" and "message" keys."""
+
+    def __init__(self, out: TextIO | Any, level: int = 2):
+        """JsonSink class init
+
+        @param out: file to write to
+        @param level: int, the highest level of the messages written
+        """
+        self.file = out
+        self.level = level
+        self._lock = threading.Lock()
+
+    def __call__(self, level: int, kind: str, message: str):
+        message = message.strip("\r\n")
+        if not message:
+            # blank lines only space out the terminal output
+            return
+        record = {
+            "time": time.time(),
+            "level": level,
+            "kind": kind,
+            "message": message,
+        }
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self.file.write(line)
+
+    def close(self):
+        with self._lock:
+            self.file.close()
+
+
 class Output:
     """Handles text output. Only prints messages with level <= verbosity.
     Therefore, verbosity=2 is everything (debug), and verbosity=0 is urgent
-    messages only (quiet)."""
+    messages only (quiet).
+
+    Messages may be given as a format string and its arguments, which are
+    only formatted when the message is printed, so disabled debug output
+    costs a level check.  Output is safe to use from several threads, it
+    only flushes lines left unterminated, eg. progress lines.  The
+    optional sink, eg. a JsonSink, gets every message up to its level.
+    Errors exit, unless raises is set, as when mirrorselect is embedded,
+    then print_err raises a MirrorselectError instead.
+    """
 
-    def __init__(self, verbosity: int = 1, out: TextIO | Any = sys.stderr):
+    def __init__(
+        self,
+        verbosity: int = 1,
+        out: TextIO | Any = sys.stderr,
+        sink: JsonSink | None = None,
+        raises: bool = False,
+    ):
         esc_seq = "\x1b["
         codes = {}
 
@@ -84,6 +138,9 @@ class Output:
 
         self.verbosity = verbosity
         self.file = out
+        self.sink = sink
+        self.raises = raises
+        self._lock = threading.Lock()
 
     def red(self, text: str):
         return self.codes["red"] + text + self.codes["reset"]
@@ -100,30 +157,61 @@ class Output:
     def yellow(self, text: str):
         return self.codes["yellow"] + text + self.codes["reset"]
 
-    def print_info(self, message: str, level: int = 1):
-        """Prints an info message with a green star, like einfo."""
+    def enabled(self, level: int) -> bool:
+        """Whether messages of this level are printed or logged, to guard
+        costly debug code."""
+        return level <= self.verbosity or (
+            self.sink is not None and level <= self.sink.level
+        )
+
+    def _emit(self, level: int, kind: str, message: str, prefix: str = ""):
+        if self.sink is not None and level <= self.sink.level:
+            self.sink(level, kind, message)
         if level <= self.verbosity:
-            self.file.write("\r" + self.green("* ") + message)
+            with self._lock:
+                self.file.write(prefix + message)
+                if not message.endswith("\n"):
+                    self.file.flush()
+
+    def flush(self):
+        with self._lock:
             self.file.flush()
 
-    def print_warn(self, message: str, level: int = 1):
+    def print_info(self, message: str, level: int = 1, *args: Any):
+        """Prints an info message with a green star, like einfo."""
+        if self.enabled(level):
+            if args:
+                message %= args
+            self._emit(level, "info", message, "\r" + self.green("* "))
+
+    def print_warn(self, message: str, level: int = 1, *args: Any):
         """Prints a warning."""
-        if level <= self.verbosity:
-            self.file.write(self.yellow("Warning: ") + message)
-            self.file.flush()
+        if self.enabled(level):
+            if args:
+                message %= args
+            self._emit(level, "warn", message, self.yellow("Warning: "))
 
     def print_err(self, message: str, level: int = 0):
         """Prints an error message with a big red ERROR."""
+        if self.raises:
+            raise MirrorselectError(message.strip())
+        if self.enabled(level):
+            self._emit(level, "error", message + "\n", self.red("\nERROR: "))
         if level <= self.verbosity:
-            self.file.write(self.red("\nERROR: ") + message + "\n")
-            self.file.flush()
+            self.flush()
             sys.exit(1)
 
-    def write(self, message: str, level: int = 1):
-        """A wrapper around stderr.write, to enforce verbosity settings."""
-        if level <= self.verbosity:
-            self.file.write(message)
-            self.file.flush()
+    def write(self, message: str, level: int = 1, *args: Any):
+        """A wrapper around stderr.write, to enforce verbosity settings.
+
+        @param message: string, or a % format string of args
+        @param level: int, the verbosity level needed to print it
+        @param args: arguments formatted into message, only when printed
+        """
+        if self.enabled(level):
+            if args:
+                message %= args
+            self._emit(level, "write", message)
 
 
 class ColoredFormatter(IndentedHelpFormatter):
@@ -0,0 +1,178 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import threading
+import time
+from collections.abc import Callable
+
+from mirrorselect.filters import host_of
+from mirrorselect.output import Output
+from mirrorselect.scoring import ProbeStats, Scorer
+
+# Seconds between redraws of the progress line on a terminal.
+TTY_INTERVAL = 0.2
+
+# Seconds between progress lines when the output is not a terminal,
+# eg. in cron mails.
+LOG_INTERVAL = 30.0
+
+
+def format_duration(seconds: float) -> str:
+    """Formats a duration for humans, eg. "1h 2m", "3m 20s" or "45s"."""
+    seconds = int(seconds + 0.5)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+
+class Progress:
+    """Reports the progress of the probes, fed by their start and finish
+    events, from any thread.
+
+    The completed, in-flight and failed probe counts, the bytes
+    transferred, the current best hosts and an estimate of the time left
+    are shown on a single line redrawn in place on a terminal, or logged
+    every LOG_INTERVAL seconds otherwise.  The estimate is the mean
+    duration of the probes finished so far, spread over the most probes
+    seen in flight at once.
+    """
+
+    def __init__(
+        self,
+        output: Output,
+        label: str,
+        total: int | None = None,
+        number: int = 1,
+        scorer: Scorer | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Progress class init
+
+        @param output: mirrorselect.output.Output() class instance
+        @param label: string describing the probes
+        @param total: int, the number of probes to run, or None when it
+                is not known in advance, then no estimate is made
+        @param number: int, the number of best hosts shown
+        @param scorer: Scorer ranking the hosts
+        @param clock: callable returning the time in seconds
+        """
+        self.output = output
+        self.label = label
+        self.total = total
+        self.number = number
+        self.completed = 0
+        self.in_flight = 0
+        self.failed = 0
+        self.transferred = 0
+        self._scorer = scorer or Scorer()
+        self._clock = clock
+        self._tty = bool(getattr(output.file, "isatty", lambda: False)())
+        self._lock = threading.Lock()
+        self._stats: dict[str, ProbeStats] = {}
+        # the best hosts, ranked again after a probe finished
+        self._best: list[str] | None = []
+        self._transferred: dict[str, int] = {}
+        self._durations = 0.0
+        self._parallel = 0
+        self._shown: float | None = None
+
+    def start(self) -> float:
+        """Records the start of a probe.
+
+        @rtype: float, the start time to pass to finish()
+        """
+        with self._lock:
+            self.in_flight += 1
+            self._parallel = max(self._parallel, self.in_flight)
+            self._show()
+            return self._clock()
+
+    def finish(self, uri: str, stats: ProbeStats, started: float):
+        """Records the end of a probe.
+
+        @param uri: string, the host probed
+        @param stats: ProbeStats of the host, all its probes so far
+        @param started: float, the start time returned by start()
+        """
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            if stats.latency is None:
+                self.failed += 1
+            # stats may be the same, updated, object as last time
+            self.transferred += stats.transferred - self._transferred.get(uri, 0)
+            self._transferred[uri] = stats.transferred
+            self._stats[uri] = stats
+            self._best = None
+            self._durations += self._clock() - started
+            self._show()
+
+    def eta(self) -> float | None:
+        """Estimates the seconds left, None when unknown."""
+        if self.total is None or not self.completed:
+            return None
+        mean = self._durations / self.completed
+        left = max(self.total - self.completed, 0)
+        return left * mean / max(self._parallel, 1)
+
+    def line(self) -> str:
+        """Returns the progress line."""
+        done = str(self.completed)
+        if self.total:
+            done += "/%d" % self.total
+        line = "%s: %s done, %d in flight, %d failed, %.1f MB" % (
+            self.label,
+            done,
+            self.in_flight,
+            self.failed,
+            self.transferred / 1024**2,
+        )
+        if self._best is None:
+            self._best = self._scorer.rank(self._stats)[: self.number]
+        if self._best:
+            line += ", best: " + " ".join(host_of(uri) or uri for uri in self._best)
+        eta = self.eta()
+        if eta is not None and self.completed < self.total:
+            line += ", ETA " + format_duration(eta)
+        return line
+
+    def _show(self, final: bool = False):
+        if not self.output.enabled(1):
+            return
+        now = self._clock()
+        interval = TTY_INTERVAL if self._tty else LOG_INTERVAL
+        if not final and self._shown is not None and now - self._shown < interval:
+            return
+        self._shown = now
+        if self._tty:
+            # clear what is left of a longer previous line
+            self.output.print_info("%s\x1b[K%s", 1, self.line(), "\n" if final else "")
+        else:
+            self.output.write("%s\n", 1, self.line())
+
+    def close(self):
+        """Shows the final progress line."""
+        with self._lock:
+            self._show(final=True)
@@ -0,0 +1,191 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import json
+import threading
+from collections import Counter
+from typing import NamedTuple
+
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.scoring import ProbeStats
+
+
+class Observation(NamedTuple):
+    """The raw observations of one probe of a host."""
+
+    # "deep", "ping" or "netselect"
+    kind: str
+    uri: str
+    # seconds the probe took
+    duration: float
+    # seconds the test took as returned by the probe, or None
+    mytime: float | None
+    # ProbeStats.to_dict() of the latencies, throughputs, tls handshakes,
+    # outcomes and bytes transferred
+    stats: dict
+    # seconds after which the test would have bailed out, or None
+    maxtime: float | None = None
+
+
+class Recorder:
+    """Records the hosts and the observations of every probe of a run as
+    lines of JSON, for --replay.  Safe to use from several threads."""
+
+    def __init__(self, path: str):
+        """Recorder class init
+
+        @param path: string, path of the session file
+        @raises OSError: when the file can not be opened
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w", buffering=1, encoding="utf-8")
+
+    def _write(self, record: dict):
+        line = json.dumps(record)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def hosts(self, hosts: list[Endpoint]):
+        """Records the hosts the run chooses from."""
+        self._write({"hosts": [h._asdict() for h in hosts]})
+
+    def record(
+        self,
+        kind: str,
+        uri: str,
+        duration: float,
+        mytime: float | None,
+        stats: ProbeStats,
+        maxtime: float | None = None,
+    ):
+        """Records one probe, see Observation."""
+        observation = Observation(kind, uri, duration, mytime, stats.to_dict(), maxtime)
+        self._write(observation._asdict())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Session:
+    """A recorded run, its hosts and the observations of its probes."""
+
+    def __init__(self, hosts: list[Endpoint], observations: list[Observation]):
+        self.hosts = hosts
+        self.observations = observations
+
+    @classmethod
+    def load(cls, path: str) -> "Session":
+        """Reads a session file written by a Recorder.
+
+        @param path: string
+        @rtype: Session
+        @raises OSError: when the file can not be read
+        @raises ValueError: on malformed files
+        """
+        hosts: list[Endpoint] = []
+        observations: list[Observation] = []
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                    if "hosts" in record:
+                        hosts.extend(Endpoint(**h) for h in record["hosts"])
+                    else:
+                        ProbeStats.from_dict(record["stats"])
+                        observations.append(Observation(**record))
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"{path}:{number}: malformed record: {e}") from e
+        if not hosts:
+            raise ValueError(f"{path}: no hosts recorded")
+        return cls(hosts, observations)
+
+
+class SimulatedClock:
+    """A clock only moving when told to, in seconds."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self._lock = threading.Lock()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        with self._lock:
+            self.now += seconds
+
+
+class Replayer:
+    """Plays a Session back in place of the network.
+
+    Each probe of a host gets the next observation of the same kind
+    recorded for it, starting over when they run out, and the clock
+    advances by the recorded duration instead of the time passing.  A
+    test replayed with a shorter maxtime than it was recorded with bails
+    out when it took longer than that, otherwise the recorded outcome
+    stands, as tests do not bail out to the exact.  Hosts without a recorded observation of
+    the kind asked for yield empty results, they are not ranked.
+    """
+
+    def __init__(self, session: Session, clock: SimulatedClock | None = None):
+        """Replayer class init
+
+        @param session: Session to play back
+        @param clock: SimulatedClock advanced by the replayed probes
+        """
+        self.clock = clock or SimulatedClock()
+        self._observations: dict[tuple[str, str], list[Observation]] = {}
+        for observation in session.observations:
+            key = (observation.kind, observation.uri)
+            self._observations.setdefault(key, []).append(observation)
+        self._played: Counter[tuple[str, str]] = Counter()
+        self._lock = threading.Lock()
+
+    def replay(
+        self, kind: str, uri: str, maxtime: float | None = None
+    ) -> tuple[ProbeStats, float | None]:
+        """Returns the observations of the next probe of a host.
+
+        @param kind: string, "deep", "ping" or "netselect"
+        @param uri: string, the host url
+        @param maxtime: float, seconds after which a test bails out
+        @rtype: tuple of the ProbeStats and test time of the probe
+        """
+        key = (kind, uri)
+        with self._lock:
+            observations = self._observations.get(key)
+            if not observations:
+                return ProbeStats(), None
+            observation = observations[self._played[key] % len(observations)]
+            self._played[key] += 1
+        mytime = observation.mytime
+        if (
+            maxtime is not None
+            and mytime is not None
+            and mytime > maxtime
+            and (observation.maxtime is None or maxtime < observation.maxtime)
+        ):
+            self.clock.advance(maxtime)
+            return ProbeStats(ipv6=observation.stats["ipv6"]), None
+        self.clock.advance(observation.duration)
+        return ProbeStats.from_dict(observation.stats), mytime
@@ -0,0 +1,268 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import math
+import statistics
+from collections import deque
+from collections.abc import Hashable
+from typing import NamedTuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class Weights(NamedTuple):
+    """Weights of the terms making up a mirror's score."""
+
+    latency: float = 1.0
+    throughput: float = 1.0
+    failures: float = 4.0
+    variance: float = 0.5
+    ipv6: float = 0.0
+    hops: float = 0.5
+
+
+DEFAULT_WEIGHTS = ",".join(f"{k}={v:g}" for k, v in Weights()._asdict().items())
+
+
+def parse_weights(text: str) -> Weights:
+    """Parses a "name=value,..." list of weights, unnamed weights keep
+    their default.
+
+    @param text: string
+    @rtype: Weights
+    @raises ValueError: on unknown names or invalid values
+    """
+    weights: dict[str, float] = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition("=")
+        name = name.strip()
+        if not sep or name not in Weights._fields:
+            raise ValueError(f"unknown weight {item.strip()!r}")
+        weights[name] = float(value)
+        if weights[name] < 0 or not math.isfinite(weights[name]):
+            raise ValueError(f"invalid weight {item.strip()!r}")
+    return Weights(**weights)
+
+
+class ProbeStats:
+    """The observations made of one endpoint, the input to scoring."""
+
+    def __init__(self, ipv6: bool = False, window: int | None = None):
+        """ProbeStats class init
+
+        @param ipv6: boolean, whether the endpoint supports ipv6
+        @param window: int, number of most recent observations kept,
+                or None to keep everything
+        """
+        self.ipv6 = ipv6
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.throughputs: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        # tls handshake times, kept apart from the latencies so the cost
+        # of full handshakes does not skew the ranking
+        self.handshakes: deque[float] = deque(maxlen=window)
+        # (bytes, seconds) of transfers of different sizes, timed from
+        # the request on a kept alive connection, see sizes.py
+        self.transfers: deque[tuple[int, float]] = deque(maxlen=window)
+        # network hops to the endpoint, see hops.py
+        self.hop_counts: deque[int] = deque(maxlen=window)
+        # total bytes downloaded while probing, failed probes included
+        self.transferred = 0
+
+    def add_success(
+        self,
+        latencies: list[float],
+        throughput: float | None = None,
+        handshake: float | None = None,
+    ):
+        """Records a successful probe.
+
+        @param latencies: list of latencies in seconds seen by the probe
+        @param throughput: bytes per second, if the probe transferred data
+        @param handshake: seconds of a full tls handshake, for https
+        """
+        self.latencies.extend(latencies)
+        if throughput is not None:
+            self.throughputs.append(throughput)
+        if handshake is not None:
+            self.handshakes.append(handshake)
+        self.outcomes.append(True)
+
+    def add_failure(self):
+        """Records a probe failed by the mirror, e.g. a refused connection
+        or a checksum mismatch."""
+        self.outcomes.append(False)
+
+    def merge(self, other: "ProbeStats"):
+        """Appends the observations of another instance."""
+        self.ipv6 = self.ipv6 or other.ipv6
+        self.latencies.extend(other.latencies)
+        self.throughputs.extend(other.throughputs)
+        self.outcomes.extend(other.outcomes)
+        self.handshakes.extend(other.handshakes)
+        self.transfers.extend(other.transfers)
+        self.hop_counts.extend(other.hop_counts)
+        self.transferred += other.transferred
+
+    def to_dict(self) -> dict:
+        """Returns the observations as a dict of JSON types."""
+        return {
+            "ipv6": self.ipv6,
+            "latencies": list(self.latencies),
+            "throughputs": list(self.throughputs),
+            "outcomes": list(self.outcomes),
+            "handshakes": list(self.handshakes),
+            "transfers": [list(t) for t in self.transfers],
+            "hop_counts": list(self.hop_counts),
+            "transferred": self.transferred,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProbeStats":
+        """Recreates an instance from the dict of to_dict().
+
+        @raises KeyError, TypeError, ValueError: on malformed data
+        """
+        stats = cls(ipv6=bool(data["ipv6"]))
+        stats.latencies.extend(float(x) for x in data["latencies"])
+        stats.throughputs.extend(float(x) for x in data["throughputs"])
+        stats.outcomes.extend(bool(x) for x in data["outcomes"])
+        stats.handshakes.extend(float(x) for x in data["handshakes"])
+        stats.transfers.extend((int(n), float(t)) for n, t in data.get("transfers", []))
+        stats.hop_counts.extend(int(x) for x in data.get("hop_counts", []))
+        stats.transferred = int(data["transferred"])
+        return stats
+
+    @property
+    def failure_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def latency(self) -> float | None:
+        """Median latency in seconds."""
+        if not self.latencies:
+            return None
+        return statistics.median(self.latencies)
+
+    @property
+    def tail_latency(self) -> float | None:
+        """90th percentile latency in seconds."""
+        if not self.latencies:
+            return None
+        if len(self.latencies) == 1:
+            return self.latencies[0]
+        return statistics.quantiles(self.latencies, n=10, method="inclusive")[-1]
+
+    @property
+    def handshake(self) -> float | None:
+        """Median tls handshake time in seconds."""
+        if not self.handshakes:
+            return None
+        return statistics.median(self.handshakes)
+
+    @property
+    def hops(self) -> float | None:
+        """Median number of network hops."""
+        if not self.hop_counts:
+            return None
+        return statistics.median(self.hop_counts)
+
+    @property
+    def throughput(self) -> float | None:
+        """Median throughput in bytes per second."""
+        if not self.throughputs:
+            return None
+        return statistics.median(self.throughputs)
+
+
+class Scorer:
+    """Ranks endpoints on a weighted sum of relative terms, lower is better.
+
+    Latency and throughput are taken relative to the best candidate, so a
+    mirror twice as slow as the best adds its weight to the score.  The
+    failure rate and tail latency spread (p90 / median - 1) are added as is,
+    and endpoints without ipv6 add the ipv6 weight.  Penalties, eg. of
+    stale mirrors, are added as is.  Endpoints without a single successful
+    probe are not ranked at all.  Hop counts, measured in automatic mode
+    with --hops, are scored relative to the nearest candidate like the
+    latency.
+    """
+
+    def __init__(
+        self,
+        weights: Weights | None = None,
+        penalties: dict[K, float] | None = None,
+    ):
+        self.weights = weights or Weights()
+        self.penalties = penalties or {}
+
+    def scores(self, candidates: dict[K, ProbeStats]) -> dict[K, float]:
+        """Scores each candidate that has been successfully probed.
+
+        @param candidates: dict of candidate keys to their ProbeStats
+        @rtype: dict of candidate keys to scores
+        """
+        usable = {k: s for k, s in candidates.items() if s.latency is not None}
+        if not usable:
+            return {}
+        best_latency = min(s.latency for s in usable.values())
+        throughputs = [s.throughput for s in usable.values() if s.throughput]
+        best_throughput = max(throughputs, default=None)
+        best_hops = min((s.hops for s in usable.values() if s.hops), default=None)
+
+        w = self.weights
+        scores: dict[K, float] = {}
+        for key, stats in usable.items():
+            score = w.failures * stats.failure_rate
+            if best_latency > 0:
+                score += w.latency * (stats.latency / best_latency - 1)
+            if best_throughput:
+                if stats.throughput:
+                    score += w.throughput * (best_throughput / stats.throughput - 1)
+                else:
+                    score += w.throughput
+            if best_hops:
+                if stats.hops:
+                    score += w.hops * (stats.hops / best_hops - 1)
+                else:
+                    score += w.hops
+            if stats.latency > 0:
+                score += w.variance * (stats.tail_latency / stats.latency - 1)
+            if not stats.ipv6:
+                score += w.ipv6
+            scores[key] = score + self.penalties.get(key, 0.0)
+        return scores
+
+    def rank(self, candidates: dict[K, ProbeStats]) -> list[K]:
+        """Orders the successfully probed candidates, best first.
+
+        Ties are broken by latency, so equal weights fall back to the
+        plain speed ordering.
+
+        @param candidates: dict of candidate keys to their ProbeStats
+        @rtype: list of candidate keys
+        """
+        scores = self.scores(candidates)
+        return sorted(scores, key=lambda k: (scores[k], candidates[k].latency))
@@ -1,3 +1,4 @@
 from .deep import Deep
 from .interactive import Interactive
 from .shallow import Shallow
+from .verify import Verify
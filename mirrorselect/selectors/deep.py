@@ -25,28 +25,62 @@ Distributed under the terms of the GNU General Public License v2
 
 """
 
-import hashlib
 import http.client
 import itertools
 import math
 import signal
 import socket
 import ssl
+import statistics
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
 from configparser import Error as ConfigParseError
 from optparse import Values
 from urllib.error import HTTPError
 from urllib.parse import urlparse, urlunparse
-from urllib.request import Request, urlopen
+from urllib.request import ProxyHandler, Request, build_opener, proxy_bypass, urlopen
 
 from portage.package.ebuild.fetch import (
     FlatLayout,
     MirrorLayoutConfig,
 )
 
+from mirrorselect.checkpoint import Checkpoint
+from mirrorselect.connection import (
+    CHUNK_SIZE,
+    DeadlineExceeded,
+    FetchResult,
+    ProbeCache,
+    ProxyPool,
+    fetch,
+    fetch_ranges,
+    get_proxies,
+)
+from mirrorselect.fleet import Fleet
+from mirrorselect.hierarchy import hierarchical_search
+from mirrorselect.incremental import IncrementalState
 from mirrorselect.mirrorset import Endpoint
 from mirrorselect.output import Output
+from mirrorselect.progress import Progress
+from mirrorselect.replay import Recorder, Replayer
+from mirrorselect.scoring import ProbeStats, Scorer
+from mirrorselect.sizes import SizeScorer, expected_time, fit_model
+from mirrorselect.tournament import Budget, successive_halving
+from mirrorselect.workload import (
+    DistEntry,
+    ManifestHasher,
+    WorkloadScorer,
+    choose_samples,
+    projected_time,
+)
+
+# Warn when the address family preferred by this host is this many times
+# slower than the other one in dual-stack mode.
+DUAL_STACK_WARN_RATIO = 1.5
+
+FAMILY_NAMES = {socket.AF_INET: "ipv4", socket.AF_INET6: "ipv6"}
 
 
 class TimeoutException(Exception):
@@ -60,16 +94,96 @@ def timeout_handler(*_):
 class Deep:
     """handles deep mode mirror selection."""
 
-    def __init__(self, hosts: list[Endpoint], options: Values, output: Output):
+    # whether probe() results go to the --checkpoint file
+    checkpointed = True
+
+    def __init__(
+        self,
+        hosts: list[Endpoint],
+        options: Values,
+        output: Output,
+        on_result: Callable[[Endpoint, ProbeStats], None] | None = None,
+    ):
+        """Deep class init, runs the deep test on the given hosts.
+
+        @param hosts: list of hosts to test
+        @param options: parser.parse_args() options instance
+        @param output: mirrorselect.output.Output() class instance
+        @param on_result: optional callable, called with each host and the
+                ProbeStats of its test as soon as it is tested
+        """
         self.output = output
         self.urls: list[str] = []
+        self._on_result = on_result
         self._hosts = hosts
         self._number = options.servers
         self._dns_timeout = options.timeout
         self._connect_timeout = options.timeout
         self._download_timeout: float = options.timeout
         self.test_file = options.file
-        self.test_md5 = options.md5
+        # the hashes the test file is verified against
+        test_hashes = {
+            name: value
+            for name, value in (
+                ("BLAKE2B", options.blake2b),
+                ("SHA512", options.sha512),
+                ("MD5", options.md5),
+            )
+            if value
+        }
+        # the files downloaded from each http(s) mirror, the test file
+        # unless the distfiles of a workload are to be tested
+        self._workload: list[DistEntry] | None = options.workload
+        if self._workload:
+            self._files = choose_samples(
+                self._workload, options.workload_samples, options.workload_max_size
+            )
+            self._scorer: Scorer = WorkloadScorer(
+                self._workload, options.weights, options.penalties
+            )
+        else:
+            self._files = [DistEntry(self.test_file, 0, test_hashes)]
+            self._scorer = Scorer(options.weights, options.penalties)
+        # the first bytes of the first file are also fetched at each of
+        # these sizes, to rank on the expected time of the size mix
+        self._sizes: list[int] | None = options.sizes
+        self._size_mix: list[tuple[int, float]] | None = options.size_mix
+        if self._sizes:
+            self._scorer = SizeScorer(
+                self._size_mix, options.weights, options.penalties
+            )
+        self._fleet = Fleet.from_options(options)
+        self._hierarchical: bool = options.hierarchical
+        self._group_samples: int = options.group_samples
+        self._time_budget: float | None = options.time_budget
+        self._byte_budget: int | None = options.byte_budget
+        self._dual_stack: bool = options.dual_stack
+        # kept between the runs of an embedding process, see api.py
+        cache: ProbeCache | None = options.probe_cache
+        own_cache = cache is None
+        if cache is None:
+            cache = ProbeCache()
+        self._layouts = cache.layouts
+        # one context for every https test, so tls sessions can be resumed
+        self._ssl_context = cache.ssl_context
+        self._sessions: dict[str, ssl.SSLSession] = cache.sessions
+        # forward proxies the http(s) tests go through, by url scheme, and
+        # the seconds spent reaching them
+        proxies = get_proxies(options)
+        self._opener = build_opener(ProxyHandler(proxies))
+        self._proxies: dict[str, ProxyPool] = {}
+        for scheme, proxy_url in proxies.items():
+            try:
+                self._proxies[scheme] = cache.proxy_pool(proxy_url)
+            except ValueError as e:
+                self.output.print_warn(
+                    "%s, testing %s mirrors without it\n", 1, e, scheme
+                )
+        self.proxy_times: list[float] = []
+        # per family results of dual-stack mode, and the preferred family
+        self.family_stats: dict[str, dict[int, ProbeStats]] = {}
+        self.preferred_family: dict[str, int] = {}
+        self.stats: dict[str, ProbeStats] = {}
 
         addr_families: list[int] = []
         if options.ipv4:
@@ -81,7 +195,58 @@ class Deep:
 
         self._addr_families = addr_families
 
-        self.deeptest()
+        # the observations of the probes are recorded with --record, or
+        # played back from a recorded session with --replay, on its clock
+        self._recorder: Recorder | None = options.record
+        self._replayer: Replayer | None = None
+        self._clock: Callable[[], float] = time.monotonic
+        if options.replay is not None:
+            self._replayer = Replayer(options.replay)
+            self._clock = self._replayer.clock
+
+        # results of the probes, kept to resume an interrupted run
+        self._checkpoint: Checkpoint | None = None
+        try:
+            if self.checkpointed:
+                self._checkpoint = Checkpoint.from_options(options)
+        except OSError as e:
+            self.output.print_warn("can not use the checkpoint file: %s\n", 1, e)
+        if self._checkpoint is not None and self._checkpoint.results:
+            self.output.print_info(
+                "Resuming, %d mirrors already tested.\n",
+                1,
+                len(self._checkpoint.results),
+            )
+        # results of the previous run, reused for the mirrors unchanged
+        # since in the mirror list, the tournament measures anew
+        self._state: IncrementalState | None = None
+        budgeted = self._time_budget is not None or self._byte_budget is not None
+        if self.checkpointed and not budgeted:
+            self._state = IncrementalState.from_options(options)
+        if self._state is not None and self._state.previous:
+            diff = self._state.diff(self._hosts)
+            self.output.print_info(
+                "Mirror list changes since the last run: %d added, %d removed, "
+                "%d changed, %d unchanged.\n",
+                1,
+                len(diff.added),
+                len(diff.removed),
+                len(diff.changed),
+                len(diff.unchanged),
+            )
+
+        try:
+            self.deeptest()
+            if self._state is not None:
+                try:
+                    self._state.save()
+                except OSError as e:
+                    self.output.print_warn("can not save the results: %s\n", 1, e)
+        finally:
+            if own_cache:
+                cache.close()
+            if self._checkpoint is not None:
+                self._checkpoint.close()
 
     def deeptest(self):
         """
@@ -89,53 +254,305 @@ class Deep:
         Doesn't waste time finnishing a test that has already taken longer than
         the slowest mirror weve already got.
         """
-        prog = 0
-        maxtime = self._download_timeout
         num_hosts = len(self._hosts)
         self.dl_failures = 0
-        results: list[tuple[float, Endpoint]] = []
-
-        for host in self._hosts:
-            prog += 1
-            if self.test_file != "mirrorselect-test":
-                self.output.print_info(
-                    "Downloading %s files from each mirror... [%s of %s]"
-                    % (self.test_file, prog, num_hosts)
-                )
+        self._tested = 0
+        self._maxtime = self._download_timeout
+        self._results: list[tuple[float, Endpoint]] = []
+        budgeted = self._time_budget is not None or self._byte_budget is not None
+
+        if budgeted:
+            label = "Testing mirrors"
+        elif self.test_file != "mirrorselect-test":
+            label = f"Downloading {self.test_file} files from each mirror"
+        else:
+            label = "Downloading 100k files from each mirror"
+        # tournaments and hierarchical searches test an unknown number
+        self._progress = Progress(
+            self.output,
+            label,
+            None if budgeted or self._hierarchical else num_hosts,
+            self._number,
+            self._scorer,
+            self._clock,
+        )
+
+        if budgeted:
+            ranked = successive_halving(
+                self._hosts,
+                self._number,
+                self.tournament_probe,
+                self._scorer,
+                Budget(self._time_budget, self._byte_budget, self._clock),
+                self.output,
+            )
+        elif self._hierarchical:
+            ranked = hierarchical_search(
+                self._hosts,
+                self._number,
+                self.probe,
+                self._scorer,
+                self.output,
+                self._group_samples,
+            )
+        else:
+            self.probe(self._hosts)
+            ranked = self._scorer.rank(self.stats)
+        self._progress.close()
+        if self._fleet is not None:
+            ranked = self._fleet.order(ranked, self._scorer.scores(self.stats))
+        fastest_hosts = ranked[: self._number]
+
+        self.output.write(
+            "deeptest(): got %s hosts, and returned %s\n", 2, num_hosts, fastest_hosts
+        )
+
+        self.output.write("\n")  # this just makes output nicer
+
+        self.output.write(
+            "deeptest(): final md5 failures %s of %s\n",
+            2,
+            self.dl_failures,
+            self._tested,
+        )
+        for uri in fastest_hosts:
+            stats = self.stats[uri]
+            handshake = "-" if stats.handshake is None else f"{stats.handshake:.3f}s"
+            self.output.write(
+                "deeptest(): %s latency %.3fs, tls handshake %s\n",
+                2,
+                uri,
+                stats.latency,
+                handshake,
+            )
+        if self._dual_stack:
+            self.report_families(fastest_hosts)
+        if self._workload:
+            self.report_workload(fastest_hosts)
+        if self._sizes:
+            self.report_sizes(fastest_hosts)
+        if self.proxy_times:
+            self.output.write(
+                "Proxy overhead: %.3f seconds median over %d connections, "
+                "not counted in the mirror times\n",
+                1,
+                statistics.median(self.proxy_times),
+                len(self.proxy_times),
+            )
+        self.urls = fastest_hosts
+
+    def report_families(self, urls: list[str]):
+        """Prints the per family results of dual-stack mode for the urls."""
+        for uri in urls:
+            families = self.family_stats.get(uri, {})
+            columns = []
+            for family, name in FAMILY_NAMES.items():
+                latency = families[family].latency if family in families else None
+                if latency is None:
+                    columns.append(f"{name}: -")
+                else:
+                    columns.append(f"{name}: {latency:.3f}s")
+            preferred = FAMILY_NAMES.get(self.preferred_family.get(uri), "-")
+            self.output.write(
+                "  %s  preferred: %s  %s\n", 1, "  ".join(columns), preferred, uri
+            )
+
+    def report_workload(self, urls: list[str]):
+        """Prints the projected fetch time of the workload for the urls."""
+        size = sum(e.size for e in self._workload)
+        self.output.write(
+            "Projected fetch time of the workload, %d distfiles, %.1f MB:\n",
+            1,
+            len(self._workload),
+            size / 1024**2,
+        )
+        for uri in urls:
+            seconds = projected_time(self._workload, self.stats[uri])
+            projection = "-" if seconds is None else f"{seconds:.1f}s"
+            self.output.write("  %9s  %s\n", 1, projection, uri)
+
+    def report_sizes(self, urls: list[str]):
+        """Prints the latency and bandwidth models fitted for the urls."""
+        self.output.write(
+            "Fitted request latency and bandwidth, expected fetch time:\n"
+        )
+        for uri in urls:
+            model = fit_model(list(self.stats[uri].transfers))
+            if model is None:
+                self.output.write("  %9s  %11s  %9s  %s\n", 1, "-", "-", "-", uri)
+                continue
+            self.output.write(
+                "  %8.3fs  %6.0f kB/s  %8.2fs  %s\n",
+                1,
+                model.latency,
+                model.bandwidth / 1024,
+                expected_time(self._size_mix, model),
+                uri,
+            )
+
+    def probe(self, hosts: list[Endpoint]) -> dict[str, ProbeStats]:
+        """Tests each of the hosts, bailing out of tests slower than the
+        nth fastest host tested so far by this instance.
+
+        @param hosts: list of hosts to test
+        @rtype: dict of the hosts' urls to their ProbeStats
+        """
+        probed: dict[str, ProbeStats] = {}
+
+        for host in hosts:
+            self._tested += 1
+            started = self._progress.start()
+            resumed = None
+            if self._checkpoint is not None:
+                resumed = self._checkpoint.resume(host.uri, self._maxtime)
+            if self._state is not None:
+                if resumed is None:
+                    resumed = self._state.reuse(host, self._maxtime)
+                else:
+                    self._state.record(host, *resumed, self._maxtime)
+            if resumed is not None:
+                # taken in turn, so the bail out time evolves as it would
+                # have without the interruption
+                stats, mytime = resumed
+                self.stats[host.uri] = probed[host.uri] = stats
             else:
-                self.output.print_info(
-                    "Downloading 100k files from each mirror... [%s of %s]"
-                    % (prog, num_hosts)
+                stats = ProbeStats(ipv6=host.ipv6)
+                self.stats[host.uri] = probed[host.uri] = stats
+                maxtime = self._maxtime
+                mytime = self.observe(
+                    "deep",
+                    host.uri,
+                    maxtime,
+                    stats,
+                    lambda s: self.deeptime(host.uri, self._maxtime, s)[0],
                 )
+                if self._checkpoint is not None:
+                    self._checkpoint.record(host.uri, stats, mytime, maxtime)
+                if self._state is not None:
+                    self._state.record(host, stats, mytime, maxtime)
+            self._progress.finish(host.uri, stats, started)
 
-            mytime, _ = self.deeptime(host.uri, maxtime)
+            if self._on_result is not None:
+                self._on_result(host, stats)
 
             if mytime is None:
                 continue
 
-            results.append((mytime, host))
-            if len(results) >= self._number:
+            self._results.append((mytime, host))
+            # a fleet spreads over the mirrors close to the best one, all
+            # of them are timed to completion
+            if self._fleet is None and len(self._results) >= self._number:
                 """we can now start bailing out of tests that are slower
                 than the nth fastest host in the list"""
 
-                maxtime = max(sorted(results)[: self._number])[0]
+                self._maxtime = max(sorted(self._results)[: self._number])[0]
 
-        fastest_hosts = [test[1].uri for test in sorted(results)[: self._number]]
+        return probed
 
-        self.output.write(
-            f"deeptest(): got {num_hosts} hosts, and returned {fastest_hosts!s}\n",
-            2,
-        )
+    def tournament_probe(
+        self, host: Endpoint, level: int, remaining: float | None
+    ) -> ProbeStats:
+        """Probes a host for the budgeted tournament.
 
-        self.output.write("\n")  # this just makes output nicer
+        Level 0 only times fetching the mirror's layout.conf, level n
+        downloads the test file 2 ** (n - 1) times.
 
-        self.output.write(
-            f"deeptest(): final md5 failures {self.dl_failures} of {num_hosts}\n",
-            2,
+        @param host: the host to probe
+        @param level: int, the tournament level
+        @param remaining: float, seconds left in the budget, or None
+        @rtype: ProbeStats of this probe
+        """
+        stats = ProbeStats(ipv6=host.ipv6)
+        maxtime = self._download_timeout
+        if remaining is not None:
+            maxtime = min(maxtime, max(remaining, 1))
+        self._tested += 1
+        self._progress.label = f"Testing mirrors, round {level + 1}"
+        started = self._progress.start()
+
+        if level == 0:
+            self.observe(
+                "ping", host.uri, None, stats, lambda s: self.pingtime(host.uri, s)
+            )
+        else:
+            for _ in range(2 ** (level - 1)):
+                mytime = self.observe(
+                    "deep",
+                    host.uri,
+                    maxtime,
+                    stats,
+                    lambda s: self.deeptime(host.uri, maxtime, s)[0],
+                )
+                if mytime is None:
+                    break
+
+        total = self.stats.setdefault(host.uri, ProbeStats(ipv6=host.ipv6))
+        total.merge(stats)
+        self._progress.finish(host.uri, total, started)
+        if self._on_result is not None:
+            self._on_result(host, stats)
+        return stats
+
+    def observe(
+        self,
+        kind: str,
+        url: str,
+        maxtime: float | None,
+        stats: ProbeStats,
+        test: Callable[[ProbeStats], float | None],
+    ) -> float | None:
+        """Runs a test of a host, recording its observations with --record,
+        or replays them instead with --replay.
+
+        @param kind: string, "deep" or "ping"
+        @param url: string, the host url
+        @param maxtime: float, seconds after which the test bails out
+        @param stats: ProbeStats the results are added to
+        @param test: callable running the test into the ProbeStats given,
+                returning the seconds it took, or None
+        @rtype: float, seconds the test took, or None
+        """
+        if self._replayer is not None:
+            observed, mytime = self._replayer.replay(kind, url, maxtime)
+            stats.merge(observed)
+            return mytime
+        if self._recorder is None:
+            return test(stats)
+        observed = ProbeStats(ipv6=stats.ipv6)
+        stime = time.monotonic()
+        mytime = test(observed)
+        self._recorder.record(
+            kind, url, time.monotonic() - stime, mytime, observed, maxtime
         )
-        self.urls = fastest_hosts
+        stats.merge(observed)
+        return mytime
 
-    def get_distfile_structure(self, distfiles_url: str):
+    def pingtime(self, url: str, stats: ProbeStats | None = None):
+        """
+        Times fetching the mirror's layout.conf, a cheap latency probe.
+        It is always fetched, even when its layout is known from an
+        earlier selection, and the layout kept is refreshed.
+        """
+        dist_url = Deep._urljoin(url, "distfiles")
+        if stats is None:
+            stats = ProbeStats()
+
+        stime = time.time()
+        try:
+            self.get_distfile_structure(dist_url, cached=False)
+        except OSError as e:
+            self.output.write(
+                "pingtime(): unable to connect to host %s: %s\n", 2, url, e
+            )
+            stats.add_failure()
+            return None
+        delta = time.time() - stime
+
+        stats.add_success([delta])
+        self.output.write("pingtime(): %s seconds for host %s\n", 2, delta, url)
+        return delta
+
+    def get_distfile_structure(self, distfiles_url: str, cached: bool = True):
         """
         Obtain the GLEP 75 Mirror Layout from layout.conf
 
@@ -146,13 +563,18 @@ class Deep:
         GLEP 75 explains the mechanism for mirrors to communicate
         the path schema they use.
         See: https://www.gentoo.org/glep/glep-0075.html
+
+        The layout is fetched once and kept, unless cached is False.
         """
+        if cached and distfiles_url in self._layouts:
+            return self._layouts[distfiles_url]
+
         config_parser = ConfigParser()
         config_url = Deep._urljoin(distfiles_url, "layout.conf")
 
-        self.output.write(f"_get_distfile_structure(): config_url = {config_url}\n", 2)
+        self.output.write("_get_distfile_structure(): config_url = %s\n", 2, config_url)
 
-        response = urlopen(config_url, None, self._connect_timeout)
+        response = self._opener.open(config_url, None, self._connect_timeout)
 
         if response.status == 404:
             self.output.write(
@@ -172,35 +594,86 @@ class Deep:
 
         mlc = MirrorLayoutConfig()
         mlc.deserialize(vals)
-        return mlc.get_best_supported_layout()
+        self._layouts[distfiles_url] = mlc.get_best_supported_layout()
+        return self._layouts[distfiles_url]
 
-    def deeptime(self, url: str, maxtime: float):
+    def threadtime(self, host: Endpoint) -> ProbeStats:
+        """Tests one host, safe to run in worker threads.
+
+        Unlike deeptime() no signals are used, only http and https
+        mirrors can be tested this way.  Running out of time is a failure.
+        """
+        stats = ProbeStats(ipv6=host.ipv6)
+        if urlparse(host.uri).scheme not in ("http", "https"):
+            self.output.write("threadtime(): can not test %s\n", 2, host.uri)
+            stats.add_failure()
+            return stats
+
+        dist_url = Deep._urljoin(host.uri, "distfiles")
+        try:
+            structure = self.get_distfile_structure(dist_url)
+        except OSError as e:
+            self.output.write(
+                "threadtime(): unable to connect to %s: %s\n", 2, host.uri, e
+            )
+            stats.add_failure()
+            return stats
+        url = Deep._urljoin(dist_url, structure.get_path(self.test_file))
+
+        result, _, hasher = self._addresstime(
+            url, None, time.monotonic() + self._download_timeout
+        )
+        if hasher is not None and not self._check_download(
+            "threadtime", hasher, host.uri
+        ):
+            result.add_failure()
+        elif result.latency is None and not result.outcomes:
+            result.add_failure()
+        stats.merge(result)
+        return stats
+
+    def deeptime(self, url: str, maxtime: float, stats: ProbeStats | None = None):
         """
         Takes a single url and fetch command, and downloads the test file.
         Can be given an optional timeout, for use with a clever algorithm.
         Like mine.
+
+        The latencies, throughput and failures observed are recorded
+        in stats, when given.  Bailing out at maxtime is not a failure.
         """
-        self.output.write(f"\n_deeptime(): maxtime is {maxtime}\n", 2)
+        self.output.write("\n_deeptime(): maxtime is %s\n", 2, maxtime)
+        if stats is None:
+            stats = ProbeStats()
+        host_url = url
 
         dist_url = Deep._urljoin(url, "distfiles")
 
         try:
             structure = self.get_distfile_structure(dist_url)
         except OSError:
-            self.output.write(
-                f"deeptime(): unable to connect to host {url}\n",
-                2,
-            )
+            self.output.write("deeptime(): unable to connect to host %s\n", 2, url)
+            stats.add_failure()
             return (None, True)
 
         path: str = structure.get_path(self.test_file)
         url = self._urljoin(dist_url, path)
         url_parts = urlparse(url)
 
-        self.output.write(f"_deeptime(): testfile url = {url}\n", 1)
+        self.output.write("_deeptime(): testfile url = %s\n", 1, url)
 
         signal.signal(signal.SIGALRM, timeout_handler)
 
+        if self._workload and url_parts.scheme not in ("http", "https"):
+            self.output.write("deeptime(): can not test the workload on %s\n", 2, url)
+            stats.add_failure()
+            return (None, True)
+
+        if self._proxy_for(url) is not None:
+            return self.httptime(dist_url, structure, [None], maxtime, stats)
+
+        if self._dual_stack and url_parts.scheme in ("http", "https"):
+            return self.dualtime(host_url, url, maxtime, stats)
+
         ips = []
         for addr_family in self._addr_families:
             try:
@@ -223,42 +696,48 @@ class Deep:
                     signal.alarm(0)
             except OSError as e:
                 self.output.write(
-                    f"deeptime(): dns error for host {url_parts.hostname}: {e}\n",
-                    2,
+                    "deeptime(): dns error for host %s: %s\n", 2, url_parts.hostname, e
                 )
             except TimeoutException:
                 self.output.write(
-                    f"deeptime(): dns timeout for host {url_parts.hostname}\n", 2
+                    "deeptime(): dns timeout for host %s\n", 2, url_parts.hostname
                 )
 
         if not ips:
             self.output.write(
-                f"deeptime(): unable to resolve ip for host {url_parts.hostname}\n", 2
+                "deeptime(): unable to resolve ip for host %s\n", 2, url_parts.hostname
             )
+            stats.add_failure()
             return (None, True)
 
         self.output.write(
-            f"deeptime(): ip's for host {url_parts.hostname}: {ips!s}\n", 2
+            "deeptime(): ip's for host %s: %s\n", 2, url_parts.hostname, ips
         )
+        if url_parts.scheme in ("http", "https"):
+            addresses = [ip.strip("[]") for ip in ips]
+            return self.httptime(dist_url, structure, addresses, maxtime, stats)
+
         delta = 0
         f = None
 
         for ip in ips:
             test_parts = url_parts._replace(netloc=ip)
             test_url = urlunparse(test_parts)
-            self.output.write(f"deeptime(): testing url: {test_url}\n", 2)
+            self.output.write("deeptime(): testing url: %s\n", 2, test_url)
 
+            ctime = time.time()
             f, test_url, early_out = self._test_connection(
                 test_url, url_parts, ip, ips[ips.index(ip) :]
             )
             if early_out:
+                connect_time = time.time() - ctime
                 break
 
         if f is None:
             self.output.write(
-                f"deeptime(): unable to connect to host {url_parts.hostname}\n",
-                2,
+                "deeptime(): unable to connect to host %s\n", 2, url_parts.hostname
             )
+            stats.add_failure()
             return (None, True)
 
         try:
@@ -270,18 +749,22 @@ class Deep:
                 signal.alarm(0)
         except OSError as e:
             self.output.write(
-                ("deeptime(): closing connection to host %s " "failed for ip %s: %s\n")
-                % (url_parts.hostname, ip, e),
+                "deeptime(): closing connection to host %s failed for ip %s: %s\n",
                 2,
+                url_parts.hostname,
+                ip,
+                e,
             )
         except TimeoutException:
             self.output.write(
-                ("deeptime(): closing connection to host %s " "timed out for ip %s\n")
-                % (url_parts.hostname, ip),
+                "deeptime(): closing connection to host %s timed out for ip %s\n",
                 2,
+                url_parts.hostname,
+                ip,
             )
 
-        self.output.write(f"deeptime(): timing url: {test_url}\n", 2)
+        self.output.write("deeptime(): timing url: %s\n", 2, test_url)
+        hasher = ManifestHasher(self._files[0])
         try:
             # The first connection serves to "wake up" the route between
             # the local and remote machines. A second connection is used
@@ -292,19 +775,18 @@ class Deep:
                 r = Request(test_url)
                 r.host = url_parts.netloc
                 f = urlopen(r)
+                ttfb = time.time() - stime
 
-                md5 = hashlib.md5(f.read()).hexdigest()
+                while chunk := f.read(CHUNK_SIZE):
+                    stats.transferred += len(chunk)
+                    hasher.update(chunk)
 
                 delta = time.time() - stime
                 f.close()
-                if md5 != self.test_md5:
-                    self.output.write(
-                        f"\ndeeptime(): md5sum error for file: {self.test_file}\n"
-                        + f"         expected: {self.test_md5}\n"
-                        + f"         got.....: {md5}\n"
-                        + f"         host....: {url_parts.hostname}, {ip}\n"
-                    )
-                    self.dl_failures += 1
+                if not self._check_download(
+                    "deeptime", hasher, f"{url_parts.hostname}, {ip}"
+                ):
+                    stats.add_failure()
                     return (None, True)
 
             finally:
@@ -312,32 +794,355 @@ class Deep:
 
         except (OSError, ssl.CertificateError) as e:
             self.output.write(
-                ("\ndeeptime(): download from host %s " "failed for ip %s: %s\n")
-                % (url_parts.hostname, ip, e),
+                "\ndeeptime(): download from host %s failed for ip %s: %s\n",
                 2,
+                url_parts.hostname,
+                ip,
+                e,
             )
+            stats.add_failure()
             return (None, True)
         except TimeoutException:
             self.output.write(
-                ("\ndeeptime(): download from host %s " "timed out for ip %s\n")
-                % (url_parts.hostname, ip),
+                "\ndeeptime(): download from host %s timed out for ip %s\n",
                 2,
+                url_parts.hostname,
+                ip,
             )
+            if maxtime >= self._download_timeout:
+                stats.add_failure()
             return (None, True)
         except http.client.IncompleteRead as e:
             self.output.write(
-                ("\ndeeptime(): download from host %s " "failed for ip %s: %s\n")
-                % (url_parts.hostname, ip, e),
+                "\ndeeptime(): download from host %s failed for ip %s: %s\n",
                 2,
+                url_parts.hostname,
+                ip,
+                e,
             )
+            stats.add_failure()
             return (None, True)
+        finally:
+            hasher.close()
 
         signal.signal(signal.SIGALRM, signal.SIG_DFL)
 
+        stats.add_success([connect_time, ttfb], hasher.size / max(delta - ttfb, 1e-6))
         self.output.write("deeptime(): download completed.\n", 2)
-        self.output.write(f"deeptime(): {delta} seconds for host {url}\n", 2)
+        self.output.write("deeptime(): %s seconds for host %s\n", 2, delta, url)
         return (delta, False)
 
+    def httptime(
+        self,
+        dist_url: str,
+        structure,
+        addresses: list[str],
+        maxtime: float,
+        stats: ProbeStats,
+    ):
+        """
+        Downloads the test file, or the sample distfiles of the workload,
+        over http(s) from the first of the addresses that answers the warm
+        up request.  For https the warm up does the full tls handshake and
+        the timed downloads resume its session, the handshake is recorded
+        in stats on its own.
+        """
+        urls = [
+            self._urljoin(dist_url, structure.get_path(entry.name))
+            for entry in self._files
+        ]
+        hostname = urlparse(dist_url).hostname
+        for address in addresses:
+            try:
+                warmup = self._warmup(urls[0], address)
+                break
+            except OSError as e:
+                self.output.write(
+                    "httptime(): warm up of host %s failed via %s: %s\n",
+                    2,
+                    hostname,
+                    address or "proxy",
+                    e,
+                )
+        else:
+            stats.add_failure()
+            return (None, True)
+
+        deadline = time.monotonic() + maxtime
+        total = 0.0
+        for entry, url in zip(self._files, urls):
+            self.output.write(
+                "httptime(): timing url: %s via %s\n", 2, url, address or "proxy"
+            )
+            result, delta, hasher = self._addresstime(
+                url, address, deadline, warmup, entry
+            )
+            # the connect and handshake of the warm up count once
+            warmup = warmup._replace(pooled=True)
+            if hasher is not None and not self._check_download(
+                "httptime", hasher, f"{hostname}, {address}"
+            ):
+                stats.transferred += result.transferred
+                stats.add_failure()
+                return (None, True)
+            if delta is None:
+                if not result.outcomes and maxtime >= self._download_timeout:
+                    result.add_failure()
+                stats.merge(result)
+                return (None, True)
+            stats.merge(result)
+            total += delta
+
+        self.output.write("httptime(): %s seconds for host %s\n", 2, total, dist_url)
+        if self._sizes:
+            self._sizetime(urls[0], address, stats)
+        return (total, False)
+
+    def dualtime(self, host_url: str, url: str, maxtime: float, stats: ProbeStats):
+        """
+        Downloads the test file over IPv4 and IPv6 at the same time,
+        timing each address family on its own.  Only the family this
+        system prefers, that of the first address getaddrinfo() returns,
+        is recorded in stats for ranking.
+        """
+        hostname = urlparse(url).hostname
+        try:
+            try:
+                signal.alarm(self._dns_timeout)
+                infos = socket.getaddrinfo(
+                    hostname,
+                    None,
+                    socket.AF_UNSPEC,
+                    socket.SOCK_STREAM,
+                    0,
+                    socket.AI_ADDRCONFIG,
+                )
+            finally:
+                signal.alarm(0)
+        except (OSError, TimeoutException) as e:
+            self.output.write("dualtime(): dns error for host %s: %r\n", 2, hostname, e)
+            stats.add_failure()
+            return (None, True)
+
+        addresses: dict[int, str] = {}
+        for family, _, __, ___, sockaddr in infos:
+            if family in FAMILY_NAMES:
+                addresses.setdefault(family, sockaddr[0])
+        if not addresses:
+            stats.add_failure()
+            return (None, True)
+        preferred = next(info[0] for info in infos if info[0] in addresses)
+        self.output.write("dualtime(): addresses for %s: %s\n", 2, hostname, addresses)
+
+        deadline = time.monotonic() + maxtime
+        with ThreadPoolExecutor(max_workers=len(addresses)) as executor:
+            futures = {
+                family: executor.submit(self._addresstime, url, address, deadline)
+                for family, address in addresses.items()
+            }
+        results = {family: future.result() for family, future in futures.items()}
+
+        families: dict[int, ProbeStats] = {}
+        deltas: dict[int, float] = {}
+        for family, (family_stats, delta, hasher) in results.items():
+            if hasher is not None and not self._check_download(
+                "dualtime", hasher, f"{hostname}, {addresses[family]}"
+            ):
+                family_stats = ProbeStats()
+                family_stats.add_failure()
+                delta = None
+            elif (
+                delta is None
+                and not family_stats.outcomes
+                and maxtime >= self._download_timeout
+            ):
+                family_stats.add_failure()
+            families[family] = family_stats
+            if delta is not None:
+                deltas[family] = delta
+            self.output.write(
+                "dualtime(): %s %s seconds for host %s\n",
+                2,
+                FAMILY_NAMES[family],
+                delta,
+                url,
+            )
+
+        self.family_stats[host_url] = families
+        self.preferred_family[host_url] = preferred
+        stats.merge(families[preferred])
+
+        other = next((f for f in deltas if f != preferred), None)
+        if (
+            preferred in deltas
+            and other is not None
+            and deltas[preferred] > DUAL_STACK_WARN_RATIO * deltas[other]
+        ):
+            self.output.print_warn(
+                "\nThis system prefers %s for %s, which took %.2fs, %s took %.2fs\n",
+                1,
+                FAMILY_NAMES[preferred],
+                hostname,
+                deltas[preferred],
+                FAMILY_NAMES[other],
+                deltas[other],
+            )
+
+        if preferred not in deltas:
+            return (None, True)
+        return (deltas[preferred], False)
+
+    def _warmup(self, url: str, address: str) -> FetchResult:
+        """Wakes up the route to an address with a HEAD request of the url.
+        For https this does the full tls handshake, whose session is kept
+        to be resumed by the timed request and later tests of the host.
+        """
+        hostname = urlparse(url).hostname
+        result = fetch(
+            url,
+            address,
+            self._connect_timeout,
+            context=self._ssl_context,
+            session=self._sessions.get(hostname),
+            method="HEAD",
+            proxy=self._proxy_for(url),
+        )
+        if result.session is not None:
+            self._sessions[hostname] = result.session
+        if result.proxy:
+            self.proxy_times.append(result.proxy)
+        return result
+
+    def _proxy_for(self, url: str) -> ProxyPool | None:
+        """Returns the proxy to test the url through, if any."""
+        url_parts = urlparse(url)
+        proxy = self._proxies.get(url_parts.scheme)
+        if proxy is None or proxy_bypass(url_parts.hostname):
+            return None
+        return proxy
+
+    def _addresstime(
+        self,
+        url: str,
+        address: str,
+        deadline: float,
+        warmup: FetchResult | None = None,
+        entry: DistEntry | None = None,
+    ):
+        """Times downloading a file from one address, warming up the
+        route to it first unless the FetchResult of that is given.
+        Safe to run in worker threads.
+
+        Returns the ProbeStats, the download time or None, and the
+        ManifestHasher of the download, for checking it against entry,
+        by default the test file, or None
+        """
+        url_parts = urlparse(url)
+        proxy = self._proxy_for(url)
+        stats = ProbeStats()
+        hasher = ManifestHasher(entry or self._files[0])
+        try:
+            if warmup is None:
+                warmup = self._warmup(url, address)
+            result = fetch(
+                url,
+                address,
+                self._connect_timeout,
+                deadline,
+                hasher,
+                self._ssl_context,
+                self._sessions.get(url_parts.hostname),
+                proxy=proxy,
+            )
+        except DeadlineExceeded:
+            # a bail out, only a failure when the full timeout was allowed
+            hasher.close()
+            return (stats, None, None)
+        except OSError as e:
+            hasher.close()
+            self.output.write(
+                "_addresstime(): %s via %s failed: %s\n",
+                2,
+                url,
+                address or url_parts.hostname,
+                e,
+            )
+            stats.add_failure()
+            return (stats, None, None)
+
+        if result.session is not None:
+            self._sessions[url_parts.hostname] = result.session
+        if result.proxy:
+            self.proxy_times.append(result.proxy)
+        # a pooled connection, or one to a proxy for an http url, has no
+        # connect to the mirror to time
+        latencies = [result.ttfb]
+        if not warmup.pooled and not (proxy and url_parts.scheme == "http"):
+            latencies.insert(0, warmup.connect)
+        handshake = None
+        if url_parts.scheme == "https" and not warmup.pooled:
+            handshake = warmup.handshake
+            self.output.write(
+                "_addresstime(): tls handshake %.3fs, %s %.3fs for %s\n",
+                2,
+                warmup.handshake,
+                "resumed" if result.resumed else "not resumed",
+                result.handshake,
+                address or url_parts.hostname,
+            )
+
+        stats.transferred += result.nbytes
+        transfer = result.total - result.connect - result.handshake - result.ttfb
+        stats.add_success(latencies, result.nbytes / max(transfer, 1e-6), handshake)
+        return (stats, result.total - result.handshake, hasher)
+
+    def _sizetime(self, url: str, address: str | None, stats: ProbeStats):
+        """Times range requests of the first bytes of url at each of the
+        sizes, over one kept alive connection, recording the transfers
+        in stats.  They are not part of the timed test, a failure is
+        only reported.
+        """
+        hostname = urlparse(url).hostname
+        try:
+            transfers = fetch_ranges(
+                url,
+                self._sizes,
+                address,
+                self._connect_timeout,
+                time.monotonic() + self._download_timeout,
+                self._ssl_context,
+                self._sessions.get(hostname),
+                self._proxy_for(url),
+            )
+        except OSError as e:
+            self.output.write(
+                "_sizetime(): %s via %s failed: %s\n", 2, url, address or hostname, e
+            )
+            return
+        self.output.write("_sizetime(): %s for %s\n", 2, transfers, url)
+        stats.transferred += sum(nbytes for nbytes, _ in transfers)
+        stats.transfers.extend(transfers)
+
+    def _check_download(self, caller: str, hasher: ManifestHasher, host: str):
+        """Checks a download against its entry, reporting any mismatch.
+
+        @rtype: boolean, whether the download is intact
+        """
+        failed = hasher.mismatches()
+        if not failed:
+            return True
+        entry = hasher.entry
+        message = f"\n{caller}(): {', '.join(failed)} error for file: {entry.name}\n"
+        for name in failed:
+            if name == "size":
+                expected, got = entry.size, hasher.size
+            else:
+                expected, got = entry.hashes[name], hasher.hashers[name].hexdigest()
+            message += f"         expected: {expected}\n         got.....: {got}\n"
+        self.output.write(message + f"         host....: {host}\n")
+        self.dl_failures += 1
+        return False
+
     def _test_connection(self, test_url, url_parts, ip, ips):
         """Tests the url for a connection, will recurse using
         the original url instead of the ip if an HTTPError occurs
@@ -358,24 +1163,29 @@ class Deep:
             self.output.write(
                 "deeptime(): connection to host %s\n"
                 "            returned HTTPError: %s for ip %s\n"
-                "            Switching back to original url\n"
-                % (url_parts.hostname, e, ip),
+                "            Switching back to original url\n",
                 2,
+                url_parts.hostname,
+                e,
+                ip,
             )
             if len(ips) == 1:
                 test_url = urlunparse(url_parts)
                 return self._test_connection(test_url, url_parts, ip, [])
         except (OSError, ssl.CertificateError) as e:
             self.output.write(
-                "deeptime(): connection to host %s "
-                "failed for ip %s:\n            %s\n" % (url_parts.hostname, ip, e),
+                "deeptime(): connection to host %s failed for ip %s:\n            %s\n",
                 2,
+                url_parts.hostname,
+                ip,
+                e,
             )
         except TimeoutException:
             self.output.write(
-                ("deeptime(): connection to host %s " "timed out for ip %s\n")
-                % (url_parts.hostname, ip),
+                "deeptime(): connection to host %s timed out for ip %s\n",
                 2,
+                url_parts.hostname,
+                ip,
             )
         except Exception as e:  # Add general exception to catch any other errors
             self.output.print_warn(
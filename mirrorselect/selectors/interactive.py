@@ -25,12 +25,94 @@ Distributed under the terms of the GNU General Public License v2
 
 """
 
+import curses
+import queue
+import socket
 import subprocess
 import sys
+import threading
+import time
 from optparse import Values
+from urllib.parse import urlparse
 
+from mirrorselect.errors import NoMirrorsError
 from mirrorselect.mirrorset import Endpoint
 from mirrorselect.output import Output
+from mirrorselect.scoring import ProbeStats, Scorer
+from mirrorselect.selectors.deep import Deep
+from mirrorselect.tui import MirrorList, select
+
+# Number of hosts probed at the same time while the user chooses.
+MAX_PROBE_WORKERS = 16
+
+# Connections timed to hosts that can not be deep tested, eg. rsync ones.
+CONNECT_SAMPLES = 3
+
+DEFAULT_PORTS = {"rsync": 873, "ftp": 21, "http": 80, "https": 443}
+
+
+class BackgroundProbe(Deep):
+    """Probes the hosts of the interactive selector in daemon threads,
+    passing each result to on_result as it arrives.  The constructor
+    returns at once.
+
+    http and https hosts are tested like in deep mode, only the time
+    taken to connect is measured for the others.
+    """
+
+    checkpointed = False
+
+    def deeptest(self):
+        self._stop = threading.Event()
+        self.dl_failures = 0
+        hosts: queue.Queue[Endpoint] = queue.Queue()
+        for host in self._hosts:
+            hosts.put(host)
+        for _ in range(min(len(self._hosts), MAX_PROBE_WORKERS)):
+            threading.Thread(target=self._worker, args=(hosts,), daemon=True).start()
+
+    def stop(self):
+        """Stops probing, the hosts being probed finish in the background."""
+        self._stop.set()
+
+    def _worker(self, hosts: "queue.Queue[Endpoint]"):
+        while not self._stop.is_set():
+            try:
+                host = hosts.get_nowait()
+            except queue.Empty:
+                return
+            if urlparse(host.uri).scheme in ("http", "https"):
+                stats = self.threadtime(host)
+            else:
+                stats = self.connecttime(host)
+            if not self._stop.is_set() and self._on_result is not None:
+                self._on_result(host, stats)
+
+    def connecttime(self, host: Endpoint) -> ProbeStats:
+        """Times connecting to a host, safe to run in worker threads."""
+        stats = ProbeStats(ipv6=host.ipv6)
+        url_parts = urlparse(host.uri)
+        try:
+            port = url_parts.port or DEFAULT_PORTS.get(url_parts.scheme)
+        except ValueError:
+            port = None
+        if url_parts.hostname is None or port is None:
+            stats.add_failure()
+            return stats
+        latencies = []
+        for _ in range(CONNECT_SAMPLES):
+            start = time.monotonic()
+            try:
+                with socket.create_connection(
+                    (url_parts.hostname, port), timeout=self._connect_timeout
+                ):
+                    latencies.append(time.monotonic() - start)
+            except OSError as e:
+                self.output.write("connecttime(): %s: %s\n", 2, host.uri, e)
+                stats.add_failure()
+                return stats
+        stats.add_success(latencies)
+        return stats
 
 
 class Interactive:
@@ -41,15 +123,25 @@ class Interactive:
         self.urls: list[str] = []
 
         self.interactive(hosts, options)
-        self.output.write(f"Interactive.interactive(): self.urls = {self.urls}\n", 2)
+        self.output.write("Interactive.interactive(): self.urls = %s\n", 2, self.urls)
 
         if not self.urls or len(self.urls[0]) == 0:
-            sys.exit(1)
+            raise NoMirrorsError("No mirrors were selected.")
 
     def interactive(self, hosts: list[Endpoint], options: Values):
         """
         Some sort of interactive menu thingy.
+
+        On a terminal the mirrors are probed in the background and listed
+        with their results by a curses screen, dialog is used otherwise.
         """
+        if sys.stdin.isatty() and sys.stdout.isatty():
+            try:
+                self.urls = self.tui(hosts, options)
+                return
+            except curses.error as e:
+                self.output.write("interactive(): no curses screen: %s\n", 2, e)
+
         if options.rsync:
             dialog = [
                 "dialog",
@@ -102,3 +194,47 @@ class Interactive:
         sys.stderr.write("\x1b[2J\x1b[H")
         if lines:
             self.urls = [x.decode("utf-8").rstrip() for x in lines]
+
+    def tui(self, hosts: list[Endpoint], options: Values) -> list[str]:
+        """Lets the user select mirrors on a curses screen, sorted by the
+        results of probing them in the background as they arrive.
+
+        @param hosts: list of hosts to choose from
+        @param options: parser.parse_args() options instance
+        @rtype: list of the selected urls
+        @raises curses.error: when the terminal can not be used
+        """
+        if options.ipv6:
+            hosts = [h for h in hosts if h.ipv6]
+        elif options.ipv4:
+            hosts = [h for h in hosts if h.ipv4]
+        if options.rsync:
+            hosts = [
+                (
+                    h
+                    if h.uri.endswith("/gentoo-portage")
+                    else h._replace(uri=h.uri + "/gentoo-portage")
+                )
+                for h in hosts
+            ]
+            title = "Gentoo RSYNC Mirrors, please select your desired mirror:"
+        else:
+            title = "Gentoo Download Mirrors, please select your desired mirrors:"
+        ipv6_marker = not options.ipv4 and not options.ipv6
+        if ipv6_marker:
+            title += "  (* = supports ipv6)"
+
+        mirrors = MirrorList(
+            hosts, options.rsync, Scorer(options.weights, options.penalties)
+        )
+        # quiet, the screen belongs to curses
+        probe = BackgroundProbe(
+            hosts,
+            options,
+            Output(0, sink=self.output.sink),
+            on_result=mirrors.add_result,
+        )
+        try:
+            return select(mirrors, title, ipv6_marker) or []
+        finally:
+            probe.stop()
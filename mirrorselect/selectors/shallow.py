@@ -25,51 +25,126 @@ Distributed under the terms of the GNU General Public License v2
 
 """
 
+import socket
 import subprocess
-import sys
+import time
+from urllib.parse import urlparse
 
+from mirrorselect.errors import NoMirrorsError
+from mirrorselect.fleet import Fleet
+from mirrorselect.hierarchy import hierarchical_search
+from mirrorselect.hops import PathProber, PathResult, resolve
 from mirrorselect.mirrorset import Endpoint
+from mirrorselect.progress import Progress
+from mirrorselect.replay import Replayer
+from mirrorselect.scoring import ProbeStats, Scorer
 
 # The netselect --ipv4 and --ipv6 options are supported only
 # with >=net-analyzer/netselect-0.4[ipv6(+)].
 NETSELECT_SUPPORTS_IPV4_IPV6 = True
 
+# netselect reports unreachable hosts with this score.
+NETSELECT_UNREACHABLE = 9999
+
 
 class Shallow:
-    """handles rapid server selection via netselect"""
+    """handles rapid server selection via netselect, or the unprivileged
+    path probes of hops.py with --hops"""
 
     def __init__(self, hosts: list[Endpoint], options, output):
         self._options = options
         self.output = output
         self.urls = []
-
-        if options.blocksize is not None:
+        self._scorer = Scorer(options.weights, options.penalties)
+        self._fleet = Fleet.from_options(options)
+        self.stats: dict[str, ProbeStats] = {}
+        self._recorder = options.record
+        self._replayer = None
+        if options.replay is not None:
+            self._replayer = Replayer(options.replay)
+        # the kind of the tests, as recorded with --record
+        self._kind = "hops" if options.hops else "netselect"
+        self._tool = "UDP path probes" if options.hops else "netselect"
+
+        if options.hierarchical:
+            self.output.print_info(
+                f"Using {self._tool} to choose the top {options.servers} "
+                "mirrors, country by country..."
+            )
+            self.urls = hierarchical_search(
+                hosts,
+                options.servers,
+                self.probe,
+                self._scorer,
+                self.output,
+                options.group_samples,
+            )[: options.servers]
+            self.output.write("Done.\n")
+        elif options.blocksize is not None:
             self.netselect_split(hosts, options.servers, options.blocksize)
         else:
             self.netselect(hosts, options.servers)
 
+        if self._fleet is not None:
+            ranked = self._scorer.rank(self.stats)
+            ranked = self._fleet.order(ranked, self._scorer.scores(self.stats))
+            self.urls = ranked[: options.servers]
+
         if len(self.urls) == 0:
-            self.output.print_err(
-                "Netselect failed to return any mirrors." " Try again using block mode."
+            if options.hops:
+                raise NoMirrorsError("None of the mirrors answered the path probes.")
+            raise NoMirrorsError(
+                "Netselect failed to return any mirrors. Try again using block mode."
             )
 
     def netselect(self, hosts: list[Endpoint], number, quiet=False):
         """
         Uses Netselect to choose the closest hosts, _very_ quickly
+
+        netselect is asked to score every host, the scores are ranked
+        like any other latency measurement.  In quiet mode the ProbeStats
+        of each host are returned instead of selecting the urls.
         """
-        if not quiet:
-            hosts = [host.uri for host in hosts]
-        top_host_dict = {}
-        top_hosts = []
+        endpoints = {host.uri: host for host in hosts}
+        stats: dict[str, ProbeStats] = {}
 
         if not quiet:
             self.output.print_info(
-                f"Using netselect to choose the top {number} mirrors..."
+                f"Using {self._tool} to choose the top {number} mirrors..."
             )
 
-        host_string = " ".join(hosts)
+        if self._replayer is not None:
+            for uri in endpoints:
+                stats[uri] = self._replayer.replay(self._kind, uri)[0]
+        elif self._options.hops:
+            stats = self.run_hops(endpoints)
+        else:
+            stats = self.run_netselect(endpoints)
+
+        if not quiet:
+            self.output.write("Done.\n")
 
-        cmd = ["netselect", f"-s{number}"]
+        for uri, host in endpoints.items():
+            if uri not in stats or not stats[uri].outcomes:
+                stats[uri] = ProbeStats(ipv6=host.ipv6)
+                stats[uri].add_failure()
+        self.stats.update(stats)
+
+        if quiet:
+            return stats
+
+        self.urls = self._scorer.rank(stats)[:number]
+        self.output.write("\nnetselect(): returning %s\n", 2, self.urls)
+
+    def run_netselect(self, endpoints: dict[str, Endpoint]) -> dict[str, ProbeStats]:
+        """Runs netselect on the hosts, recording its scores with --record.
+
+        @param endpoints: dict of the hosts' urls to the hosts
+        @rtype: dict of the urls of the hosts netselect scored to their
+                ProbeStats
+        """
+        stats: dict[str, ProbeStats] = {}
+        cmd = ["netselect", f"-s{len(endpoints)}"]
 
         if NETSELECT_SUPPORTS_IPV4_IPV6:
             if self._options.ipv4:
@@ -77,35 +152,122 @@ class Shallow:
             elif self._options.ipv6:
                 cmd.append("-6")
 
-        cmd.extend(hosts)
+        cmd.extend(endpoints)
 
-        self.output.write(f"\nnetselect(): running \"{' '.join(cmd)}\"\n", 2)
+        self.output.write('\nnetselect(): running "%s"\n', 2, " ".join(cmd))
 
+        stime = time.monotonic()
         result = subprocess.run(
             cmd, check=False, capture_output=True, encoding="utf-8", errors="replace"
         )
-
-        if not quiet:
-            self.output.write("Done.\n")
+        duration = time.monotonic() - stime
 
         if result.returncode != 0 and result.stderr:
             self.output.write(result.stderr)
 
         for line in result.stdout.splitlines():
             line = line.split()
-            if len(line) < 2:
+            if len(line) < 2 or line[1] not in endpoints:
                 continue
-            top_hosts.append(line[1])
-            top_host_dict[line[0]] = line[1]
-
+            try:
+                score = float(line[0])
+            except ValueError:
+                continue
+            host_stats = ProbeStats(ipv6=endpoints[line[1]].ipv6)
+            if score < NETSELECT_UNREACHABLE:
+                host_stats.add_success([score])
+            else:
+                host_stats.add_failure()
+            stats[line[1]] = host_stats
+
+        if self._recorder is not None:
+            for uri, host_stats in stats.items():
+                self._recorder.record(
+                    "netselect", uri, duration, host_stats.latency, host_stats
+                )
+        return stats
+
+    def run_hops(self, endpoints: dict[str, Endpoint]) -> dict[str, ProbeStats]:
+        """Probes the paths to the hosts, recording the results with
+        --record.  The hosts answering get their hop count and the round
+        trip times of the probes reaching them, the others a failure.
+
+        @param endpoints: dict of the hosts' urls to the hosts
+        @rtype: dict of the urls of the hosts resolved to their ProbeStats
+        @raises NoMirrorsError: when the paths can not be probed, eg. on
+                systems other than Linux
+        """
+        family = socket.AF_UNSPEC
+        if self._options.ipv4:
+            family = socket.AF_INET
+        elif self._options.ipv6:
+            family = socket.AF_INET6
+        names = {uri: urlparse(uri).hostname for uri in endpoints}
+
+        stime = time.monotonic()
+        addresses = resolve(sorted({n for n in names.values() if n}), family)
         self.output.write(
-            f"\nnetselect(): returning {top_hosts} and {top_host_dict}\n", 2
+            "\nrun_hops(): probing the paths to %s addresses\n",
+            2,
+            len(set(addresses.values())),
         )
-
-        if quiet:
-            return top_hosts, top_host_dict
+        try:
+            paths = PathProber().probe(sorted(set(addresses.values())))
+        except OSError as e:
+            raise NoMirrorsError(f"Can not probe the paths to the mirrors: {e}")
+        duration = time.monotonic() - stime
+
+        stats: dict[str, ProbeStats] = {}
+        for uri, name in names.items():
+            if name not in addresses:
+                continue
+            path = paths[addresses[name][1]]
+            host_stats = ProbeStats(ipv6=endpoints[uri].ipv6)
+            if path.hop_count is None:
+                host_stats.add_failure()
+            else:
+                host_stats.add_success(path.rtts)
+                host_stats.hop_counts.append(path.hop_count)
+            stats[uri] = host_stats
+            if self.output.enabled(2):
+                self.output.write("run_hops(): %s %s\n", 2, uri, self.format_path(path))
+
+        if self._recorder is not None:
+            for uri, host_stats in stats.items():
+                self._recorder.record(
+                    "hops", uri, duration, host_stats.latency, host_stats
+                )
+        return stats
+
+    @staticmethod
+    def format_path(path: PathResult) -> str:
+        """Returns the hops of a path and their round trip times, as a
+        line of text."""
+        if path.error is not None:
+            return f"{path.address}: {path.error}"
+        hops = [
+            "*" if hop is None else f"{hop.address} {hop.rtt * 1000:.1f}ms"
+            for hop in path.path()
+        ]
+        if path.hop_count is None:
+            hops.append("not reached")
+        return f"{path.address}: " + ", ".join(hops)
+
+    def probe(self, hosts: list[Endpoint]) -> dict[str, ProbeStats]:
+        """Tests the hosts quietly with netselect or --hops, in blocks if a block
+        size was given.
+
+        @param hosts: list of hosts to test
+        @rtype: dict of the hosts' urls to their ProbeStats
+        """
+        stats: dict[str, ProbeStats] = {}
+        if self._options.blocksize is None:
+            blocks = [hosts]
         else:
-            self.urls = top_hosts
+            blocks = self.host_blocks(list(hosts), self._options.blocksize)
+        for block in blocks:
+            stats.update(self.netselect(block, len(block), quiet=True))
+        return stats
 
     def netselect_split(self, hosts, number, block_size):
         """
@@ -113,48 +275,45 @@ class Shallow:
         each at most block_size in length.
         This is done in a tournament style.
         """
-        hosts = [host[0] for host in hosts]
+        hosts = list(hosts)
 
-        self.output.write(f"netselect_split() got {len(hosts)} hosts.\n", 2)
+        self.output.write("netselect_split() got %s hosts.\n", 2, len(hosts))
 
         host_blocks = self.host_blocks(hosts, block_size)
 
-        self.output.write(f" split into {len(host_blocks)} blocks\n", 2)
+        self.output.write(" split into %s blocks\n", 2, len(host_blocks))
 
-        top_hosts = []
-        ret_hosts = {}
+        stats: dict[str, ProbeStats] = {}
+        progress = Progress(
+            self.output,
+            f"Using {self._tool} in blocks of {block_size}",
+            len(hosts),
+            number,
+            self._scorer,
+        )
 
-        block_index = 0
         for block in host_blocks:
-            self.output.print_info(
-                "Using netselect to choose the top "
-                "%d hosts, in blocks of %s. %s of %s blocks complete."
-                % (number, block_size, block_index, len(host_blocks))
-            )
+            started = [progress.start() for _ in block]
+            block_stats = self.netselect(block, len(block), quiet=True)
+            for host, start in zip(block, started):
+                progress.finish(host.uri, block_stats[host.uri], start)
 
-            host_dict = self.netselect(block, len(block), quiet=True)[1]
+            if self.output.enabled(2):
+                self.output.write(
+                    "ran netselect(%s, %d), and got %s\n",
+                    2,
+                    [host.uri for host in block],
+                    len(block),
+                    {uri: s.latency for uri, s in block_stats.items()},
+                )
 
-            self.output.write(
-                f"ran netselect({block}, {len(block)}), and got {host_dict}\n",
-                2,
-            )
-
-            for key in list(host_dict.keys()):
-                ret_hosts[key] = host_dict[key]
-            block_index += 1
-
-        sys.stderr.write(
-            "\rUsing netselect to choose the top"
-            "%d hosts, in blocks of %s. %s of %s blocks complete.\n"
-            % (number, block_size, block_index, len(host_blocks))
-        )
+            stats.update(block_stats)
 
-        host_ranking_keys = sorted(ret_hosts.keys())
+        progress.close()
 
-        for rank in host_ranking_keys[:number]:
-            top_hosts.append(ret_hosts[rank])
+        top_hosts = self._scorer.rank(stats)[:number]
 
-        self.output.write(f"netselect_split(): returns {top_hosts}\n", 2)
+        self.output.write("netselect_split(): returns %s\n", 2, top_hosts)
 
         self.urls = top_hosts
 
@@ -175,10 +334,10 @@ class Shallow:
         host_array.append(hosts)
 
         self.output.write(
-            "\n_host_blocks(): returns "
-            "%s blocks, each about %s in size\n"
-            % (len(host_array), len(host_array[0])),
+            "\n_host_blocks(): returns %s blocks, each about %s in size\n",
             2,
+            len(host_array),
+            len(host_array[0]),
         )
 
         return host_array
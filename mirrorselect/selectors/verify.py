@@ -0,0 +1,115 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from optparse import Values
+from urllib.parse import urlparse
+
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.output import Output
+from mirrorselect.progress import Progress
+from mirrorselect.scoring import ProbeStats
+from mirrorselect.selectors.deep import Deep
+
+# Number of configured mirrors tested at the same time.
+MAX_VERIFY_WORKERS = 8
+
+
+class Verify(Deep):
+    """handles --verify, checking that the configured mirrors still
+    perform, all of them at once."""
+
+    checkpointed = False
+
+    def __init__(self, hosts: list[Endpoint], options: Values, output: Output):
+        """Verify class init, tests the given hosts.
+
+        @param hosts: list of the configured hosts
+        @param options: parser.parse_args() options instance
+        @param output: mirrorselect.output.Output() class instance
+        """
+        self._max_latency: float = options.max_latency
+        self._min_throughput: int = options.min_throughput
+        self.healthy = False
+        # the ftp and rsync mirrors, which the test download can not reach
+        self.unverifiable: list[str] = []
+        super().__init__(hosts, options, output)
+
+    def deeptest(self):
+        """Downloads the test file from every http and https host
+        concurrently and checks the results against the thresholds.
+        The other hosts are reported as unverifiable, they do not make
+        the configuration unhealthy."""
+        self.dl_failures = 0
+        hosts = []
+        for host in self._hosts:
+            if urlparse(host.uri).scheme in ("http", "https"):
+                hosts.append(host)
+            else:
+                self.unverifiable.append(host.uri)
+        self._tested = len(hosts)
+        progress = Progress(
+            self.output,
+            "Verifying the configured mirrors",
+            len(hosts),
+            len(hosts),
+            self._scorer,
+        )
+
+        def verifytime(host: Endpoint) -> ProbeStats:
+            started = progress.start()
+            stats = self.threadtime(host)
+            progress.finish(host.uri, stats, started)
+            return stats
+
+        workers = min(len(hosts), MAX_VERIFY_WORKERS) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(verifytime, hosts))
+        progress.close()
+
+        for host, stats in zip(hosts, results):
+            self.stats[host.uri] = stats
+            problem = self.check(stats)
+            if problem is None:
+                self.urls.append(host.uri)
+                self.output.write(
+                    "  %-12s latency %.3fs, %.0f kB/s  %s\n",
+                    1,
+                    "ok",
+                    stats.latency,
+                    stats.throughput / 1024,
+                    host.uri,
+                )
+            else:
+                self.output.write("  %-12s %s  %s\n", 1, "degraded", problem, host.uri)
+        for uri in self.unverifiable:
+            self.output.write("  %-12s %s\n", 1, "unverifiable", uri)
+        self.healthy = bool(self._hosts) and len(self.urls) == len(hosts)
+
+    def check(self, stats: ProbeStats) -> str | None:
+        """Returns what is wrong with a host's results, or None."""
+        if stats.latency is None or stats.failure_rate:
+            return "failed"
+        if stats.latency > self._max_latency:
+            return f"latency {stats.latency:.3f}s"
+        if stats.throughput is None or stats.throughput < self._min_throughput:
+            return f"throughput {(stats.throughput or 0) / 1024:.0f} kB/s"
+        return None
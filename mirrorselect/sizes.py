@@ -0,0 +1,140 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+from typing import NamedTuple
+
+from mirrorselect.scoring import K, ProbeStats, Scorer, Weights
+from mirrorselect.tournament import parse_size
+
+
+class SizeModel(NamedTuple):
+    """A mirror's expected seconds to send a file: a fixed cost per
+    request, then the file's size at its bandwidth."""
+
+    # seconds
+    latency: float
+    # bytes per second
+    bandwidth: float
+
+    def time(self, size: int) -> float:
+        return self.latency + size / self.bandwidth
+
+
+def fit_model(transfers: list[tuple[int, float]]) -> SizeModel | None:
+    """Fits the least squares SizeModel of sized transfers.
+
+    A negative latency, from noise on fast transfers, is taken as none,
+    the bandwidth is then fitted on its own.
+
+    @param transfers: list of (bytes, seconds) of the transfers
+    @rtype: SizeModel, or None without two sizes to go by, or when the
+            larger transfers were not slower
+    """
+    points = [(n, t) for n, t in transfers if n > 0 and t > 0]
+    if len({n for n, _ in points}) < 2:
+        return None
+    mean_n = sum(n for n, _ in points) / len(points)
+    mean_t = sum(t for _, t in points) / len(points)
+    variance = sum((n - mean_n) ** 2 for n, _ in points)
+    slope = sum((n - mean_n) * (t - mean_t) for n, t in points) / variance
+    if slope <= 0:
+        return None
+    latency = mean_t - slope * mean_n
+    if latency < 0:
+        latency = 0.0
+        slope = sum(n * t for n, t in points) / sum(n * n for n, _ in points)
+    return SizeModel(latency, 1 / slope)
+
+
+def parse_sizes(text: str) -> list[int]:
+    """Parses a comma separated list of at least two transfer sizes.
+
+    @param text: string, eg. "16k,1M,16M"
+    @rtype: sorted list of distinct byte counts
+    @raises ValueError: on invalid sizes
+    """
+    sizes = sorted({parse_size(item) for item in text.split(",") if item.strip()})
+    if len(sizes) < 2:
+        raise ValueError("at least two sizes are needed")
+    return sizes
+
+
+def parse_size_mix(text: str) -> list[tuple[int, float]]:
+    """Parses a "SIZE:SHARE,..." file size distribution, the shares are
+    scaled to add up to 1.
+
+    @param text: string, eg. "20k:0.9,300M:0.1"
+    @rtype: list of (bytes, share)
+    @raises ValueError: on invalid sizes or shares
+    """
+    mix: list[tuple[int, float]] = []
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        size, sep, share = item.partition(":")
+        try:
+            value = float(share) if sep else 1.0
+        except ValueError:
+            raise ValueError(f"invalid share {item.strip()!r}") from None
+        if not value > 0 or value == float("inf"):
+            raise ValueError(f"invalid share {item.strip()!r}")
+        mix.append((parse_size(size), value))
+    if not mix:
+        raise ValueError("empty size mix")
+    total = sum(share for _, share in mix)
+    return [(size, share / total) for size, share in mix]
+
+
+def expected_time(mix: list[tuple[int, float]], model: SizeModel) -> float:
+    """Returns the expected seconds to fetch a file of the size mix."""
+    return sum(share * model.time(size) for size, share in mix)
+
+
+class SizeScorer(Scorer):
+    """Ranks endpoints on the expected time of fetching a file of a size
+    mix, from the SizeModel fitted to their sized transfers, taken relative
+    to the best candidate like the terms of Scorer, with the weighted
+    failure rate added.  Without a model for every candidate Scorer's
+    ranking is used.
+    """
+
+    def __init__(
+        self,
+        mix: list[tuple[int, float]],
+        weights: Weights | None = None,
+        penalties: dict[K, float] | None = None,
+    ):
+        super().__init__(weights, penalties)
+        self.mix = mix
+
+    def scores(self, candidates: dict[K, ProbeStats]) -> dict[K, float]:
+        usable = {k: s for k, s in candidates.items() if s.latency is not None}
+        models = {k: fit_model(list(s.transfers)) for k, s in usable.items()}
+        if not models or None in models.values():
+            return super().scores(candidates)
+        times = {k: expected_time(self.mix, m) for k, m in models.items()}
+        best = min(times.values())
+        return {
+            k: (t / best - 1 if best > 0 else 0.0)
+            + self.weights.failures * usable[k].failure_rate
+            + self.penalties.get(k, 0.0)
+            for k, t in times.items()
+        }
@@ -0,0 +1,178 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import math
+import time
+from collections.abc import Callable
+
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.output import Output
+from mirrorselect.scoring import ProbeStats, Scorer
+
+# Highest probe level played, level n repeats the download 2 ** (n - 1) times.
+MAX_LEVEL = 5
+
+SIZE_SUFFIXES = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+
+
+def parse_size(text: str) -> int:
+    """Parses a byte count with an optional k, M or G suffix.
+
+    @param text: string, eg. "20M"
+    @rtype: int
+    @raises ValueError: on invalid sizes
+    """
+    text = text.strip()
+    suffix = text[-1:].lower() if text[-1:].isalpha() else ""
+    if suffix not in SIZE_SUFFIXES:
+        raise ValueError(f"invalid size {text!r}")
+    size = float(text[: len(text) - len(suffix)]) * SIZE_SUFFIXES[suffix]
+    if size <= 0 or not math.isfinite(size):
+        raise ValueError(f"invalid size {text!r}")
+    return int(size)
+
+
+class Budget:
+    """A wall clock and transfer budget for a selection."""
+
+    def __init__(
+        self,
+        seconds: float | None = None,
+        nbytes: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Budget class init
+
+        @param seconds: float, wall clock time allowed, or None
+        @param nbytes: int, bytes allowed to be downloaded, or None
+        @param clock: callable returning the current time in seconds
+        """
+        self.clock = clock
+        self.deadline = None if seconds is None else clock() + seconds
+        self.byte_limit = nbytes
+        self.spent_bytes = 0
+
+    def remaining_time(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - self.clock(), 0.0)
+
+    def remaining_bytes(self) -> int | None:
+        if self.byte_limit is None:
+            return None
+        return max(self.byte_limit - self.spent_bytes, 0)
+
+    def charge(self, nbytes: int):
+        self.spent_bytes += nbytes
+
+    def allows(self, seconds: float, nbytes: float) -> bool:
+        """Whether a probe expected to cost seconds and nbytes still fits."""
+        remaining_time = self.remaining_time()
+        if remaining_time is not None and (
+            remaining_time <= 0 or seconds > remaining_time
+        ):
+            return False
+        remaining_bytes = self.remaining_bytes()
+        if remaining_bytes is not None and (
+            remaining_bytes <= 0 or nbytes > remaining_bytes
+        ):
+            return False
+        return True
+
+
+def successive_halving(
+    hosts: list[Endpoint],
+    number: int,
+    probe: Callable[[Endpoint, int, float | None], ProbeStats],
+    scorer: Scorer,
+    budget: Budget,
+    output: Output,
+) -> list[str]:
+    """Budgeted tournament for the best hosts.
+
+    Every host is given a level 0 (cheap) probe.  After each level the
+    slower half of the hosts, but never more than leaves number hosts, is
+    dropped, and the survivors are probed at the next, costlier, level.
+    A probe is only started when its cost, estimated from the probes of
+    the same level so far, fits the remaining budget.  Play stops once a
+    level could not be completed, or after MAX_LEVEL.
+
+    @param hosts: list of Endpoint to choose from
+    @param number: int, the number of hosts wanted
+    @param probe: callable probing a host at a level, with the time left,
+            returning the ProbeStats of that probe
+    @param scorer: Scorer used to rank the probed hosts
+    @param budget: Budget of the tournament
+    @param output: mirrorselect.output.Output() class instance
+    @rtype: list of host urls, best first
+    """
+    stats: dict[str, ProbeStats] = {}
+    survivors = list(hosts)
+    # hosts dropped so far, the last dropped first
+    dropped: list[str] = []
+
+    for level in range(MAX_LEVEL + 1):
+        played: list[Endpoint] = []
+        spent_time = 0.0
+        spent_bytes = 0
+        for host in survivors:
+            if played:
+                estimate = (spent_time / len(played), spent_bytes / len(played))
+            else:
+                estimate = (0.0, 0)
+            if not budget.allows(*estimate):
+                break
+            stime = budget.clock()
+            result = probe(host, level, budget.remaining_time())
+            spent_time += budget.clock() - stime
+            spent_bytes += result.transferred
+            budget.charge(result.transferred)
+            stats.setdefault(host.uri, ProbeStats(ipv6=host.ipv6)).merge(result)
+            played.append(host)
+
+        output.write(
+            "successive_halving(): level %d probed %d of %d hosts, "
+            "%.1f seconds and %d bytes left\n",
+            2,
+            level,
+            len(played),
+            len(survivors),
+            budget.remaining_time() or 0,
+            budget.remaining_bytes() or 0,
+        )
+
+        ranked = scorer.rank({host.uri: stats[host.uri] for host in played})
+        if len(played) < len(survivors):
+            # out of budget, the hosts not reached keep their previous
+            # order, unless this is the first level and they have none
+            reached = {h.uri for h in played}
+            ranked += [h.uri for h in survivors if h.uri not in reached and level]
+            return ranked + dropped
+
+        keep = max(number, math.ceil(len(ranked) / 2))
+        survivor_uris = ranked[:keep]
+        dropped = ranked[keep:] + dropped
+        by_uri = {h.uri: h for h in survivors}
+        survivors = [by_uri[uri] for uri in survivor_uris]
+        if not survivors:
+            break
+
+    return [h.uri for h in survivors] + dropped
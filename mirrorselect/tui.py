@@ -0,0 +1,222 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import curses
+import threading
+
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.scoring import ProbeStats, Scorer
+
+# Milliseconds between redraws, so probe results show while the user
+# does nothing.
+REDRAW_INTERVAL = 250
+
+HELP = "space: select  s: sort by {sort}  enter: done  q: quit"
+
+
+class MirrorList:
+    """The mirrors of the interactive selector, their probe results and
+    the user's selection.  Results are added by the probing threads while
+    the user interface reads them.
+    """
+
+    def __init__(
+        self,
+        hosts: list[Endpoint],
+        single: bool = False,
+        scorer: Scorer | None = None,
+    ):
+        """MirrorList class init
+
+        @param hosts: list of the hosts to choose from
+        @param single: boolean, only one host can be selected
+        @param scorer: Scorer ranking the probed hosts
+        """
+        self.hosts = {h.uri: h for h in hosts}
+        self.single = single
+        self.by_speed = True
+        self.selected: list[str] = []
+        self._scorer = scorer or Scorer()
+        self._stats: dict[str, ProbeStats] = {}
+        self._lock = threading.Lock()
+        self._by_country = sorted(
+            self.hosts,
+            key=lambda uri: (
+                self.hosts[uri].country.lower(),
+                self.hosts[uri].name.lower(),
+            ),
+        )
+
+    def add_result(self, host: Endpoint, stats: ProbeStats):
+        """Records the probe results of a host, the on_result callback
+        of the selectors."""
+        with self._lock:
+            self._stats[host.uri] = stats
+
+    @property
+    def probed(self) -> int:
+        with self._lock:
+            return len(self._stats)
+
+    def toggle(self, uri: str):
+        """Selects a host, or deselects it when it was selected."""
+        if uri in self.selected:
+            self.selected.remove(uri)
+        elif self.single:
+            self.selected = [uri]
+        else:
+            self.selected.append(uri)
+
+    def rows(self) -> list[str]:
+        """Returns the uris of the hosts in display order, by country or,
+        by_speed, the ranked hosts first, then those still being probed,
+        then those that failed.
+
+        @rtype: list of uris
+        """
+        if not self.by_speed:
+            return list(self._by_country)
+        with self._lock:
+            stats = dict(self._stats)
+        ranked = self._scorer.rank(stats)
+        done = set(ranked)
+        pending = [uri for uri in self._by_country if uri not in stats]
+        failed = [uri for uri in self._by_country if uri in stats and uri not in done]
+        return ranked + pending + failed
+
+    def selection(self) -> list[str]:
+        """Returns the selected uris, in display order."""
+        return [uri for uri in self.rows() if uri in self.selected]
+
+    def describe(self, uri: str) -> str:
+        """Returns the probe results of a host for display."""
+        with self._lock:
+            stats = self._stats.get(uri)
+        if stats is None:
+            return "probing"
+        if stats.latency is None:
+            return "failed"
+        text = f"{stats.latency * 1000:6.0f} ms"
+        if stats.throughput:
+            text += f" {stats.throughput / 1024:8.0f} kB/s"
+        return text
+
+
+class _Screen:
+    """Draws a MirrorList with curses and handles the keys."""
+
+    def __init__(self, mirrors: MirrorList, title: str, ipv6_marker: bool):
+        self.mirrors = mirrors
+        self.title = title
+        self.ipv6_marker = ipv6_marker
+        self.cursor = 0
+        self.top = 0
+
+    def run(self, stdscr) -> list[str] | None:
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        stdscr.timeout(REDRAW_INTERVAL)
+        current = None
+        while True:
+            rows = self.mirrors.rows()
+            # keep the cursor on the same host as the rows are re-sorted
+            if current in rows:
+                self.cursor = rows.index(current)
+            self.cursor = max(0, min(self.cursor, len(rows) - 1))
+            height = self.draw(stdscr, rows)
+
+            key = stdscr.getch()
+            if key in (curses.KEY_UP, ord("k")):
+                self.cursor -= 1
+            elif key in (curses.KEY_DOWN, ord("j")):
+                self.cursor += 1
+            elif key == curses.KEY_PPAGE:
+                self.cursor -= height
+            elif key == curses.KEY_NPAGE:
+                self.cursor += height
+            elif key == curses.KEY_HOME:
+                self.cursor = 0
+            elif key == curses.KEY_END:
+                self.cursor = len(rows) - 1
+            elif key == ord(" ") and rows:
+                self.mirrors.toggle(rows[self.cursor])
+            elif key == ord("s"):
+                self.mirrors.by_speed = not self.mirrors.by_speed
+            elif key in (curses.KEY_ENTER, ord("\n"), ord("\r")):
+                return self.mirrors.selection()
+            elif key in (ord("q"), 27):
+                return None
+            self.cursor = max(0, min(self.cursor, len(rows) - 1))
+            current = rows[self.cursor] if rows else None
+
+    def draw(self, stdscr, rows: list[str]) -> int:
+        """Draws the screen, returns the number of list lines."""
+        stdscr.erase()
+        lines, width = stdscr.getmaxyx()
+        height = max(lines - 3, 1)
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + height:
+            self.top = self.cursor - height + 1
+
+        sort = "country" if self.mirrors.by_speed else "speed"
+        status = f"probed {self.mirrors.probed}/{len(rows)}"
+        self._put(stdscr, 0, self.title, width, curses.A_BOLD)
+        self._put(stdscr, 1, f"{HELP.format(sort=sort)}  {status}", width)
+        for line, uri in enumerate(rows[self.top : self.top + height], 3):
+            host = self.mirrors.hosts[uri]
+            selected = uri in self.mirrors.selected
+            if self.mirrors.single:
+                mark = "(*)" if selected else "( )"
+            else:
+                mark = "[x]" if selected else "[ ]"
+            marker = "* " if self.ipv6_marker and host.ipv6 else ""
+            name = f"{marker}{host.country}: {host.name}"
+            text = f"{mark} {name:<40.40} {self.mirrors.describe(uri):<22} {uri}"
+            attr = curses.A_REVERSE if line - 3 + self.top == self.cursor else 0
+            self._put(stdscr, line, text, width, attr)
+        stdscr.refresh()
+        return height
+
+    @staticmethod
+    def _put(stdscr, line: int, text: str, width: int, attr: int = 0):
+        try:
+            stdscr.addnstr(line, 0, text, width - 1, attr)
+        except curses.error:
+            # the terminal is too small
+            pass
+
+
+def select(
+    mirrors: MirrorList, title: str, ipv6_marker: bool = False
+) -> list[str] | None:
+    """Lets the user select mirrors on a curses screen, while their probe
+    results stream in.
+
+    @param mirrors: MirrorList to choose from
+    @param title: string
+    @param ipv6_marker: boolean, mark the hosts supporting ipv6
+    @rtype: list of the selected uris, or None when the user quit
+    @raises curses.error: when the terminal can not be used
+    """
+    return curses.wrapper(_Screen(mirrors, title, ipv6_marker).run)
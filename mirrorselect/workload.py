@@ -0,0 +1,182 @@
+"""Mirrorselect 2.x
+ Tool for selecting Gentoo source and rsync mirrors.
+
+Copyright 2026 Gentoo Authors
+
+Distributed under the terms of the GNU General Public License v2
+ This program is free software; you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, version 2 of the License.
+
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with this program; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301, USA.
+
+"""
+
+import hashlib
+import queue
+import threading
+from typing import NamedTuple
+
+from mirrorselect.scoring import K, ProbeStats, Scorer, Weights
+
+# Manifest hash names and the hashlib constructors verifying them.
+HASH_FUNCTIONS = {
+    "BLAKE2B": hashlib.blake2b,
+    "SHA512": hashlib.sha512,
+    "SHA256": hashlib.sha256,
+    "MD5": hashlib.md5,
+}
+
+
+class DistEntry(NamedTuple):
+    """A distfile of the workload, as listed by a Manifest DIST line."""
+
+    name: str
+    size: int
+    hashes: dict[str, str]
+
+
+def parse_manifest(lines: list[str]) -> list[DistEntry]:
+    """Reads the DIST entries of Manifest files, or of a list of
+    "DIST name size [HASH value]..." lines put together from the
+    portage fetch list.  Repeated distfiles are listed once.
+
+    @param lines: list of lines
+    @rtype: list of DistEntry
+    @raises ValueError: on malformed DIST lines
+    """
+    entries: dict[str, DistEntry] = {}
+    for number, line in enumerate(lines, 1):
+        fields = line.split()
+        if not fields or fields[0] != "DIST":
+            continue
+        if len(fields) < 3 or len(fields) % 2 == 0 or not fields[2].isdigit():
+            raise ValueError(f"line {number}: malformed DIST entry")
+        hashes = dict(zip(fields[3::2], fields[4::2]))
+        entries[fields[1]] = DistEntry(fields[1], int(fields[2]), hashes)
+    return list(entries.values())
+
+
+def choose_samples(
+    entries: list[DistEntry], count: int, max_size: int
+) -> list[DistEntry]:
+    """Picks the distfiles to test the mirrors with, the largest ones
+    of at most max_size bytes, or the smallest one if they are all larger.
+
+    @param entries: list of DistEntry of the workload
+    @param count: int, the number of distfiles wanted
+    @param max_size: int, bytes
+    @rtype: list of DistEntry
+    """
+    fitting = sorted(
+        (e for e in entries if e.size <= max_size), key=lambda e: e.size, reverse=True
+    )
+    if fitting:
+        return fitting[:count]
+    return sorted(entries, key=lambda e: e.size)[:1]
+
+
+class ManifestHasher:
+    """Computes every supported hash of a download at once, for
+    checking it against its DistEntry.
+
+    The chunks are handed to a worker thread as they arrive and hashed
+    there, hashlib lets go of the GIL while hashing, so the hashing does
+    not slow down the timed download.  Call close() when giving up on a
+    download, mismatches() waits for the hashing to complete.
+    """
+
+    def __init__(self, entry: DistEntry):
+        self.entry = entry
+        self.size = 0
+        self.hashers = {
+            name: HASH_FUNCTIONS[name]()
+            for name in entry.hashes
+            if name in HASH_FUNCTIONS
+        }
+        self._chunks: queue.SimpleQueue[bytes | None] = queue.SimpleQueue()
+        self._worker: threading.Thread | None = None
+
+    def update(self, data: bytes):
+        self.size += len(data)
+        if not self.hashers:
+            return
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._hash, daemon=True)
+            self._worker.start()
+        self._chunks.put(data)
+
+    def _hash(self):
+        while (data := self._chunks.get()) is not None:
+            for hasher in self.hashers.values():
+                hasher.update(data)
+
+    def close(self):
+        """Waits for the chunks handed over so far to be hashed."""
+        if self._worker is not None:
+            self._chunks.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def mismatches(self) -> list[str]:
+        """Returns the names of the failed checks, "size" or a hash name."""
+        self.close()
+        failed = []
+        if self.entry.size and self.size != self.entry.size:
+            failed.append("size")
+        for name, hasher in self.hashers.items():
+            if hasher.hexdigest() != self.entry.hashes[name].lower():
+                failed.append(name)
+        return failed
+
+
+def projected_time(entries: list[DistEntry], stats: ProbeStats) -> float | None:
+    """Projects the seconds fetching the whole workload from a mirror
+    takes, one connection and request per distfile, about two latencies
+    and a tls handshake, then the data at the measured throughput.
+
+    @param entries: list of DistEntry of the workload
+    @param stats: ProbeStats of the mirror
+    @rtype: float, or None without a latency and throughput to go by
+    """
+    if stats.latency is None or not stats.throughput:
+        return None
+    per_file = 2 * stats.latency + (stats.handshake or 0)
+    return sum(per_file + e.size / stats.throughput for e in entries)
+
+
+class WorkloadScorer(Scorer):
+    """Ranks endpoints on the projected fetch time of a workload, taken
+    relative to the best candidate like the terms of Scorer, with the
+    weighted failure rate added.  Without a throughput measured for every
+    candidate, eg. after latency only tests, Scorer's ranking is used.
+    """
+
+    def __init__(
+        self,
+        entries: list[DistEntry],
+        weights: Weights | None = None,
+        penalties: dict[K, float] | None = None,
+    ):
+        super().__init__(weights, penalties)
+        self.entries = entries
+
+    def scores(self, candidates: dict[K, ProbeStats]) -> dict[K, float]:
+        usable = {k: s for k, s in candidates.items() if s.latency is not None}
+        times = {k: projected_time(self.entries, s) for k, s in usable.items()}
+        if not times or None in times.values():
+            return super().scores(candidates)
+        best = min(times.values())
+        return {
+            k: (t / best - 1 if best > 0 else 0.0)
+            + self.weights.failures * usable[k].failure_rate
+            + self.penalties.get(k, 0.0)
+            for k, t in times.items()
+        }
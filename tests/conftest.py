@@ -0,0 +1,26 @@
+# Copyright 2026 Gentoo Authors
+
+from mirrorselect.scoring import ProbeStats
+
+
+def stats(
+    latency=None,
+    throughput=None,
+    failures=0,
+    ipv6=False,
+    handshake=None,
+    transferred=0,
+):
+    """Returns the ProbeStats of a host: failures failed probes, then a
+    probe seeing latency, a float or a list of floats, or a failed one
+    when latency is None."""
+    s = ProbeStats(ipv6=ipv6)
+    for _ in range(failures):
+        s.add_failure()
+    if latency is None:
+        s.add_failure()
+    else:
+        latencies = latency if isinstance(latency, list) else [latency]
+        s.add_success(latencies, throughput, handshake)
+    s.transferred = transferred
+    return s
@@ -0,0 +1,172 @@
+# Copyright 2026 Gentoo Authors
+
+import hashlib
+import io
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mirrorselect.api import MirrorSelector
+from mirrorselect.errors import InvalidOptionsError, NoMirrorsError
+from mirrorselect.mirrorparser3 import MIRRORS_3_XML, MirrorParser3
+
+MIRRORS = """<?xml version="1.0" encoding="UTF-8"?>
+<mirrors>
+<mirrorgroup region="Europe" country="DE" countryname="Germany">
+  <mirror>
+    <name>A</name>
+    <uri protocol="https" ipv4="y" ipv6="y" partial="n">https://a.example/</uri>
+  </mirror>
+  <mirror>
+    <name>B</name>
+    <uri protocol="http" ipv4="y" ipv6="n" partial="n">http://b.example/</uri>
+  </mirror>
+</mirrorgroup>
+<mirrorgroup region="Asia" country="JP" countryname="Japan">
+  <mirror>
+    <name>C</name>
+    <uri protocol="https" ipv4="y" ipv6="y" partial="n">https://c.example/</uri>
+  </mirror>
+</mirrorgroup>
+</mirrors>
+"""
+
+
+class MirrorSelectorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.selector = MirrorSelector(out=io.StringIO(), clock=lambda: self.now)
+        # a mirror list downloaded just now
+        self.mirrorset = MirrorParser3.parse(MIRRORS)
+        self.selector._lists[MIRRORS_3_XML] = (self.now, self.mirrorset)
+
+    def tearDown(self):
+        self.selector.close()
+
+    def test_all(self):
+        selection = self.selector.select("all", 5)
+        self.assertEqual(
+            selection.urls,
+            ["http://b.example/", "https://a.example/", "https://c.example/"],
+        )
+        selection = self.selector.select("all", filter="ipv6 and region:Europe")
+        self.assertEqual(selection.urls, ["https://a.example/"])
+        with self.assertRaises(NoMirrorsError):
+            self.selector.select("all", country="Nowhere")
+
+    def test_list_cache(self):
+        self.selector.select("all")
+        self.assertIs(self.selector._mirrorset(MIRRORS_3_XML), self.mirrorset)
+        self.now += 3600
+        self.assertIs(self.selector._mirrorset(MIRRORS_3_XML), self.mirrorset)
+        self.now += 1
+        self.assertIsNone(self.selector._mirrorset(MIRRORS_3_XML))
+
+    def test_unknown_options(self):
+        for options in ({"speed": 1}, {"output": True}, {"target": "/mnt"}):
+            with self.assertRaises(InvalidOptionsError):
+                self.selector.select("all", **options)
+        with self.assertRaises(InvalidOptionsError):
+            self.selector.select("fastest")
+
+    def test_option_values(self):
+        # converted as from the command line
+        values = self.selector._options(
+            "deep", 1, {"timeout": "5", "min_throughput": 1000, "exclude": "x"}
+        )
+        self.assertEqual(values.timeout, 5)
+        self.assertEqual(values.exclude, ["x"])
+        for options in (
+            {"timeout": "soon"},
+            {"min_throughput": "fast"},
+            {"weights": "speed=1"},
+            {"sizes": 12},
+        ):
+            with self.assertRaises(InvalidOptionsError):
+                self.selector._options("deep", 1, options)
+
+    def test_deep_from_thread(self):
+        errors = []
+
+        def select():
+            try:
+                self.selector.select("deep")
+            except InvalidOptionsError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=select)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(errors), 1)
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves every path as a mirror with a flat layout."""
+
+    test_file = b"mirrorselect" * 100
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path.endswith("/distfiles/layout.conf"):
+            body = b"[structure]\n0=flat\n"
+        elif self.path.endswith("/distfiles/mirrorselect-test"):
+            body = self.test_file
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TournamentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.selector = MirrorSelector(out=io.StringIO())
+
+    def tearDown(self):
+        self.selector.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_pings_each_selection(self):
+        port = self.server.server_address[1]
+        mirrorset = MirrorParser3.parse(
+            '<?xml version="1.0" encoding="UTF-8"?>\n<mirrors>\n'
+            '<mirrorgroup region="Europe" country="DE" countryname="Germany">\n'
+            + "".join(
+                f'<mirror><name>{name}</name><uri protocol="http" ipv4="y" '
+                f'ipv6="n" partial="n">http://127.0.0.1:{port}/{name}/</uri>'
+                "</mirror>\n"
+                for name in "abcd"
+            )
+            + "</mirrorgroup>\n</mirrors>\n"
+        )
+        layouts = [f"/{name}/distfiles/layout.conf" for name in "abcd"]
+        md5 = hashlib.md5(Handler.test_file).hexdigest()
+        self.selector._lists[MIRRORS_3_XML] = (self.selector._clock(), mirrorset)
+        for _ in range(2):
+            self.server.requests.clear()
+            selection = self.selector.select("deep", md5=md5, time_budget=30)
+            self.assertEqual(len(selection.urls), 1)
+            # the layouts known from the first selection are fetched
+            # again, timing a round trip to every mirror
+            self.assertEqual(
+                sorted(path for path in self.server.requests if path in layouts),
+                layouts,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+# Copyright 2026 Gentoo Authors
+
+import os
+import tempfile
+import unittest
+from optparse import Values
+
+from mirrorselect.checkpoint import Checkpoint, run_key
+from mirrorselect.scoring import ProbeStats
+
+
+def options(**kw):
+    values = dict(file="mirrorselect-test", md5="x", timeout=10, workload=None)
+    values.update(kw)
+    return Values(values)
+
+
+class CheckpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "checkpoint")
+        self.now = 1000000.0
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def clock(self):
+        return self.now
+
+    def test_run_key(self):
+        self.assertEqual(run_key(options()), run_key(options()))
+        self.assertNotEqual(run_key(options()), run_key(options(timeout=5)))
+
+    def test_resume(self):
+        stats = ProbeStats(ipv6=True)
+        stats.add_success([0.1, 0.2], 1e6, 0.05)
+        stats.add_failure()
+        stats.transferred = 4096
+
+        checkpoint = Checkpoint(self.path, "k", clock=self.clock)
+        checkpoint.record("http://a/", stats, 0.3)
+        checkpoint.record("http://b/", ProbeStats(), None)
+        checkpoint.close()
+        other = Checkpoint(self.path, "other", resume=True, clock=self.clock)
+        other.record("http://d/", stats, 0.1)
+        other.close()
+        # an interrupted write
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write('{"key": "k", "time": 1000000.0, "uri": "http://c/", "my\n')
+
+        resumed = Checkpoint(self.path, "k", resume=True, clock=self.clock)
+        resumed.close()
+        self.assertEqual(list(resumed.results), ["http://a/", "http://b/"])
+        restored, mytime, _ = resumed.results["http://a/"]
+        self.assertEqual(mytime, 0.3)
+        self.assertEqual(restored.to_dict(), stats.to_dict())
+        self.assertEqual(restored.failure_rate, 0.5)
+
+        self.now += 7200
+        stale = Checkpoint(self.path, "k", resume=True, clock=self.clock)
+        stale.close()
+        self.assertEqual(stale.results, {})
+        # without resume the file is started anew
+        Checkpoint(self.path, "k").close()
+        self.assertEqual(os.path.getsize(self.path), 0)
+
+    def test_bail_out_time(self):
+        fast = ProbeStats()
+        fast.add_success([0.1], 1e6)
+        checkpoint = Checkpoint(self.path, "k", clock=self.clock)
+        checkpoint.record("http://fast/", fast, 0.3, 10)
+        checkpoint.record("http://bailed/", ProbeStats(), None, 0.5)
+        checkpoint.record("http://unknown/", ProbeStats(), None)
+        checkpoint.close()
+
+        resumed = Checkpoint(self.path, "k", resume=True, clock=self.clock)
+        resumed.close()
+        self.assertEqual(resumed.resume("http://fast/", 10)[1], 0.3)
+        # the test would bail out at this time
+        self.assertIsNone(resumed.resume("http://fast/", 0.2))
+        self.assertIsNotNone(resumed.resume("http://bailed/", 0.4))
+        # it might complete at a higher bail out time, eg. with a higher -s
+        self.assertIsNone(resumed.resume("http://bailed/", 1))
+        self.assertIsNone(resumed.resume("http://unknown/", 0.1))
+        self.assertIsNone(resumed.resume("http://other/", 10))
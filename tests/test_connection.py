@@ -0,0 +1,42 @@
+# Copyright 2026 Gentoo Authors
+
+import os
+import unittest
+from optparse import Values
+from unittest import mock
+
+from mirrorselect.connection import ProbeCache, ProxyPool, get_proxies
+
+
+class ProxyTestCase(unittest.TestCase):
+    def test_get_proxies(self):
+        env = {"http_proxy": "http://env:3128", "https_proxy": "http://env:3129"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            self.assertEqual(
+                get_proxies(Values({"proxy": None})),
+                {"http": "http://env:3128", "https": "http://env:3129"},
+            )
+            options = Values({"proxy": "http://cli:8080"})
+            self.assertEqual(get_proxies(options)["http"], "http://cli:8080")
+            self.assertEqual(get_proxies(options)["https"], "http://env:3129")
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(get_proxies(Values({"proxy": None})), {})
+
+    def test_proxy_pool(self):
+        pool = ProxyPool("user:p%40ss@proxy.example:3128")
+        self.assertEqual((pool.host, pool.port), ("proxy.example", 3128))
+        self.assertEqual(pool.headers, {"Proxy-Authorization": "Basic dXNlcjpwQHNz"})
+        self.assertEqual(ProxyPool("http://proxy.example").port, 80)
+        with self.assertRaises(ValueError):
+            ProxyPool("socks5://proxy.example:1080")
+
+    def test_probe_cache(self):
+        cache = ProbeCache()
+        pool = cache.proxy_pool("http://proxy.example:3128")
+        self.assertIs(cache.proxy_pool("http://proxy.example:3128"), pool)
+        with self.assertRaises(ValueError):
+            cache.proxy_pool("socks5://proxy.example:1080")
+        cache.sessions["mirror.example"] = None
+        cache.close()
+        self.assertIsNot(cache.proxy_pool("http://proxy.example:3128"), pool)
+        self.assertIn("mirror.example", cache.sessions)
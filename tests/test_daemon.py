@@ -0,0 +1,220 @@
+# Copyright 2026 Gentoo Authors
+
+import io
+import os
+import tempfile
+import threading
+import unittest
+from optparse import Values
+from unittest import mock
+
+from mirrorselect.daemon import (
+    MirrorDaemon,
+    _Server,
+    query_daemon,
+    socket_in_use,
+)
+from mirrorselect.errors import MirrorselectError
+from mirrorselect.extractor import Extractor
+from mirrorselect.main import DEFAULT_TEST_MD5, MirrorSelect
+from mirrorselect.mirrorparser3 import MirrorParser3
+from mirrorselect.output import Output
+from mirrorselect.scoring import Weights
+from tests.conftest import stats
+
+MIRRORS = """<?xml version="1.0" encoding="UTF-8"?>
+<mirrors>
+<mirrorgroup region="Europe" country="DE" countryname="Germany">
+  <mirror>
+    <name>A</name>
+    <uri protocol="https" ipv4="y" ipv6="y" partial="n">https://a.example/</uri>
+  </mirror>
+  <mirror>
+    <name>B</name>
+    <uri protocol="https" ipv4="y" ipv6="n" partial="n">https://b.example/</uri>
+  </mirror>
+</mirrorgroup>
+<mirrorgroup region="Asia" country="JP" countryname="Japan">
+  <mirror>
+    <name>C</name>
+    <uri protocol="https" ipv4="y" ipv6="y" partial="n">https://c.example/</uri>
+  </mirror>
+  <mirror>
+    <name>D</name>
+    <uri protocol="https" ipv4="y" ipv6="y" partial="n">https://d.example/</uri>
+  </mirror>
+</mirrorgroup>
+</mirrors>
+"""
+
+LATENCIES = {
+    "https://a.example/": 0.3,
+    "https://b.example/": 0.1,
+    "https://c.example/": 0.2,
+}
+
+
+def query(**kw):
+    values = dict(servers=3, filters={}, exclude=None, weights=None, fleet=None)
+    values.update(kw)
+    return values
+
+
+def client_options(**kw):
+    values = dict(
+        servers=2,
+        country=None,
+        region=None,
+        ftp=False,
+        http=False,
+        https=False,
+        filter=None,
+        ipv4=False,
+        ipv6=False,
+        exclude=None,
+        weights=Weights(),
+        fleet=False,
+    )
+    values.update(kw)
+    return Values(values)
+
+
+class MirrorDaemonTestCase(unittest.TestCase):
+    def setUp(self):
+        options = Values(dict(weights=Weights(), workload=None, refresh=60))
+        self.daemon = MirrorDaemon(options, Output(0, io.StringIO()), "")
+        self.daemon._mirrorset = MirrorParser3.parse(MIRRORS)
+        self.daemon._refreshed = True
+        for uri, latency in LATENCIES.items():
+            self.daemon._results[uri] = stats(
+                latency, 1e6, ipv6=uri != "https://b.example/"
+            )
+
+    def test_rank(self):
+        self.assertEqual(
+            self.daemon.rank(query()),
+            ["https://b.example/", "https://c.example/", "https://a.example/"],
+        )
+        self.assertEqual(self.daemon.rank(query(servers=1)), ["https://b.example/"])
+        self.assertEqual(
+            self.daemon.rank(query(filters={"region": "Europe"})),
+            ["https://b.example/", "https://a.example/"],
+        )
+        self.assertEqual(
+            self.daemon.rank(query(ipv6=True, exclude=["https://c.example/"])),
+            ["https://a.example/"],
+        )
+        self.assertEqual(
+            self.daemon.rank(query(weights={"ipv6": 10})),
+            ["https://c.example/", "https://a.example/", "https://b.example/"],
+        )
+
+    def test_fleet(self):
+        first = {
+            self.daemon.rank(
+                query(servers=1, fleet={"key": f"host{i}", "tolerance": 10})
+            )[0]
+            for i in range(50)
+        }
+        self.assertEqual(first, set(LATENCIES))
+
+    def test_not_ready(self):
+        # d.example is not tested yet
+        with self.assertRaises(LookupError):
+            self.daemon.rank(
+                query(filters={"country": "Japan"}, exclude=["https://c.example/"])
+            )
+        self.daemon._mirrorset = None
+        with self.assertRaises(LookupError):
+            self.daemon.rank(query())
+
+    def test_first_refresh(self):
+        options = client_options(
+            workload=None, refresh=60, proxy=None, max_lag=None, timeout=10
+        )
+        daemon = MirrorDaemon(options, Output(0, io.StringIO()), "")
+        replies = []
+
+        def deep(hosts, options, output, on_result):
+            # a query between every result of the first refresh
+            for host in hosts:
+                try:
+                    replies.append(daemon.rank(query()))
+                except LookupError as e:
+                    replies.append(e)
+                on_result(host, stats(LATENCIES.get(host.uri, 0.4)))
+
+        with mock.patch.object(
+            Extractor, "getlist", return_value=MirrorParser3.parse(MIRRORS)
+        ), mock.patch("mirrorselect.daemon.Deep", deep):
+            daemon.refresh()
+        self.assertEqual(len(replies), 4)
+        for reply in replies:
+            self.assertIsInstance(reply, LookupError)
+        self.assertEqual(
+            daemon.rank(query()),
+            ["https://b.example/", "https://c.example/", "https://a.example/"],
+        )
+
+
+class QueryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "daemon.sock")
+        self.output = Output(0, io.StringIO())
+        options = Values(dict(weights=Weights(), workload=None, refresh=60))
+        self.daemon = MirrorDaemon(options, self.output, self.path)
+        self.server = _Server(self.path, self.daemon)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_query(self):
+        # not loaded yet, the client tests by itself
+        self.assertIsNone(query_daemon(self.path, client_options(), self.output))
+        self.daemon._mirrorset = MirrorParser3.parse(MIRRORS)
+        self.daemon._refreshed = True
+        for uri, latency in LATENCIES.items():
+            self.daemon._results[uri] = stats(latency)
+        self.assertEqual(
+            query_daemon(self.path, client_options(), self.output),
+            ["https://b.example/", "https://c.example/"],
+        )
+        self.assertEqual(
+            query_daemon(self.path, client_options(country="Japan"), self.output),
+            ["https://c.example/"],
+        )
+        self.assertIsNone(
+            query_daemon(self.path + ".none", client_options(), self.output)
+        )
+
+    def test_socket_in_use(self):
+        self.assertTrue(socket_in_use(self.path))
+        daemon = MirrorDaemon(
+            self.daemon._options, Output(0, io.StringIO(), raises=True), self.path
+        )
+        with self.assertRaises(MirrorselectError):
+            daemon.serve()
+        self.assertTrue(os.path.exists(self.path))
+        self.server.server_close()
+        self.assertFalse(socket_in_use(self.path))
+
+
+class TestsLocallyTestCase(unittest.TestCase):
+    def test_tests_locally(self):
+        main = MirrorSelect(Output(0, io.StringIO()))
+        parser = main.build_parser()
+        for argv in ([], ["-s3", "-4", "--country", "Japan"]):
+            options, _ = parser.parse_args(argv)
+            options.md5 = DEFAULT_TEST_MD5
+            self.assertFalse(main.tests_locally(options))
+        for argv in (["--hops"], ["-f", "big"], ["--max-lag", "3"], ["--dual-stack"]):
+            options, _ = parser.parse_args(argv)
+            self.assertTrue(main.tests_locally(options))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,226 @@
+# Copyright 2026 Gentoo Authors
+
+import io
+import os
+import socket
+import tempfile
+import unittest
+from optparse import Values
+from unittest import mock
+
+from mirrorselect.fleet import DEFAULT_TOLERANCE
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.output import Output
+from mirrorselect.scoring import ProbeStats, Weights
+from mirrorselect.selectors import Deep
+from mirrorselect.workload import DistEntry, ManifestHasher
+
+
+def options(**kw):
+    values = dict(
+        servers=1,
+        timeout=10,
+        file="mirrorselect-test",
+        md5="x",
+        blake2b=None,
+        sha512=None,
+        workload=None,
+        sizes=None,
+        size_mix=None,
+        weights=Weights(),
+        penalties={},
+        fleet=False,
+        fleet_tolerance=DEFAULT_TOLERANCE,
+        host_key=None,
+        hierarchical=False,
+        group_samples=1,
+        time_budget=None,
+        byte_budget=None,
+        dual_stack=False,
+        probe_cache=None,
+        proxy=None,
+        ipv4=False,
+        ipv6=False,
+        record=None,
+        replay=None,
+        checkpoint=None,
+        resume=False,
+        incremental=None,
+    )
+    values.update(kw)
+    return Values(values)
+
+
+def hosts(count):
+    return [
+        Endpoint(f"http://m{i}/", f"m{i}", "Country", True, False) for i in range(count)
+    ]
+
+
+class TimedDeep(Deep):
+    """Deep, timing each mirror from a table instead of downloading."""
+
+    def __init__(self, times, *args, **kw):
+        self.times = times
+        self.timed: list[str] = []
+        super().__init__(*args, **kw)
+
+    def deeptime(self, url, maxtime, stats=None):
+        self.timed.append(url)
+        if self.times[url] > maxtime:
+            return (None, True)
+        stats.add_success([self.times[url]], 1e6)
+        return (self.times[url], False)
+
+
+class DualDeep(Deep):
+    """Deep, with the per address results of dual-stack mode given."""
+
+    def __init__(self, results, *args, **kw):
+        self.results = results
+        super().__init__(*args, **kw)
+
+    def _addresstime(self, url, address, deadline, warmup=None, entry=None):
+        return self.results[address]()
+
+
+def addrinfo(*addresses):
+    """Returns getaddrinfo() results for the addresses, in order."""
+    return [
+        (
+            socket.AF_INET6 if ":" in address else socket.AF_INET,
+            socket.SOCK_STREAM,
+            6,
+            "",
+            (address, 0),
+        )
+        for address in addresses
+    ]
+
+
+def success(delta):
+    def result():
+        stats = ProbeStats()
+        stats.add_success([delta / 10], 1e6)
+        return (stats, delta, None)
+
+    return result
+
+
+def bail_out():
+    return (ProbeStats(), None, None)
+
+
+def corrupt():
+    hasher = ManifestHasher(DistEntry("mirrorselect-test", 10, {}))
+    hasher.update(b"short")
+    stats = ProbeStats()
+    stats.add_success([0.01], 1e6)
+    return (stats, 0.1, hasher)
+
+
+class DeepTestCase(unittest.TestCase):
+    def test_bail_out(self):
+        times = {f"http://m{i}/": 0.1 * (1 + i / 100) for i in range(10)}
+        deep = TimedDeep(times, hosts(10), options(), Output(0))
+        self.assertEqual(deep.urls, ["http://m0/"])
+        # the slower mirrors bailed out, unscored
+        self.assertEqual(
+            [uri for uri, s in deep.stats.items() if s.latency is not None],
+            ["http://m0/"],
+        )
+
+    def test_fleet(self):
+        times = {f"http://m{i}/": 0.1 * (1 + i / 100) for i in range(10)}
+        chosen = set()
+        for key in range(20):
+            deep = TimedDeep(
+                times,
+                hosts(10),
+                options(fleet=True, host_key=f"host{key}"),
+                Output(0),
+            )
+            self.assertEqual(
+                sum(s.latency is not None for s in deep.stats.values()), 10
+            )
+            chosen.update(deep.urls)
+        self.assertGreater(len(chosen), 3)
+
+    def test_resume_other_servers(self):
+        times = {f"http://m{i}/": 0.1 * (1 + i / 10) for i in range(6)}
+        # fastest first, so the later tests bail out
+        order = hosts(6)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "checkpoint")
+            TimedDeep(times, order, options(checkpoint=path), Output(0))
+            resumed = TimedDeep(
+                times,
+                order,
+                options(servers=3, checkpoint=path, resume=True),
+                Output(0),
+            )
+        uninterrupted = TimedDeep(times, order, options(servers=3), Output(0))
+        self.assertEqual(resumed.urls, uninterrupted.urls)
+        self.assertEqual(resumed.urls, ["http://m0/", "http://m1/", "http://m2/"])
+
+
+class DualStackTestCase(unittest.TestCase):
+    url = "http://m0/distfiles/mirrorselect-test"
+
+    def dualtime(self, results, infos, maxtime=10):
+        self.log = io.StringIO()
+        deep = DualDeep(results, [], options(dual_stack=True), Output(1, self.log))
+        stats = ProbeStats()
+        with mock.patch("socket.getaddrinfo", return_value=infos):
+            result = deep.dualtime("http://m0/", self.url, maxtime, stats)
+        return deep, stats, result
+
+    def test_preferred_family(self):
+        results = {"2001:db8::1": success(0.4), "192.0.2.1": success(0.1)}
+        deep, stats, result = self.dualtime(
+            results, addrinfo("2001:db8::1", "192.0.2.1", "2001:db8::2")
+        )
+        self.assertEqual(result, (0.4, False))
+        self.assertEqual(deep.preferred_family["http://m0/"], socket.AF_INET6)
+        families = deep.family_stats["http://m0/"]
+        self.assertEqual(set(families), {socket.AF_INET6, socket.AF_INET})
+        # only the preferred family is ranked
+        self.assertEqual(list(stats.latencies), [0.04])
+        self.assertIn("This system prefers ipv6", self.log.getvalue())
+
+        deep, stats, result = self.dualtime(
+            results, addrinfo("192.0.2.1", "2001:db8::1")
+        )
+        self.assertEqual(result, (0.1, False))
+        self.assertEqual(deep.preferred_family["http://m0/"], socket.AF_INET)
+        self.assertEqual(list(stats.latencies), [0.01])
+        self.assertNotIn("This system prefers", self.log.getvalue())
+
+    def test_failures(self):
+        # the ipv6 download timed out in full, the ipv4 one is corrupt
+        results = {"2001:db8::1": bail_out, "192.0.2.1": corrupt}
+        deep, stats, result = self.dualtime(
+            results, addrinfo("2001:db8::1", "192.0.2.1")
+        )
+        self.assertEqual(result, (None, True))
+        families = deep.family_stats["http://m0/"]
+        self.assertEqual(list(families[socket.AF_INET6].outcomes), [False])
+        self.assertEqual(list(families[socket.AF_INET].outcomes), [False])
+        self.assertEqual(list(stats.outcomes), [False])
+        self.assertEqual(deep.dl_failures, 1)
+        self.assertIn("size error", self.log.getvalue())
+
+        # a bail out at a cutoff below the timeout is no failure
+        results = {"2001:db8::1": bail_out, "192.0.2.1": success(0.1)}
+        deep, stats, result = self.dualtime(
+            results, addrinfo("2001:db8::1", "192.0.2.1"), maxtime=1
+        )
+        self.assertEqual(result, (None, True))
+        families = deep.family_stats["http://m0/"]
+        self.assertEqual(list(families[socket.AF_INET6].outcomes), [])
+        self.assertEqual(list(families[socket.AF_INET].outcomes), [True])
+        self.assertEqual(list(stats.outcomes), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# Copyright 2026 Gentoo Authors
+
+import unittest
+
+from mirrorselect.filters import compile_filter, host_of
+from mirrorselect.mirrorset import (
+    Endpoint,
+    Mirror,
+    MirrorEndpoint,
+    MirrorGroup,
+    MirrorSet,
+)
+
+
+def endpoint(uri, cc, country, protocol, ipv6=False, region="Europe"):
+    return Endpoint(uri, uri, country, True, ipv6, region, cc, protocol)
+
+
+HOSTS = [
+    endpoint("https://de.example.org/gentoo/", "DE", "Germany", "https", True),
+    endpoint("http://de.example.org/gentoo/", "DE", "Germany", "http", True),
+    endpoint("https://mirror.example.net/", "NL", "Netherlands", "https", True),
+    endpoint("https://fr.example.com/", "FR", "France", "https", False),
+    endpoint(
+        "rsync://[2001:db8::1]:873/gentoo", "US", "USA", "rsync", True, "North America"
+    ),
+]
+
+
+def matching(text):
+    predicate = compile_filter(text)
+    return [h.uri for h in HOSTS if predicate(h)]
+
+
+class FiltersTestCase(unittest.TestCase):
+    def test_host_of(self):
+        self.assertEqual(
+            host_of("https://u:p@Mirror.Example.net:8080/x"), "mirror.example.net"
+        )
+        self.assertEqual(host_of(HOSTS[4].uri), "2001:db8::1")
+
+    def test_expressions(self):
+        self.assertEqual(
+            matching("DE or NL or FR, https, ipv6, not *.example.net"),
+            ["https://de.example.org/gentoo/"],
+        )
+        self.assertEqual(
+            matching("country:germany proto:http"), ["http://de.example.org/gentoo/"]
+        )
+        self.assertEqual(matching('region:"north america"'), [HOSTS[4].uri])
+        self.assertEqual(
+            matching("France or (nl and ipv6)"), [HOSTS[2].uri, HOSTS[3].uri]
+        )
+        self.assertEqual(
+            matching("host:/^(de|fr)\\./ and not http"), [HOSTS[0].uri, HOSTS[3].uri]
+        )
+        self.assertEqual(matching("not not rsync"), [HOSTS[4].uri])
+
+    def test_errors(self):
+        for text in ("", "DE or", "(DE", "DE)", "proto:gopher", "host:/[/", "and"):
+            with self.assertRaises(ValueError, msg=text):
+                compile_filter(text)
+
+    def test_mirrorset_matching(self):
+        mirror = Mirror(
+            "m",
+            [
+                MirrorEndpoint("https://m.example/", True, False, "https"),
+                MirrorEndpoint("rsync://m.example/", True, True, "rsync"),
+            ],
+        )
+        mirrorset = MirrorSet([MirrorGroup([mirror], "DE", "Germany", "Europe")])
+        hosts = mirrorset.matching(compile_filter("de ipv6")).mirrors()
+        self.assertEqual(
+            [(h.uri, h.country_code, h.protocol) for h in hosts],
+            [("rsync://m.example/", "DE", "rsync")],
+        )
+        self.assertEqual(mirrorset.matching(compile_filter("FR")).mirrors(), [])
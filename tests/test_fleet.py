@@ -0,0 +1,38 @@
+# Copyright 2026 Gentoo Authors
+
+import unittest
+from collections import Counter
+
+from mirrorselect.fleet import Fleet
+
+MIRRORS = ["a", "b", "c", "d"]
+SCORES = {"a": 0.0, "b": 0.1, "c": 0.2, "d": 0.9}
+
+
+class FleetTestCase(unittest.TestCase):
+    def test_tolerance(self):
+        order = Fleet("host", 0.25).order(MIRRORS, SCORES)
+        self.assertEqual(sorted(order[:3]), ["a", "b", "c"])
+        self.assertEqual(order[3], "d")
+        self.assertEqual(Fleet("host", 0).order(MIRRORS, SCORES), MIRRORS)
+        # unscored mirrors are left at the end
+        self.assertEqual(Fleet("host").order(["x", "a"], {"a": 0.0}), ["a", "x"])
+
+    def test_spread(self):
+        scores = dict.fromkeys(MIRRORS, 0.0)
+        first = Counter(
+            Fleet(f"host{i}").order(MIRRORS, scores)[0] for i in range(2000)
+        )
+        self.assertEqual(set(first), set(MIRRORS))
+        for count in first.values():
+            self.assertGreater(count, 400)
+            self.assertLess(count, 600)
+
+    def test_mirror_dropping_out(self):
+        scores = dict.fromkeys(MIRRORS, 0.0)
+        remaining = {k: v for k, v in scores.items() if k != "a"}
+        for i in range(200):
+            fleet = Fleet(f"host{i}")
+            before = fleet.order(MIRRORS, scores)
+            after = fleet.order(MIRRORS[1:], remaining)
+            self.assertEqual(after, [k for k in before if k != "a"])
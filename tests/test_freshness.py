@@ -0,0 +1,46 @@
+# Copyright 2026 Gentoo Authors
+
+import unittest
+
+from mirrorselect.freshness import (
+    check_freshness,
+    format_lag,
+    parse_timestamp,
+    stale_penalties,
+)
+from mirrorselect.scoring import ProbeStats, Scorer
+
+NOW = 1767225600.0  # Thu, 01 Jan 2026 00:00:00 +0000
+
+
+class FreshnessTestCase(unittest.TestCase):
+    def test_parse_timestamp(self):
+        self.assertEqual(parse_timestamp("1767225600\n"), NOW)
+        self.assertEqual(
+            parse_timestamp("1767225600 Thu Jan  1 00:00:00 UTC 2026\n"), NOW
+        )
+        self.assertEqual(parse_timestamp("Thu, 01 Jan 2026 00:00:00 +0000\n"), NOW)
+        for text in ("", "<html>Not Found</html>"):
+            with self.assertRaises(ValueError):
+                parse_timestamp(text)
+
+    def test_format_lag(self):
+        self.assertEqual(format_lag(40 * 60), "40m")
+        self.assertEqual(format_lag(5 * 3600 + 12 * 60), "5h 12m")
+        self.assertEqual(format_lag(2 * 86400 + 3 * 3600), "2d 3h")
+
+    def test_stale_mirrors(self):
+        stamps = {"fresh": NOW - 3600, "stale": NOW - 12 * 3600, "gone": None}
+        lags = check_freshness(list(stamps), stamps.get, NOW)
+        self.assertEqual(lags, {"fresh": 3600, "stale": 12 * 3600, "gone": None})
+        penalties = stale_penalties(lags, 6 * 3600)
+        self.assertEqual(penalties, {"stale": 2.0})
+
+        stats = ProbeStats()
+        stats.add_success([0.1], 1e6)
+        candidates = {"stale": stats, "fresh": stats}
+        self.assertEqual(Scorer().rank(candidates), ["stale", "fresh"])
+        self.assertEqual(
+            Scorer(penalties=penalties).rank(candidates), ["fresh", "stale"]
+        )
+        self.assertEqual(Scorer(penalties=penalties).scores(candidates)["stale"], 2.0)
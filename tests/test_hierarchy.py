@@ -0,0 +1,122 @@
+# Copyright 2026 Gentoo Authors
+
+import os
+import unittest
+
+from mirrorselect.hierarchy import hierarchical_search, sample_hosts
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.output import Output
+from mirrorselect.scoring import Scorer
+from tests.conftest import stats
+
+# (countries, mirrors) of each region, roughly those of the Gentoo list
+REGIONS = {
+    "Europe": (20, 62),
+    "Asia": (10, 20),
+    "North America": (2, 12),
+    "South America": (5, 7),
+    "Oceania": (3, 5),
+    "Africa": (5, 5),
+}
+
+
+def worldwide(home):
+    """Returns the hosts of a worldwide list and their latencies seen from
+    the region home, the other regions being far away."""
+    hosts = []
+    latency = {}
+    for r, (region, (countries, mirrors)) in enumerate(REGIONS.items()):
+        for mirror in range(mirrors):
+            country = mirror % countries
+            uri = f"https://m{mirror}.c{country}.r{r}/"
+            hosts.append(Endpoint(uri, uri, f"{region} {country}", True, False, region))
+            latency[uri] = (
+                (0.01 if region == home else 0.15) + country * 0.002 + mirror * 0.0001
+            )
+    return hosts, latency
+
+
+def probe_latencies(latency, probed):
+    """Returns a probe seeing the latencies, the unlisted hosts fail."""
+
+    def probe(batch):
+        probed.extend(batch)
+        return {host.uri: stats(latency.get(host.uri)) for host in batch}
+
+    return probe
+
+
+class HierarchicalSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.status_output = open(os.devnull, "w")
+        self.output = Output(out=self.status_output)
+
+    def tearDown(self):
+        self.status_output.close()
+
+    def test_sample_hosts(self):
+        hosts = list(range(10))
+        self.assertEqual(sample_hosts(hosts, 1), [0])
+        self.assertEqual(sample_hosts(hosts, 3), [0, 3, 6])
+        self.assertEqual(sample_hosts(hosts[:2], 3), [0, 1])
+
+    def test_finds_best_with_fewer_probes(self):
+        # 50 countries of 10 mirrors, latency grows with the country index
+        # and slightly with the mirror index within the country
+        hosts = []
+        latency = {}
+        for country in range(50):
+            for mirror in range(10):
+                uri = f"https://m{mirror}.c{country}/"
+                hosts.append(Endpoint(uri, uri, f"c{country}", True, False, "r"))
+                latency[uri] = 0.1 + country * 0.05 + (9 - mirror) * 0.001
+        probed = []
+        probe = probe_latencies(latency, probed)
+
+        ranked = hierarchical_search(hosts, 3, probe, Scorer(), self.output)
+        self.assertEqual(ranked[:3], sorted(latency, key=latency.get)[:3])
+        self.assertEqual(len(probed), len(set(probed)))
+        self.assertLess(len(probed), len(hosts) / 5)
+
+    def test_worldwide_probes(self):
+        for home in REGIONS:
+            hosts, latency = worldwide(home)
+            self.assertEqual(len(hosts), 111)
+            self.assertEqual(len({host.country for host in hosts}), 45)
+            probed = []
+            probe = probe_latencies(latency, probed)
+            ranked = hierarchical_search(hosts, 3, probe, Scorer(), self.output)
+            self.assertEqual(ranked[:3], sorted(latency, key=latency.get)[:3])
+            self.assertEqual(len(probed), len(set(probed)))
+            # fewer probes than one per country, the region stage leaves
+            # the countries of the far regions untested
+            self.assertLess(len(probed), 35)
+            if home != "Europe":
+                # a tenth of the list, or little more, outside its
+                # largest region
+                self.assertLessEqual(len(probed), 18)
+
+    def test_region_widened(self):
+        # the best region has a single working mirror, its sample
+        hosts, latency = worldwide("Africa")
+        africa = [host.uri for host in hosts if host.region == "Africa"]
+        for uri in africa[1:]:
+            del latency[uri]
+        probe = probe_latencies(latency, [])
+
+        ranked = hierarchical_search(hosts, 3, probe, Scorer(), self.output)
+        self.assertEqual(ranked[:3], sorted(latency, key=latency.get)[:3])
+
+    def test_failed_groups_tried_last(self):
+        hosts = [
+            Endpoint("a1", "a1", "A", True, False, "r"),
+            Endpoint("a2", "a2", "A", True, False, "r"),
+            Endpoint("b1", "b1", "B", True, False, "r"),
+            Endpoint("b2", "b2", "B", True, False, "r"),
+        ]
+        # a1 fails
+        latency = {"a2": 0.5, "b1": 1.0, "b2": 2.0}
+        probe = probe_latencies(latency, [])
+
+        ranked = hierarchical_search(hosts, 2, probe, Scorer(), self.output)
+        self.assertEqual(ranked, ["a2", "b1", "b2"])
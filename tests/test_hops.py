@@ -0,0 +1,174 @@
+# Copyright 2026 Gentoo Authors
+
+import socket
+import struct
+import unittest
+
+from mirrorselect.hops import (
+    BASE_PORT,
+    EXTENDED_ERR,
+    IP_RECVERR,
+    IPV6_RECVERR,
+    SO_EE_ORIGIN_ICMP,
+    SO_EE_ORIGIN_ICMP6,
+    PathProber,
+)
+
+# seconds each link adds to the round trip
+LINK_DELAY = 0.01
+
+
+class Network:
+    """A simulated network, each address reached through its routers."""
+
+    def __init__(self, routes, silent=(), filtered=()):
+        self.routes = routes
+        self.silent = set(silent)
+        self.filtered = set(filtered)
+        self.now = 0.0
+        self.sockets = []
+
+    def clock(self):
+        return self.now
+
+    def socket(self, family, kind):
+        sock = Socket(self, family)
+        self.sockets.append(sock)
+        return sock
+
+    def wait(self, sockets, timeout):
+        arrivals = [e[0] for s in sockets for e in s.errors]
+        self.now = min([self.now + max(timeout, 0)] + arrivals)
+
+
+class Socket:
+    def __init__(self, network, family):
+        self.network = network
+        self.family = family
+        self.ttl = 64
+        self.errors = []
+        self.sent = []
+        self.recverr = False
+        self.closed = False
+
+    def setsockopt(self, level, option, value):
+        if (level, option) in (
+            (socket.IPPROTO_IP, IP_RECVERR),
+            (socket.IPPROTO_IPV6, IPV6_RECVERR),
+        ):
+            self.recverr = True
+        elif (level, option) in (
+            (socket.IPPROTO_IP, socket.IP_TTL),
+            (socket.IPPROTO_IPV6, socket.IPV6_UNICAST_HOPS),
+        ):
+            self.ttl = value
+
+    def sendto(self, data, address):
+        self.sent.append((self.ttl, address[1]))
+        route = self.network.routes[address[0]]
+        if self.ttl <= len(route):
+            offender, icmp_type, hops = route[self.ttl - 1], 11, self.ttl
+            if self.family == socket.AF_INET6:
+                icmp_type = 3
+        else:
+            offender, icmp_type, hops = address[0], 3, len(route) + 1
+            if self.family == socket.AF_INET6:
+                icmp_type = 1
+        if offender in self.network.silent or offender in self.network.filtered:
+            return
+        arrival = self.network.now + 2 * hops * LINK_DELAY
+        self.errors.append((arrival, address, offender, icmp_type))
+        self.errors.sort()
+
+    def recvmsg(self, bufsize, ancbufsize, flags):
+        if not self.errors or self.errors[0][0] > self.network.now:
+            raise BlockingIOError
+        _, address, offender, icmp_type = self.errors.pop(0)
+        if self.family == socket.AF_INET6:
+            origin, level, option = (
+                SO_EE_ORIGIN_ICMP6,
+                socket.IPPROTO_IPV6,
+                IPV6_RECVERR,
+            )
+            sockaddr = struct.pack("=HHI", self.family, 0, 0)
+            sockaddr += socket.inet_pton(self.family, offender) + bytes(4)
+        else:
+            origin, level, option = SO_EE_ORIGIN_ICMP, socket.IPPROTO_IP, IP_RECVERR
+            sockaddr = struct.pack("=HH", self.family, 0)
+            sockaddr += socket.inet_pton(self.family, offender) + bytes(8)
+        data = EXTENDED_ERR.pack(113, origin, icmp_type, 0, 0, 0, 0) + sockaddr
+        return (b"", [(level, option, data)], 0, address)
+
+    def close(self):
+        self.closed = True
+
+
+class PathProberTestCase(unittest.TestCase):
+    def probe(self, network, targets, interval=0.002):
+        prober = PathProber(
+            max_hops=8,
+            interval=interval,
+            socket_factory=network.socket,
+            clock=network.clock,
+            wait=network.wait,
+        )
+        return prober.probe(targets)
+
+    def test_hops(self):
+        network = Network(
+            {
+                "192.0.2.10": ["10.0.0.1", "10.1.0.1", "10.2.0.1"],
+                "192.0.2.20": ["10.0.0.1"],
+                "2001:db8::1": ["fe80::1", "2001:db8:ff::1"],
+            },
+            silent=["10.1.0.1"],
+        )
+        results = self.probe(
+            network,
+            [
+                (socket.AF_INET, "192.0.2.10"),
+                (socket.AF_INET, "192.0.2.20"),
+                (socket.AF_INET6, "2001:db8::1"),
+            ],
+        )
+        far = results["192.0.2.10"]
+        self.assertEqual(far.hop_count, 4)
+        self.assertEqual(
+            [hop and hop.address for hop in far.path()],
+            ["10.0.0.1", None, "10.2.0.1", "192.0.2.10"],
+        )
+        self.assertAlmostEqual(far.hops[3].rtt, 6 * LINK_DELAY, delta=0.01)
+        # every probe of a ttl of 4 and more reaches the address
+        self.assertEqual(len(far.rtts), 5)
+        self.assertAlmostEqual(min(far.rtts), 8 * LINK_DELAY, delta=0.01)
+        self.assertEqual(results["192.0.2.20"].hop_count, 2)
+        self.assertEqual(results["2001:db8::1"].hop_count, 3)
+        self.assertEqual(results["2001:db8::1"].hops[2].address, "2001:db8:ff::1")
+        self.assertTrue(all(s.recverr and s.closed for s in network.sockets))
+        self.assertEqual(len(network.sockets), 2)
+
+    def test_filtered(self):
+        network = Network(
+            {"192.0.2.10": ["10.0.0.1", "10.1.0.1"], "192.0.2.20": ["10.0.0.1"]},
+            filtered=["192.0.2.10"],
+        )
+        results = self.probe(
+            network, [(socket.AF_INET, "192.0.2.10"), (socket.AF_INET, "192.0.2.20")]
+        )
+        self.assertIsNone(results["192.0.2.10"].hop_count)
+        self.assertEqual(len(results["192.0.2.10"].path()), 2)
+        self.assertEqual(results["192.0.2.20"].hop_count, 2)
+
+    def test_probes_sent(self):
+        network = Network({"192.0.2.10": ["10.0.0.1"]})
+        results = self.probe(network, [(socket.AF_INET, "192.0.2.10")], 0.05)
+        # no probes beyond the address once it answered
+        self.assertEqual(
+            network.sockets[0].sent, [(1, BASE_PORT + 1), (2, BASE_PORT + 2)]
+        )
+        self.assertEqual(results["192.0.2.10"].hop_count, 2)
+        self.assertEqual(network.now, 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+# Copyright 2026 Gentoo Authors
+
+import os
+import tempfile
+import unittest
+
+from mirrorselect.incremental import IncrementalState
+from mirrorselect.mirrorset import Endpoint, diff_endpoints
+from mirrorselect.scoring import ProbeStats
+from tests.conftest import stats
+
+
+def endpoint(uri, name="m", ipv6=False):
+    return Endpoint(uri, name, "Country", True, ipv6, protocol="http")
+
+
+class DiffEndpointsTestCase(unittest.TestCase):
+    def test_diff(self):
+        a, b, c = endpoint("http://a/"), endpoint("http://b/"), endpoint("http://c/")
+        renamed = endpoint("http://b/", name="n")
+        diff = diff_endpoints([a, b, c], [endpoint("http://a/", ipv6=True), renamed, c])
+        self.assertEqual(diff.added, [renamed])
+        self.assertEqual(diff.removed, [b])
+        self.assertEqual(diff.changed, [endpoint("http://a/", ipv6=True)])
+        self.assertEqual(diff.unchanged, [c])
+
+
+class IncrementalStateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "state.json")
+        self.now = 1000000.0
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def clock(self):
+        return self.now
+
+    def state(self, key="k"):
+        return IncrementalState(self.path, key, 3600, clock=self.clock)
+
+    def test_reuse(self):
+        a, b, c = endpoint("http://a/"), endpoint("http://b/"), endpoint("http://c/")
+        measured = stats(0.1, 1e6, handshake=0.05)
+        state = self.state()
+        self.assertEqual(state.previous, {})
+        state.record(a, measured, 0.2, 10)
+        state.record(b, ProbeStats(), None, 0.5)
+        state.record(c, measured, 0.3, 10)
+        state.save()
+        self.assertEqual(os.listdir(self.tmpdir.name), ["state.json"])
+
+        self.now += 1800
+        state = self.state()
+        diff = state.diff([a, endpoint("http://c/", ipv6=True)])
+        self.assertEqual(len(diff.removed), 1)
+        self.assertEqual(len(diff.changed), 1)
+        # slower than the bail out time now
+        self.assertIsNone(state.reuse(a, 0.1))
+        reused, mytime = state.reuse(a, 10)
+        self.assertEqual(mytime, 0.2)
+        self.assertEqual(reused.to_dict(), measured.to_dict())
+        # changed since
+        self.assertIsNone(state.reuse(endpoint("http://c/", ipv6=True), 10))
+        # bailed out, and might not now
+        self.assertIsNone(state.reuse(b, 1))
+        self.assertIsNotNone(state.reuse(b, 0.4))
+        state.save()
+
+        # reused results keep their age
+        self.now += 1800 + 1
+        self.assertEqual(self.state().previous, {})
+
+    def test_other_settings(self):
+        state = self.state()
+        state.record(endpoint("http://a/"), ProbeStats(), 0.1, 10)
+        state.save()
+        self.assertEqual(self.state("other").previous, {})
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"key": "k", "res')
+        self.assertEqual(self.state().previous, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+# Copyright 2026 Gentoo Authors
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mirrorselect.configs import DistfilesConfig
+from mirrorselect.output import Output
+
+
+class MakeConfDirTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.make_conf = os.path.join(self.tempdir, "portage", "make.conf")
+        os.makedirs(self.make_conf)
+        self.status_output = open(os.devnull, "w")
+        self.output = Output(out=self.status_output)
+        self.fsmirror = os.path.join(self.tempdir, "distfiles")
+        os.mkdir(self.fsmirror)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        self.status_output.close()
+
+    def _write(self, name, content):
+        path = os.path.join(self.make_conf, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def _read(self, name):
+        with open(os.path.join(self.make_conf, name)) as f:
+            return f.read()
+
+    def test_get_conf_path(self):
+        sut = DistfilesConfig(self.tempdir)
+        self.assertEqual(sut.get_conf_path(self.output), self.make_conf)
+
+    def test_last_definition_wins(self):
+        self._write("00-base", 'GENTOO_MIRRORS="http://a"\n')
+        self._write("10-sub/mirrors", f'GENTOO_MIRRORS="{self.fsmirror} http://b"\n')
+        self._write("20-other", 'USE="foo"\n')
+        self._write("99-ignored~", 'GENTOO_MIRRORS="http://c"\n')
+        self._write(".hidden", 'GENTOO_MIRRORS="http://d"\n')
+        sut = DistfilesConfig(self.tempdir)
+
+        fragment = sut.find_definition(self.make_conf)
+        self.assertEqual(fragment.path, os.path.join(self.make_conf, "10-sub/mirrors"))
+        self.assertEqual(
+            sut.get_filesystem_mirrors(self.output, self.make_conf), [self.fsmirror]
+        )
+        self.assertEqual(
+            sut.get_remote_mirrors(self.output, self.make_conf), ["http://b"]
+        )
+
+    def test_write_only_defining_fragment(self):
+        self._write("00-base", 'USE="foo"\n')
+        self._write("10-mirrors", 'A="b"\nGENTOO_MIRRORS="http://a \\\n  http://b"\n')
+        sut = DistfilesConfig(self.tempdir)
+        sut.write_config(self.output, self.make_conf, ["http://c"])
+
+        self.assertEqual(self._read("00-base"), 'USE="foo"\n')
+        self.assertEqual(
+            self._read("10-mirrors"), 'A="b"\n' + sut.format_config(["http://c"]) + "\n"
+        )
+        self.assertEqual(
+            self._read("10-mirrors~"),
+            'A="b"\nGENTOO_MIRRORS="http://a \\\n  http://b"\n',
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.make_conf)), ["00-base", "10-mirrors", "10-mirrors~"]
+        )
+
+    def test_write_new_fragment(self):
+        self._write("00-base", 'USE="foo"\n')
+        sut = DistfilesConfig(self.tempdir)
+        sut.write_config(self.output, self.make_conf, ["http://c"])
+
+        self.assertEqual(self._read("00-base"), 'USE="foo"\n')
+        self.assertEqual(
+            self._read("mirrorselect"), sut.format_config(["http://c"]) + "\n"
+        )
+
+    def test_latin1_fragment(self):
+        comment = "# Sebastián's mirrors\n".encode("latin-1")
+        for name in ("00-base", "10-mirrors"):
+            with open(os.path.join(self.make_conf, name), "wb") as f:
+                f.write(comment + b'USE="foo"\n')
+        with open(os.path.join(self.make_conf, "10-mirrors"), "ab") as f:
+            f.write(b'GENTOO_MIRRORS="http://a"\n')
+        sut = DistfilesConfig(self.tempdir)
+        self.assertEqual(
+            sut.get_remote_mirrors(self.output, self.make_conf), ["http://a"]
+        )
+        sut.write_config(self.output, self.make_conf, ["http://c"])
+        with open(os.path.join(self.make_conf, "10-mirrors"), "rb") as f:
+            self.assertEqual(
+                f.read(),
+                comment
+                + b'USE="foo"\n'
+                + sut.format_config(["http://c"]).encode()
+                + b"\n",
+            )
+
+    def test_fragments_tokenized_once(self):
+        self._write("00-base", 'USE="foo"\n')
+        self._write("10-mirrors", 'GENTOO_MIRRORS="http://a"\n')
+        sut = DistfilesConfig(self.tempdir)
+        scanned = []
+        scan_lines = sut.scan_lines
+
+        def counting_scan_lines(lines, path=""):
+            scanned.append(path)
+            return scan_lines(lines, path)
+
+        sut.scan_lines = counting_scan_lines
+        sut.get_filesystem_mirrors(self.output, self.make_conf)
+        sut.write_config(self.output, self.make_conf, ["http://c"])
+        self.assertEqual(sorted(scanned), sorted(sut.config_files(self.make_conf)))
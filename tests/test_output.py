@@ -0,0 +1,46 @@
+# Copyright 2026 Gentoo Authors
+
+import io
+import json
+import unittest
+
+from mirrorselect.errors import MirrorselectError
+from mirrorselect.output import JsonSink, Output
+
+
+class Exploding:
+    def __str__(self):
+        raise AssertionError("formatted a disabled message")
+
+
+class OutputTestCase(unittest.TestCase):
+    def test_lazy_formatting(self):
+        out = io.StringIO()
+        output = Output(1, out)
+        output.write("debug %s\n", 2, Exploding())
+        self.assertFalse(output.enabled(2))
+        output.write("%d hosts, %.1f%%\n", 1, 3, 50.0)
+        output.write("100%\n")
+        self.assertEqual(out.getvalue(), "3 hosts, 50.0%\n100%\n")
+
+    def test_json_sink(self):
+        out, log = io.StringIO(), io.StringIO()
+        output = Output(0, out, JsonSink(log))
+        self.assertTrue(output.enabled(2))
+        output.write("deeptime(): %s seconds\n", 2, 0.5)
+        output.print_warn("slow\n")
+        output.write("trace\n", 3)
+        self.assertEqual(out.getvalue(), "")
+        records = [json.loads(line) for line in log.getvalue().splitlines()]
+        self.assertEqual(
+            [(r["level"], r["kind"], r["message"]) for r in records],
+            [(2, "write", "deeptime(): 0.5 seconds"), (1, "warn", "slow")],
+        )
+
+    def test_raises(self):
+        out = io.StringIO()
+        with self.assertRaisesRegex(MirrorselectError, "^no mirrors$"):
+            Output(1, out, raises=True).print_err("no mirrors\n")
+        self.assertEqual(out.getvalue(), "")
+        with self.assertRaises(SystemExit):
+            Output(1, out).print_err("no mirrors")
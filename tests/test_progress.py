@@ -0,0 +1,79 @@
+# Copyright 2026 Gentoo Authors
+
+import io
+import unittest
+
+from mirrorselect.output import Output
+from mirrorselect.progress import Progress, format_duration
+from mirrorselect.scoring import Scorer
+from tests.conftest import stats
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingScorer(Scorer):
+    def __init__(self):
+        super().__init__()
+        self.ranked = 0
+
+    def rank(self, candidates):
+        self.ranked += 1
+        return super().rank(candidates)
+
+
+class ProgressTestCase(unittest.TestCase):
+    def test_format_duration(self):
+        self.assertEqual(format_duration(45), "45s")
+        self.assertEqual(format_duration(200), "3m 20s")
+        self.assertEqual(format_duration(3720), "1h 2m")
+
+    def test_counts_and_eta(self):
+        clock = Clock()
+        out = io.StringIO()
+        progress = Progress(Output(1, out), "Testing", 10, 1, clock=clock)
+        first, second = progress.start(), progress.start()
+        clock.now = 2.0
+        progress.finish(
+            "http://a.example/", stats(0.2, 1e6, transferred=2 * 1024**2), first
+        )
+        progress.finish("http://b.example/", stats(), second)
+        self.assertEqual((progress.completed, progress.failed), (2, 1))
+        self.assertEqual(progress.in_flight, 0)
+        # 8 probes left of 2s each, 2 at a time
+        self.assertEqual(progress.eta(), 8.0)
+        self.assertEqual(
+            progress.line(),
+            "Testing: 2/10 done, 0 in flight, 1 failed, 2.0 MB, "
+            "best: a.example, ETA 8s",
+        )
+
+    def test_log_lines(self):
+        clock = Clock()
+        out = io.StringIO()
+        progress = Progress(Output(1, out), "Testing", None, clock=clock)
+        for i in range(3):
+            clock.now = i * 20.0
+            progress.finish(f"http://h{i}/", stats(0.1), progress.start())
+        progress.close()
+        # not a terminal: a line at first, after 30 seconds, and at the end
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[-1].startswith("Testing: 3 done, 0 in flight"))
+        self.assertNotIn("ETA", lines[-1])
+
+    def test_ranked_once_per_probe(self):
+        scorer = CountingScorer()
+        progress = Progress(Output(1, io.StringIO()), "Testing", 2, 1, scorer)
+        progress.finish("http://a.example/", stats(0.2), progress.start())
+        for _ in range(3):
+            self.assertIn("best: a.example", progress.line())
+        progress.finish("http://b.example/", stats(0.1), progress.start())
+        for _ in range(3):
+            self.assertIn("best: b.example", progress.line())
+        self.assertEqual(scorer.ranked, 2)
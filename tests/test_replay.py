@@ -0,0 +1,118 @@
+# Copyright 2026 Gentoo Authors
+
+import io
+import os
+import tempfile
+import unittest
+
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.output import Output
+from mirrorselect.replay import Recorder, Replayer, Session, SimulatedClock
+from mirrorselect.scoring import ProbeStats, Scorer
+from mirrorselect.tournament import Budget, successive_halving
+
+HOSTS = [
+    Endpoint(f"https://mirror{i}.example/gentoo", f"mirror{i}", "X", True, i % 2 == 0)
+    for i in range(8)
+]
+
+
+def stats(seconds, ipv6=False):
+    result = ProbeStats(ipv6=ipv6)
+    result.add_success([seconds / 10], 100000 / seconds)
+    result.transferred = 100000
+    return result
+
+
+class ReplayTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "session")
+        recorder = Recorder(self.path)
+        recorder.hosts(HOSTS)
+        for i, host in enumerate(HOSTS):
+            recorder.record(
+                "ping", host.uri, 0.1 * (i + 1), 0.1 * (i + 1), stats(i + 1)
+            )
+            for attempt in range(2):
+                seconds = i + 1 + attempt
+                recorder.record(
+                    "deep", host.uri, seconds, seconds, stats(seconds, host.ipv6), 7
+                )
+        recorder.close()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_load(self):
+        session = Session.load(self.path)
+        self.assertEqual(session.hosts, HOSTS)
+        self.assertEqual(len(session.observations), 3 * len(HOSTS))
+
+    def test_malformed(self):
+        with open(self.path, "a") as f:
+            f.write('{"kind": "deep"}\n')
+        with self.assertRaisesRegex(ValueError, "session:26"):
+            Session.load(self.path)
+        with open(self.path, "w") as f:
+            f.write("")
+        with self.assertRaisesRegex(ValueError, "no hosts"):
+            Session.load(self.path)
+
+    def test_replay(self):
+        replayer = Replayer(Session.load(self.path))
+        uri = HOSTS[2].uri
+        played = [replayer.replay("deep", uri) for _ in range(3)]
+        # the observations are played in turn, starting over when exhausted
+        self.assertEqual([mytime for _, mytime in played], [3, 4, 3])
+        self.assertEqual(played[0][0].transferred, 100000)
+        self.assertTrue(played[0][0].ipv6)
+        self.assertEqual(replayer.clock(), 10)
+
+    def test_bail_out(self):
+        replayer = Replayer(Session.load(self.path))
+        result, mytime = replayer.replay("deep", HOSTS[5].uri, maxtime=2.5)
+        self.assertIsNone(mytime)
+        self.assertIsNone(result.latency)
+        self.assertEqual(replayer.clock(), 2.5)
+        # tests bail out late, no earlier than recorded
+        replayer = Replayer(Session.load(self.path))
+        self.assertEqual(replayer.replay("deep", HOSTS[5].uri, 7)[1], 6)
+
+    def test_unrecorded(self):
+        replayer = Replayer(Session.load(self.path))
+        result, mytime = replayer.replay("netselect", HOSTS[0].uri)
+        self.assertIsNone(mytime)
+        self.assertFalse(result.outcomes)
+        self.assertEqual(replayer.clock(), 0)
+
+    def test_deterministic_tournament(self):
+        session = Session.load(self.path)
+
+        def tournament():
+            replayer = Replayer(session, SimulatedClock(100))
+
+            def probe(host, level, remaining):
+                result = ProbeStats(ipv6=host.ipv6)
+                kind = "ping" if level == 0 else "deep"
+                result.merge(replayer.replay(kind, host.uri, remaining)[0])
+                return result
+
+            ranked = successive_halving(
+                session.hosts,
+                2,
+                probe,
+                Scorer(),
+                Budget(30, None, replayer.clock),
+                Output(out=io.StringIO()),
+            )
+            return ranked, replayer.clock()
+
+        first = tournament()
+        self.assertEqual(first, tournament())
+        self.assertEqual(first[0][:2], [HOSTS[0].uri, HOSTS[1].uri])
+        self.assertLessEqual(first[1], 130)
+
+
+if __name__ == "__main__":
+    unittest.main()
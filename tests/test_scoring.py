@@ -0,0 +1,74 @@
+# Copyright 2026 Gentoo Authors
+
+import unittest
+
+from mirrorselect.scoring import ProbeStats, Scorer, Weights, parse_weights
+from tests.conftest import stats
+
+
+class ScoringTestCase(unittest.TestCase):
+    def test_parse_weights(self):
+        self.assertEqual(parse_weights("latency=2, ipv6=1"), Weights(latency=2, ipv6=1))
+        self.assertEqual(parse_weights(""), Weights())
+        for text in ("speed=1", "latency", "latency=x", "latency=-1"):
+            with self.assertRaises(ValueError):
+                parse_weights(text)
+
+    def test_latency_order(self):
+        candidates = {"a": stats([0.3]), "b": stats([0.1]), "c": stats([0.2])}
+        self.assertEqual(Scorer().rank(candidates), ["b", "c", "a"])
+
+    def test_unprobed_not_ranked(self):
+        candidates = {"a": stats([0.1]), "b": stats(), "c": ProbeStats()}
+        self.assertEqual(Scorer().rank(candidates), ["a"])
+
+    def test_flaky_mirror_ranked_lower(self):
+        candidates = {
+            "fast_flaky": stats([0.10], 1e6, failures=1),
+            "stable": stats([0.12], 1e6),
+        }
+        self.assertEqual(Scorer().rank(candidates), ["stable", "fast_flaky"])
+        weights = Weights(failures=0)
+        self.assertEqual(Scorer(weights).rank(candidates), ["fast_flaky", "stable"])
+
+    def test_throughput_and_variance(self):
+        candidates = {
+            "slow": stats([0.1, 0.1], 1e5),
+            "jittery": stats([0.1, 0.1, 0.1, 0.5], 1e6),
+            "good": stats([0.1, 0.1], 1e6),
+        }
+        self.assertEqual(Scorer().rank(candidates), ["good", "jittery", "slow"])
+
+    def test_ipv6_weight(self):
+        candidates = {"v4": stats([0.1]), "v6": stats([0.11], ipv6=True)}
+        self.assertEqual(Scorer().rank(candidates), ["v4", "v6"])
+        self.assertEqual(Scorer(Weights(ipv6=1)).rank(candidates), ["v6", "v4"])
+
+    def test_hops_weight(self):
+        near, far = stats([0.1]), stats([0.09])
+        near.hop_counts.append(5)
+        far.hop_counts.append(15)
+        unreached = stats([0.08])
+        candidates = {"near": near, "far": far, "unreached": unreached}
+        self.assertEqual(Scorer().rank(candidates), ["near", "unreached", "far"])
+        self.assertEqual(
+            Scorer(Weights(hops=0)).rank(candidates), ["unreached", "far", "near"]
+        )
+        self.assertEqual(ProbeStats.from_dict(far.to_dict()).hops, 15)
+
+    def test_window(self):
+        s = ProbeStats(window=2)
+        s.add_failure()
+        s.add_success([1.0])
+        s.add_success([2.0])
+        self.assertEqual(s.failure_rate, 0)
+        self.assertEqual(list(s.latencies), [1.0, 2.0])
+
+    def test_handshake_not_ranked(self):
+        slow_tls = stats([0.1], 1e6, handshake=0.4)
+        candidates = {"slow_tls": slow_tls, "b": stats([0.11], 1e6)}
+        self.assertEqual(Scorer().rank(candidates), ["slow_tls", "b"])
+        merged = ProbeStats()
+        merged.merge(slow_tls)
+        self.assertEqual(merged.handshake, 0.4)
+        self.assertEqual(merged.latency, 0.1)
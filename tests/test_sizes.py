@@ -0,0 +1,82 @@
+# Copyright 2026 Gentoo Authors
+
+import unittest
+
+from mirrorselect.scoring import ProbeStats
+from mirrorselect.sizes import (
+    SizeModel,
+    SizeScorer,
+    expected_time,
+    fit_model,
+    parse_size_mix,
+    parse_sizes,
+)
+
+SIZES = [16 * 1024, 1024**2, 16 * 1024**2]
+
+
+def stats(latency, bandwidth):
+    result = ProbeStats()
+    result.add_success([latency], bandwidth)
+    result.transfers.extend((n, latency + n / bandwidth) for n in SIZES)
+    return result
+
+
+class SizesTestCase(unittest.TestCase):
+    def test_fit_model(self):
+        model = fit_model([(n, 0.05 + n / 1e6) for n in SIZES])
+        self.assertAlmostEqual(model.latency, 0.05)
+        self.assertAlmostEqual(model.bandwidth, 1e6)
+        self.assertAlmostEqual(model.time(2e6), 2.05)
+        # noise on fast transfers gives no negative latency
+        model = fit_model([(1000, 0.0005), (2000, 0.002), (3000, 0.0035)])
+        self.assertEqual(model.latency, 0.0)
+        self.assertGreater(model.bandwidth, 0)
+        self.assertIsNone(fit_model([(1000, 0.1), (1000, 0.2)]))
+        self.assertIsNone(fit_model([(1000, 0.2), (2000, 0.1)]))
+        self.assertIsNone(fit_model([]))
+
+    def test_parse(self):
+        self.assertEqual(parse_sizes("1M, 16k,1M"), [16384, 1048576])
+        for text in ["1M", "1M,x", ""]:
+            with self.assertRaises(ValueError):
+                parse_sizes(text)
+        self.assertEqual(
+            parse_size_mix("20k:3,300M:1"), [(20480, 0.75), (300 * 1024**2, 0.25)]
+        )
+        self.assertEqual(parse_size_mix("1k"), [(1024, 1.0)])
+        for text in ["", "1k:0", "1k:-1", "1k:x", "x:1"]:
+            with self.assertRaises(ValueError):
+                parse_size_mix(text)
+
+    def test_expected_time(self):
+        mix = [(1000, 0.5), (3000, 0.5)]
+        self.assertAlmostEqual(expected_time(mix, SizeModel(1.0, 1000.0)), 3.0)
+
+    def test_scorer(self):
+        candidates = {
+            "quick": stats(0.01, 2e6),
+            "wide": stats(0.2, 50e6),
+            "failing": stats(0.01, 2e6),
+        }
+        candidates["failing"].add_failure()
+        small = SizeScorer([(20 * 1024, 1.0)])
+        self.assertEqual(small.rank(candidates), ["quick", "failing", "wide"])
+        large = SizeScorer([(20 * 1024, 0.9), (300 * 1024**2, 0.1)])
+        self.assertEqual(large.rank(candidates)[0], "wide")
+
+    def test_scorer_fallback(self):
+        candidates = {"quick": stats(0.01, 2e6), "untimed": ProbeStats()}
+        candidates["untimed"].add_success([0.5], 1e6)
+        scorer = SizeScorer([(1024**3, 1.0)])
+        self.assertEqual(scorer.rank(candidates), ["quick", "untimed"])
+
+    def test_round_trip(self):
+        data = stats(0.01, 2e6).to_dict()
+        self.assertEqual(ProbeStats.from_dict(data).to_dict(), data)
+        del data["transfers"]
+        self.assertFalse(ProbeStats.from_dict(data).transfers)
+
+
+if __name__ == "__main__":
+    unittest.main()
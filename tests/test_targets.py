@@ -0,0 +1,96 @@
+# Copyright 2026 Gentoo Authors
+
+import io
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from mirrorselect.configs import DistfilesConfig
+from mirrorselect.errors import MirrorselectError
+from mirrorselect.main import MirrorSelect
+from mirrorselect.output import Output
+
+URLS = ["https://a.example/", "https://b.example/"]
+
+
+class RefusingConfig(DistfilesConfig):
+    """Stops as the configs do on errors they report themselves."""
+
+    def write_config(self, output, config_path, hosts):
+        output.print_err(f"{config_path} is locked")
+
+
+class TargetsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.log = io.StringIO()
+        self.main = MirrorSelect(Output(1, self.log), "/etc")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def logged(self):
+        return re.sub("\x1b\\[[0-9;]*m", "", self.log.getvalue())
+
+    def _root(self, name):
+        root = os.path.join(self.tempdir, name)
+        os.makedirs(os.path.join(root, "etc", "portage"))
+        return root
+
+    def test_get_target(self):
+        root = self._root("chroot")
+        make_conf = os.path.join(root, "etc", "portage", "make.conf")
+        config, path = self.main.get_target(DistfilesConfig, root)
+        self.assertEqual(path, make_conf)
+        # a make.conf directory is the config itself
+        os.mkdir(make_conf)
+        self.assertEqual(self.main.get_target(DistfilesConfig, make_conf)[1], make_conf)
+        other = os.path.join(self.tempdir, "mirrors.conf")
+        self.assertEqual(self.main.get_target(DistfilesConfig, other)[1], other)
+
+    def test_apply_targets(self):
+        targets = []
+        for name in ("one", "two"):
+            config, path = self.main.get_target(DistfilesConfig, self._root(name))
+            targets.append((name, config, path))
+        self.main.apply_targets(targets, URLS)
+        for _, _, path in targets:
+            with open(path, encoding="utf-8") as f:
+                self.assertIn("https://b.example/", f.read())
+        self.assertEqual(self.logged().count("OK"), 2)
+
+    def test_failing_targets(self):
+        self._fail(SystemExit)
+
+    def test_failing_targets_raising(self):
+        # embedded, as by the api, errors raise instead of exiting
+        self.main.output = Output(1, self.log, raises=True)
+        self._fail(MirrorselectError)
+
+    def _fail(self, error):
+        good, path = self.main.get_target(DistfilesConfig, self._root("good"))
+        missing = os.path.join(self.tempdir, "missing", "make.conf")
+        refusing = os.path.join(self.tempdir, "refusing.conf")
+        targets = [
+            ("missing", DistfilesConfig(os.path.dirname(missing)), missing),
+            ("good", good, path),
+            ("refusing", RefusingConfig(self.tempdir), refusing),
+        ]
+        with self.assertRaises(error) as raised:
+            self.main.apply_targets(targets, URLS)
+        # the other targets are still written
+        with open(path, encoding="utf-8") as f:
+            self.assertIn("https://a.example/", f.read())
+        log = self.logged() + str(raised.exception)
+        self.assertIn(f"OK good ({path})", log)
+        self.assertIn(f"FAILED missing ({missing})", log)
+        self.assertIn("No such file or directory", log)
+        self.assertIn(f"FAILED refusing ({refusing}): ", log)
+        self.assertIn("is locked", log)
+        self.assertIn("2 of 3 targets failed", log)
+
+
+if __name__ == "__main__":
+    unittest.main()
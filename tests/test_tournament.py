@@ -0,0 +1,86 @@
+# Copyright 2026 Gentoo Authors
+
+import os
+import unittest
+
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.output import Output
+from mirrorselect.scoring import ProbeStats, Scorer
+from mirrorselect.tournament import Budget, parse_size, successive_halving
+from tests.conftest import stats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TournamentTestCase(unittest.TestCase):
+    def setUp(self):
+        self.status_output = open(os.devnull, "w")
+        self.output = Output(out=self.status_output)
+        self.clock = FakeClock()
+        self.hosts = [Endpoint(f"h{i}", f"h{i}", "C", True, False) for i in range(16)]
+        # h0 is the fastest, h15 the slowest
+        self.speed = {host.uri: 1.0 + int(host.uri[1:]) for host in self.hosts}
+        self.probes = []
+
+    def tearDown(self):
+        self.status_output.close()
+
+    def probe(self, host, level, remaining):
+        self.probes.append((host.uri, level))
+        if level == 0:
+            self.clock.now += 0.1
+            return stats(0.01 * self.speed[host.uri])
+        result = ProbeStats()
+        for _ in range(2 ** (level - 1)):
+            self.clock.now += self.speed[host.uri]
+            result.merge(stats(0.01, 100 / self.speed[host.uri], transferred=100))
+        return result
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("20M"), 20 * 1024**2)
+        self.assertEqual(parse_size("512k"), 512 * 1024)
+        self.assertEqual(parse_size("100"), 100)
+        for text in ("", "x", "10T", "-1k", "0"):
+            with self.assertRaises(ValueError):
+                parse_size(text)
+
+    def test_halving(self):
+        budget = Budget(seconds=1000, clock=self.clock)
+        ranked = successive_halving(
+            self.hosts, 3, self.probe, Scorer(), budget, self.output
+        )
+        self.assertEqual(ranked[:3], ["h0", "h1", "h2"])
+        self.assertEqual(len(ranked), 16)
+        levels = [level for _, level in self.probes]
+        self.assertEqual(levels.count(0), 16)
+        self.assertEqual(levels.count(1), 8)
+        self.assertEqual(levels.count(2), 4)
+        self.assertEqual(levels.count(3), 3)
+
+    def test_time_budget(self):
+        budget = Budget(seconds=30, clock=self.clock)
+        ranked = successive_halving(
+            self.hosts, 3, self.probe, Scorer(), budget, self.output
+        )
+        self.assertEqual(ranked[:3], ["h0", "h1", "h2"])
+        # a probe is only started while its estimated cost fits
+        self.assertLess(self.clock.now, 30 + 16)
+
+    def test_byte_budget(self):
+        budget = Budget(nbytes=250, clock=self.clock)
+        successive_halving(self.hosts, 3, self.probe, Scorer(), budget, self.output)
+        self.assertLessEqual(budget.spent_bytes, 250)
+        self.assertEqual([level for _, level in self.probes].count(1), 2)
+
+    def test_budget_spent_on_first_level(self):
+        budget = Budget(seconds=0.45, clock=self.clock)
+        ranked = successive_halving(
+            self.hosts, 3, self.probe, Scorer(), budget, self.output
+        )
+        self.assertEqual(ranked, ["h0", "h1", "h2", "h3"])
@@ -0,0 +1,48 @@
+# Copyright 2026 Gentoo Authors
+
+import unittest
+
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.tui import MirrorList
+from tests.conftest import stats
+
+HOSTS = [
+    Endpoint("http://b.example/", "b", "Germany", True, False),
+    Endpoint("http://a.example/", "a", "Austria", True, False),
+    Endpoint("http://c.example/", "c", "France", True, True),
+]
+
+
+class MirrorListTestCase(unittest.TestCase):
+    def test_rows(self):
+        mirrors = MirrorList(HOSTS)
+        by_country = ["http://a.example/", "http://c.example/", "http://b.example/"]
+        self.assertEqual(mirrors.rows(), by_country)
+        self.assertEqual(mirrors.describe("http://a.example/"), "probing")
+
+        mirrors.add_result(HOSTS[0], stats(0.02, 1e6))
+        mirrors.add_result(HOSTS[1], stats())
+        self.assertEqual(
+            mirrors.rows(),
+            ["http://b.example/", "http://c.example/", "http://a.example/"],
+        )
+        self.assertEqual(mirrors.probed, 2)
+        self.assertEqual(mirrors.describe("http://a.example/"), "failed")
+        self.assertIn("20 ms", mirrors.describe("http://b.example/"))
+        mirrors.by_speed = False
+        self.assertEqual(mirrors.rows(), by_country)
+
+    def test_selection(self):
+        mirrors = MirrorList(HOSTS)
+        mirrors.toggle("http://b.example/")
+        mirrors.toggle("http://a.example/")
+        self.assertEqual(
+            mirrors.selection(), ["http://a.example/", "http://b.example/"]
+        )
+        mirrors.toggle("http://a.example/")
+        self.assertEqual(mirrors.selection(), ["http://b.example/"])
+
+        single = MirrorList(HOSTS, single=True)
+        single.toggle("http://b.example/")
+        single.toggle("http://a.example/")
+        self.assertEqual(single.selection(), ["http://a.example/"])
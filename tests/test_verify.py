@@ -0,0 +1,77 @@
+# Copyright 2026 Gentoo Authors
+
+import io
+import unittest
+
+from mirrorselect.mirrorset import Endpoint
+from mirrorselect.output import Output
+from mirrorselect.scoring import ProbeStats
+from mirrorselect.selectors.verify import Verify
+from tests.test_deep import options
+
+# latency, throughput of the mirrors, None when down
+RESULTS = {
+    "https://healthy/": (0.2, 1e6),
+    "https://slow/": (2.0, 1e6),
+    "https://thin/": (0.2, 10e3),
+    "https://down/": None,
+}
+
+
+class TableVerify(Verify):
+    """Verify, with the results of the test downloads given."""
+
+    def __init__(self, *args, **kw):
+        self.timed: list[str] = []
+        super().__init__(*args, **kw)
+
+    def threadtime(self, host):
+        self.timed.append(host.uri)
+        stats = ProbeStats()
+        if RESULTS[host.uri] is None:
+            stats.add_failure()
+        else:
+            latency, throughput = RESULTS[host.uri]
+            stats.add_success([latency], throughput)
+        return stats
+
+
+def verify(*uris):
+    hosts = [Endpoint(uri, uri, "", True, False) for uri in uris]
+    log = io.StringIO()
+    result = TableVerify(
+        hosts, options(max_latency=1.0, min_throughput=100e3), Output(1, log)
+    )
+    return result, log.getvalue()
+
+
+class VerifyTestCase(unittest.TestCase):
+    def test_healthy(self):
+        result, log = verify("https://healthy/")
+        self.assertTrue(result.healthy)
+        self.assertEqual(result.urls, ["https://healthy/"])
+        self.assertIn("ok", log)
+
+    def test_degraded(self):
+        for uri, problem in (
+            ("https://slow/", "latency 2.000s"),
+            ("https://thin/", "throughput 10 kB/s"),
+            ("https://down/", "failed"),
+        ):
+            result, log = verify("https://healthy/", uri)
+            self.assertFalse(result.healthy)
+            self.assertEqual(result.urls, ["https://healthy/"])
+            self.assertIn(f"degraded     {problem}  {uri}", log)
+
+    def test_unverifiable(self):
+        result, log = verify("https://healthy/", "ftp://ftp/", "rsync://rsync/")
+        self.assertTrue(result.healthy)
+        self.assertEqual(result.timed, ["https://healthy/"])
+        self.assertEqual(result.unverifiable, ["ftp://ftp/", "rsync://rsync/"])
+        self.assertIn("unverifiable ftp://ftp/", log)
+        result, log = verify("https://down/", "ftp://ftp/")
+        self.assertFalse(result.healthy)
+
+
+if __name__ == "__main__":
+    unittest.main()
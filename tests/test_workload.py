@@ -0,0 +1,76 @@
+# Copyright 2026 Gentoo Authors
+
+import hashlib
+import unittest
+
+from mirrorselect.workload import (
+    DistEntry,
+    ManifestHasher,
+    WorkloadScorer,
+    choose_samples,
+    parse_manifest,
+    projected_time,
+)
+from tests.conftest import stats
+
+DATA = b"gcc" * 1000
+
+MANIFEST = [
+    "AUX some.patch 12 SHA256 00\n",
+    f"DIST gcc.tar.xz {len(DATA)} BLAKE2B {hashlib.blake2b(DATA).hexdigest()} "
+    f"SHA512 {hashlib.sha512(DATA).hexdigest()}\n",
+    "DIST big.tar.xz 90000000 BLAKE2B aa SHA512 bb\n",
+    "DIST small.patch 100 BLAKE2B aa SHA512 bb\n",
+]
+
+
+class WorkloadTestCase(unittest.TestCase):
+    def test_parse_manifest(self):
+        entries = parse_manifest(MANIFEST)
+        self.assertEqual(
+            [e.name for e in entries], ["gcc.tar.xz", "big.tar.xz", "small.patch"]
+        )
+        self.assertEqual(entries[1].size, 90000000)
+        self.assertEqual(set(entries[0].hashes), {"BLAKE2B", "SHA512"})
+        with self.assertRaises(ValueError):
+            parse_manifest(["DIST foo bar\n"])
+
+    def test_choose_samples(self):
+        entries = parse_manifest(MANIFEST)
+        names = [e.name for e in choose_samples(entries, 2, 1000000)]
+        self.assertEqual(names, ["gcc.tar.xz", "small.patch"])
+        names = [e.name for e in choose_samples(entries, 2, 10)]
+        self.assertEqual(names, ["small.patch"])
+
+    def test_manifest_hasher(self):
+        entry = parse_manifest(MANIFEST)[0]
+        hasher = ManifestHasher(entry)
+        hasher.update(DATA[:100])
+        hasher.update(DATA[100:])
+        self.assertEqual(hasher.mismatches(), [])
+        hasher = ManifestHasher(entry)
+        hasher.update(DATA[:-1] + b"x")
+        self.assertEqual(hasher.mismatches(), ["BLAKE2B", "SHA512"])
+        hasher = ManifestHasher(entry)
+        hasher.update(DATA[:-1])
+        self.assertIn("size", hasher.mismatches())
+        # a download given up on stops the hashing
+        hasher = ManifestHasher(entry)
+        hasher.update(DATA[:100])
+        worker = hasher._worker
+        hasher.close()
+        hasher.close()
+        self.assertFalse(worker.is_alive())
+        # nothing to hash, nothing to wait for
+        hasher = ManifestHasher(entry._replace(hashes={}))
+        hasher.update(DATA)
+        self.assertIsNone(hasher._worker)
+        self.assertEqual(hasher.mismatches(), [])
+
+    def test_projection_ranking(self):
+        big = [DistEntry("big", 100_000_000, {})]
+        small = [DistEntry(f"f{i}", 1000, {}) for i in range(100)]
+        candidates = {"near": stats(0.01, 1e6), "far_fast": stats(0.2, 1e7)}
+        self.assertAlmostEqual(projected_time(big, candidates["near"]), 100.02)
+        self.assertEqual(WorkloadScorer(big).rank(candidates), ["far_fast", "near"])
+        self.assertEqual(WorkloadScorer(small).rank(candidates), ["near", "far_fast"])